@@ -0,0 +1,40 @@
+"""
+Batch item analysis job: refresh the cached analysis for quizzes
+Run: python analyze_items.py [quiz_id ...] [--refresh] [--json]
+"""
+import argparse
+import json
+from app import app
+from models import db, Quiz
+from item_analysis import analyze_quiz
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute item statistics from stored responses')
+    parser.add_argument('quiz_ids', nargs='*', type=int, help='Quizzes to analyze (default: all)')
+    parser.add_argument('--refresh', action='store_true', help='Recompute from scratch instead of incrementally')
+    parser.add_argument('--json', action='store_true', help='Print full results as JSON')
+    args = parser.parse_args()
+
+    with app.app_context():
+        quiz_ids = args.quiz_ids or [quiz_id for (quiz_id,) in db.session.query(Quiz.id).order_by(Quiz.id)]
+        results = []
+        for quiz_id in quiz_ids:
+            try:
+                result = analyze_quiz(quiz_id, refresh=args.refresh)
+            except ValueError as e:
+                print(f"⚠️  Quiz {quiz_id}: {e}")
+                continue
+            results.append(result)
+            if not args.json:
+                print(f"   - Quiz {quiz_id}: {result['submission_count']} submission(s), "
+                      f"alpha={result['cronbach_alpha']}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"\n✅ Analyzed {len(results)} quiz(zes)")
+
+
+if __name__ == '__main__':
+    main()
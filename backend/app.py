@@ -1,103 +1,165 @@
 """
 Main Flask application for Quiz Management System
+
+create_app() builds the application without touching the database; apply
+migrations once per deploy with ``python migrate.py`` (or ``flask db
+upgrade``) before starting the workers.
 """
 import os
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate, upgrade
+from flask_migrate import Migrate
 from config import Config
 from models import db
-
-# Initialize Flask app
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Initialize extensions
-db.init_app(app)
-migrate = Migrate(app, db)
-
-with app.app_context():
-    try:
-        upgrade()
-        print("✅ Database migrations completed successfully")
-    except Exception as e:
-        # Log error but don't crash - migrations might already be up to date or not initialized
-        error_msg = str(e)
-        if "Target database is not up to date" in error_msg or "Can't locate revision" in error_msg:
-            print(f"⚠️  Migration note: {error_msg}")
-        else:
-            print(f"⚠️  Migration warning: {error_msg}")
-        # App will still start - migrations can be run manually if needed
-
-# Configure JWT
-app.config['JWT_SECRET_KEY'] = app.config.get('JWT_SECRET_KEY')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 3600)
-jwt = JWTManager(app)
-
-# Configure CORS - handle both string and list formats
-cors_origins = app.config.get('CORS_ORIGINS', [])
-if isinstance(cors_origins, str):
-    # If it's a string, split by comma and strip whitespace
-    cors_origins = [origin.strip() for origin in cors_origins.split(',') if origin.strip()]
-elif not isinstance(cors_origins, list):
-    # Fallback to default if not string or list
-    cors_origins = ['http://localhost:5173']
-
-cors = CORS(app, origins=cors_origins, supports_credentials=True)
-
-# Register blueprints
-from routes.auth import auth_bp
-from routes.quizzes import quizzes_bp
-from routes.submissions import submissions_bp
-
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(quizzes_bp, url_prefix='/api/quizzes')
-app.register_blueprint(submissions_bp, url_prefix='/api/submissions')
-
-
-# Error handlers
-@app.errorhandler(400)
-def bad_request(error):
-    """Handle 400 Bad Request errors"""
-    return jsonify({'error': 'Bad request', 'message': str(error)}), 400
-
-
-@app.errorhandler(401)
-def unauthorized(error):
-    """Handle 401 Unauthorized errors"""
-    return jsonify({'error': 'Unauthorized', 'message': 'Authentication required'}), 401
-
-
-@app.errorhandler(403)
-def forbidden(error):
-    """Handle 403 Forbidden errors"""
-    return jsonify({'error': 'Forbidden', 'message': 'You do not have permission to access this resource'}), 403
-
-
-@app.errorhandler(404)
-def not_found(error):
-    """Handle 404 Not Found errors"""
-    return jsonify({'error': 'Not found', 'message': 'The requested resource was not found'}), 404
-
-
-@app.errorhandler(500)
-def internal_error(error):
-    """Handle 500 Internal Server errors"""
-    db.session.rollback()
-    return jsonify({'error': 'Internal server error', 'message': 'An unexpected error occurred'}), 500
-
-
-# Health check endpoint
-@app.route('/api/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'Quiz API is running'}), 200
+import engine_profile
+import grading
+import identity_cache
+import metrics
+import passwords
+import query_profile
+import compression
+import drafts
+import json_provider
+import live
+import sampling
+import write_behind
+import leaderboard
+
+migrate = Migrate()
+jwt = JWTManager()
+
+
+def create_app(config_class=Config):
+    """Application factory"""
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    # Initialize extensions (engine options must be set before db.init_app)
+    engine_profile.init_app(app)
+    db.init_app(app)
+    query_profile.init_app(app)
+    migrate.init_app(app, db)
+    grading.init_app(app)
+    sampling.init_app(app)
+    passwords.init_app(app)
+    write_behind.init_app(app)
+    drafts.init_app(app)
+    live.init_app(app)
+    leaderboard.init_app(app)
+    metrics.init_app(app)
+    compression.init_app(app)  # Registered last: its after_request hook runs first, so the timings above include it
+    json_provider.init_app(app)
+
+    # Configure JWT
+    app.config['JWT_SECRET_KEY'] = app.config.get('JWT_SECRET_KEY')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 3600)
+    jwt.init_app(app)
+    identity_cache.init_app(app, jwt)
+
+    # Configure CORS - handle both string and list formats
+    cors_origins = app.config.get('CORS_ORIGINS', [])
+    if isinstance(cors_origins, str):
+        # If it's a string, split by comma and strip whitespace
+        cors_origins = [origin.strip() for origin in cors_origins.split(',') if origin.strip()]
+    elif not isinstance(cors_origins, list):
+        # Fallback to default if not string or list
+        cors_origins = ['http://localhost:5173']
+
+    CORS(app, origins=cors_origins, supports_credentials=True)
+
+    register_blueprints(app)
+    register_error_handlers(app)
+
+    # Health check endpoint
+    @app.route('/api/health', methods=['GET'])
+    def health_check():
+        """Health check endpoint"""
+        data = {
+            'status': 'healthy',
+            'message': 'Quiz API is running',
+            'database': engine_profile.pool_status(db.engine),
+            'password_hashing': passwords.hasher.stats(),
+            'identity_cache': identity_cache.identity_cache.stats(),
+            'drafts': drafts.draft_store.stats(),
+            'live': live.broadcaster.stats()
+        }
+        if write_behind.is_enabled():
+            data['write_behind'] = write_behind.writer.stats()
+        return jsonify(data), 200
+
+    @app.route('/api/metrics', methods=['GET'])
+    def metrics_endpoint():
+        """Prometheus metrics summed over every worker"""
+        return Response(metrics.metrics.render(), content_type=metrics.CONTENT_TYPE), 200
+
+    return app
+
+
+def register_blueprints(app):
+    """Import and register the route blueprints (route modules load only here)"""
+    from routes.auth import auth_bp
+    from routes.quizzes import quizzes_bp
+    from routes.submissions import submissions_bp
+
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(quizzes_bp, url_prefix='/api/quizzes')
+    app.register_blueprint(submissions_bp, url_prefix='/api/submissions')
+
+
+def register_error_handlers(app):
+    """Return JSON bodies for common HTTP errors"""
+
+    @app.errorhandler(400)
+    def bad_request(error):
+        """Handle 400 Bad Request errors"""
+        return jsonify({'error': 'Bad request', 'message': str(error)}), 400
+
+    @app.errorhandler(401)
+    def unauthorized(error):
+        """Handle 401 Unauthorized errors"""
+        return jsonify({'error': 'Unauthorized', 'message': 'Authentication required'}), 401
+
+    @app.errorhandler(403)
+    def forbidden(error):
+        """Handle 403 Forbidden errors"""
+        return jsonify({'error': 'Forbidden', 'message': 'You do not have permission to access this resource'}), 403
+
+    @app.errorhandler(404)
+    def not_found(error):
+        """Handle 404 Not Found errors"""
+        return jsonify({'error': 'Not found', 'message': 'The requested resource was not found'}), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        """Handle 500 Internal Server errors"""
+        db.session.rollback()
+        return jsonify({'error': 'Internal server error', 'message': 'An unexpected error occurred'}), 500
+
+
+def init_worker(app):
+    """
+    Per-process setup for a worker forked from a preloaded master
+    (gunicorn --preload, see gunicorn.conf.py)
+    """
+    with app.app_context():
+        # Connections opened by the master must not be shared with children
+        db.engine.dispose(close=False)
+    if write_behind.is_enabled():
+        write_behind.writer.ensure_started()
+
+
+# Module-level instance for `gunicorn app:app`, the flask CLI and the scripts
+app = create_app()
 
 
 if __name__ == '__main__':
+    # Development server: bring the schema up to date first
+    from migrate import run_migrations
+    run_migrations(app)
+    metrics.metrics.reset()
+
     # Default to port 5001 to avoid conflict with macOS AirPlay Receiver on port 5000
     # Can be overridden with PORT environment variable: PORT=5000 python app.py
     port = int(os.getenv('PORT', 5001))
     app.run(debug=True, host='0.0.0.0', port=port)
-
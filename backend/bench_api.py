@@ -0,0 +1,392 @@
+"""
+API benchmark: throughput, p50/p95/p99 latency and SQL statements per request
+Run: python bench_api.py [--quizzes 20] [--questions 20] [--submissions 200] [--students 20]
+                         [--pool-size 10000] [--draw 20] [--requests 200] [--login-requests 20] [--target both]
+                         [--workers 2] [--concurrency 8] [--output results.json]
+                         [--baseline baseline.json] [--tolerance 0.25] [--json]
+
+Builds a scratch SQLite database, migrates it and seeds the admin plus
+synthetic fixtures (seed_quizzes.seed_synthetic_quizzes with a fixed
+seed) plus one quiz that draws --draw questions per attempt from a pool of
+--pool-size (start_attempt / submit_attempt scenarios), then drives each
+scenario against the real application:
+
+- inprocess: the Flask test client, one request at a time; every request's
+  SQL statements are counted on the engine
+- gunicorn: a local gunicorn (gunicorn.conf.py with --workers) over HTTP
+  from --concurrency client threads; SQL counts are not visible from outside
+
+--output writes the results as JSON. --baseline compares them with an
+earlier --output and exits 1 when a scenario's p95 latency grew by more
+than --tolerance or it issues more SQL statements per request.
+"""
+import argparse
+import contextlib
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TARGETS = ('inprocess', 'gunicorn')
+
+# Appended to gunicorn.conf.py for the benchmark server
+GUNICORN_OVERRIDES = """
+workers = {workers}
+bind = '127.0.0.1:{port}'
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the main API routes')
+    parser.add_argument('--quizzes', type=int, default=20, help='Synthetic quizzes (default 20)')
+    parser.add_argument('--questions', type=int, default=20, help='Questions per quiz (default 20)')
+    parser.add_argument('--submissions', type=int, default=200, help='Submissions per quiz (default 200)')
+    parser.add_argument('--students', type=int, default=20, help='Student accounts (default 20)')
+    parser.add_argument('--seed', type=int, default=1, help='Fixture random seed (default 1)')
+    parser.add_argument('--pool-size', type=int, default=10000,
+                        help='Questions in the drawn-attempt quiz (default 10000, 0 to skip)')
+    parser.add_argument('--draw', type=int, default=20, help='Questions drawn per attempt (default 20)')
+    parser.add_argument('--draw-by', choices=('tag', 'points'), default='tag',
+                        help='Stratum of the drawn-attempt quiz (default tag)')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario (default 200)')
+    parser.add_argument('--login-requests', type=int, default=20,
+                        help='Requests for the login scenario, which is bound by password hashing (default 20)')
+    parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario (default 5)')
+    parser.add_argument('--target', choices=TARGETS + ('both',), default='both', help='Where to send requests')
+    parser.add_argument('--workers', type=int, default=2, help='Gunicorn workers (default 2)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Client threads against gunicorn (default 8)')
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare with the results in this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed relative p95 increase over the baseline (default 0.25)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    return parser.parse_args()
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+
+    def at(fraction):
+        return round(values[min(int(len(values) * fraction), len(values) - 1)] * 1000, 2)
+    return {'p50_ms': at(0.5), 'p95_ms': at(0.95), 'p99_ms': at(0.99), 'max_ms': round(values[-1] * 1000, 2)}
+
+
+def build_scenarios(client, fixtures, student_password, attempts=0):
+    """
+    Scenario name -> function(i) returning (method, path, json_body, headers).
+    Logs in the admin and each student once so authenticated scenarios reuse tokens,
+    and starts ``attempts`` attempts up front for submit_attempt (one per request).
+    """
+    def token(username, password):
+        response = client.post('/api/auth/login', json={'username': username, 'password': password})
+        if response.status_code != 200:
+            raise RuntimeError(f'Login as {username} failed: {response.get_json()}')
+        return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+    admin = token('admin', 'admin123')
+    usernames = [f'student{index}' for index in range(len(fixtures['student_ids']))]
+    students = [token(username, student_password) for username in usernames]
+    quiz_ids = fixtures['quiz_ids']
+
+    # One answer sheet per quiz, from the public quiz payload
+    sheets = {}
+    for quiz_id in quiz_ids:
+        quiz = client.get(f'/api/quizzes/{quiz_id}').get_json()['quiz']
+        sheets[quiz_id] = {
+            str(question['id']): (question['options'] or ['True'])[0]
+            for question in quiz['questions']
+        }
+
+    def quiz_for(i):
+        return quiz_ids[i % len(quiz_ids)]
+
+    def student_for(i):
+        return students[i % len(students)] if students else admin
+
+    scenarios = {
+        'list_quizzes_summary': lambda i: ('GET', '/api/quizzes?view=summary&limit=20', None, {}),
+        'list_quizzes_full': lambda i: ('GET', '/api/quizzes?limit=20', None, {}),
+        'get_quiz': lambda i: ('GET', f'/api/quizzes/{quiz_for(i)}', None, {}),
+        'submit': lambda i: ('POST', f'/api/submissions/quizzes/{quiz_for(i)}/submit',
+                             {'name': f'Bench {i}', 'answers': sheets[quiz_for(i)]}, {}),
+        'login': lambda i: ('POST', '/api/auth/login', {
+            'username': usernames[i % len(usernames)] if usernames else 'admin',
+            'password': student_password if usernames else 'admin123'
+        }, {}),
+        'my_submissions': lambda i: ('GET', '/api/submissions/my-submissions', None, student_for(i)),
+        'quiz_submissions': lambda i: ('GET', f'/api/submissions/quizzes/{quiz_for(i)}/submissions', None, admin)
+    }
+
+    pool_quiz_id = fixtures.get('pool_quiz_id')
+    if pool_quiz_id:
+        attempt_sheets = []
+        for _ in range(attempts):
+            started = client.post(f'/api/quizzes/{pool_quiz_id}/attempts').get_json()
+            attempt_sheets.append({
+                'attempt_id': started['attempt']['id'],
+                'attempt_token': started['attempt']['token'],
+                'answers': {str(q['id']): (q['options'] or ['True'])[0] for q in started['questions']}
+            })
+        # Every request submits a fresh attempt, whichever target sends it
+        pending = iter(attempt_sheets)
+        submit_path = f'/api/submissions/quizzes/{pool_quiz_id}/submit'
+
+        scenarios['start_attempt'] = lambda i: ('POST', f'/api/quizzes/{pool_quiz_id}/attempts', None, {})
+        scenarios['submit_attempt'] = lambda i: ('POST', submit_path, next(pending), {})
+    return scenarios
+
+
+def summarize(latencies, statuses, elapsed, sql_counts=None):
+    errors = sum(1 for status in statuses if status >= 400)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        **percentiles(latencies),
+        'sql_per_request': round(sum(sql_counts) / len(sql_counts), 2) if sql_counts else None,
+        'sql_max': max(sql_counts) if sql_counts else None
+    }
+
+
+def run_inprocess(app, client, scenarios, counts, warmup):
+    """Sequential requests through the test client, counting SQL statements per request"""
+    from sqlalchemy import event
+    from models import db
+
+    statements = [0]
+
+    def count(*args):
+        statements[0] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    results = {}
+    try:
+        for name, build in scenarios.items():
+            for i in range(warmup):
+                method, path, body, headers = build(i)
+                client.open(path, method=method, json=body, headers=headers)
+
+            latencies, statuses, sql_counts = [], [], []
+            started = time.perf_counter()
+            for i in range(counts[name]):
+                method, path, body, headers = build(warmup + i)
+                statements[0] = 0
+                request_started = time.perf_counter()
+                response = client.open(path, method=method, json=body, headers=headers)
+                latencies.append(time.perf_counter() - request_started)
+                sql_counts.append(statements[0])
+                statuses.append(response.status_code)
+            results[name] = summarize(latencies, statuses, time.perf_counter() - started, sql_counts)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _http(base_url, method, path, body, headers):
+    data = None
+    headers = dict(headers)
+    if body is not None:
+        data = json.dumps(body).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    request = urllib.request.Request(base_url + path, data=data, headers=headers, method=method)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return status, time.perf_counter() - started
+
+
+def run_gunicorn(env, scenarios, counts, warmup, workers, concurrency, scratch):
+    """Requests over HTTP from ``concurrency`` threads against a local gunicorn"""
+    port = _free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    config_path = os.path.join(scratch, 'gunicorn.bench.conf.py')
+    with open(os.path.join(BACKEND_DIR, 'gunicorn.conf.py'), encoding='utf-8') as source:
+        base_config = source.read()
+    with open(config_path, 'w', encoding='utf-8') as config:
+        config.write(base_config + GUNICORN_OVERRIDES.format(workers=workers, port=port))
+
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config_path, 'app:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.time() + 60
+        while True:
+            try:
+                with urllib.request.urlopen(base_url + '/api/health', timeout=5) as response:
+                    response.read()
+                break
+            except OSError:
+                if process.poll() is not None or time.time() > deadline:
+                    raise RuntimeError('gunicorn did not start')
+                time.sleep(0.05)
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for name, build in scenarios.items():
+                list(executor.map(lambda i: _http(base_url, *build(i)), range(warmup)))
+                started = time.perf_counter()
+                outcomes = list(executor.map(lambda i: _http(base_url, *build(warmup + i)), range(counts[name])))
+                elapsed = time.perf_counter() - started
+                results[name] = summarize(
+                    [latency for _, latency in outcomes], [status for status, _ in outcomes], elapsed
+                )
+        return results
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of ``results`` against ``baseline``: slower p95 or more SQL statements"""
+    regressions = []
+    for target, scenarios in results['targets'].items():
+        for name, current in scenarios.items():
+            previous = baseline.get('targets', {}).get(target, {}).get(name)
+            if not previous:
+                continue
+            if previous.get('p95_ms') and current['p95_ms'] is not None:
+                if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+                    regressions.append(
+                        f"{target}/{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms"
+                    )
+            if previous.get('sql_per_request') is not None and current['sql_per_request'] is not None:
+                if current['sql_per_request'] > previous['sql_per_request']:
+                    regressions.append(
+                        f"{target}/{name}: SQL/request {previous['sql_per_request']} -> {current['sql_per_request']}"
+                    )
+            if current['errors'] > previous.get('errors', 0):
+                regressions.append(f"{target}/{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def main():
+    args = parse_args()
+    scratch = tempfile.mkdtemp(prefix='quiz-bench-')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+    env['SUBMISSION_WRITE_BEHIND'] = 'false'
+    os.environ.update(DATABASE_URL=env['DATABASE_URL'], SUBMISSION_WRITE_BEHIND='false')
+
+    from app import app
+    from migrate import run_migrations
+    from models import db, Quiz, User
+    from seed_quizzes import STUDENT_PASSWORD, seed_synthetic_quizzes
+
+    # Keep stdout for the results (--json)
+    with contextlib.redirect_stdout(sys.stderr):
+        if not run_migrations(app):
+            raise SystemExit(1)
+        with app.app_context():
+            admin = User(username='admin', email='admin@quizapp.com', role='admin')
+            admin.set_password('admin123')
+            db.session.add(admin)
+            db.session.commit()
+        started = time.perf_counter()
+        fixtures = seed_synthetic_quizzes(args.quizzes, args.questions, args.submissions,
+                                          students=args.students, seed=args.seed)
+        if args.pool_size:
+            pool_quiz_id = seed_synthetic_quizzes(1, args.pool_size, 0, seed=args.seed)['quiz_ids'][0]
+            with app.app_context():
+                quiz = db.session.get(Quiz, pool_quiz_id)
+                quiz.draw_count, quiz.draw_by = args.draw, args.draw_by
+                quiz.bump_version()
+                db.session.commit()
+            fixtures['pool_quiz_id'] = pool_quiz_id
+    seed_seconds = time.perf_counter() - started
+
+    targets = TARGETS if args.target == 'both' else (args.target,)
+    client = app.test_client()
+    scenarios = build_scenarios(
+        client, fixtures, STUDENT_PASSWORD, attempts=(args.requests + args.warmup) * len(targets)
+    )
+    counts = {name: args.login_requests if name == 'login' else args.requests for name in scenarios}
+
+    results = {
+        'fixtures': {
+            'quizzes': args.quizzes,
+            'questions_per_quiz': args.questions,
+            'submissions_per_quiz': args.submissions,
+            'students': args.students,
+            'pool_size': args.pool_size,
+            'draw': args.draw if args.pool_size else None,
+            'draw_by': args.draw_by if args.pool_size else None,
+            'seed': args.seed,
+            'seed_seconds': round(seed_seconds, 2)
+        },
+        'config': {'warmup': args.warmup, 'gunicorn_workers': args.workers, 'concurrency': args.concurrency},
+        'targets': {}
+    }
+    if 'inprocess' in targets:
+        results['targets']['inprocess'] = run_inprocess(app, client, scenarios, counts, args.warmup)
+    if 'gunicorn' in targets:
+        results['targets']['gunicorn'] = run_gunicorn(
+            env, scenarios, counts, args.warmup, args.workers, args.concurrency, scratch
+        )
+
+    regressions = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as source:
+            regressions = compare(results, json.load(source), args.tolerance)
+        results['regressions'] = regressions
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        fixtures = results['fixtures']
+        print(f"\n✅ Fixtures: {fixtures['quizzes']} quiz(zes) × {fixtures['questions_per_quiz']} question(s) "
+              f"× {fixtures['submissions_per_quiz']} submission(s), {fixtures['students']} student(s) "
+              f"in {fixtures['seed_seconds']}s")
+        for target, scenario_results in results['targets'].items():
+            print(f"\n✅ {target}")
+            for name, result in scenario_results.items():
+                sql = f", {result['sql_per_request']} SQL/request" if result['sql_per_request'] is not None else ''
+                errors = f", {result['errors']} error(s)" if result['errors'] else ''
+                print(f"   - {name}: {result['requests_per_second']} req/s, p50/p95/p99 "
+                      f"{result['p50_ms']} / {result['p95_ms']} / {result['p99_ms']} ms{sql}{errors}")
+        if args.output:
+            print(f"\n   Results written to {args.output}")
+        if regressions is not None:
+            if regressions:
+                print(f"\n❌ {len(regressions)} regression(s) against {args.baseline}:")
+                for regression in regressions:
+                    print(f"   - {regression}")
+            else:
+                print(f"\n✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
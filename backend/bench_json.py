@@ -0,0 +1,141 @@
+"""
+JSON payload benchmark: serialization time and response size per encoding
+Run: python bench_json.py [--questions 2000] [--submissions 1000] [--repeat 20]
+                          [--quiz-fields id,title,questions.id,questions.question_text,questions.options]
+                          [--submission-fields id,user_id,score,total_points,submitted_at] [--json]
+
+Builds a quiz with --questions questions and a page of --submissions
+submissions as transient model objects (no database), then reports for
+each payload, full and trimmed with ?fields=:
+
+- to_dict time, and dumps time with the stdlib and orjson providers
+  (best of --repeat runs)
+- body size raw, gzip (COMPRESS_LEVEL) and brotli (BROTLI_QUALITY) when the
+  optional packages are installed
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from compression import Compressor, brotli
+from config import Config
+from fieldsets import parse_fields
+from json_provider import OrjsonProvider, orjson
+from models import Quiz, Question, UserResponse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark JSON serialization and response compression')
+    parser.add_argument('--questions', type=int, default=2000, help='Questions in the quiz (default 2000)')
+    parser.add_argument('--submissions', type=int, default=1000, help='Submissions in the page (default 1000)')
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per measurement (default 20)')
+    parser.add_argument('--quiz-fields', default='id,title,questions.id,questions.question_text,questions.options',
+                        help='?fields= for the trimmed quiz payload')
+    parser.add_argument('--submission-fields', default='id,user_id,score,total_points,submitted_at',
+                        help='?fields= for the trimmed submissions payload')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default 1)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    return parser.parse_args()
+
+
+def build_quiz(count, rng):
+    quiz = Quiz(
+        id=1, title='Benchmark quiz', description='Synthetic quiz for bench_json.py', created_by=1,
+        created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1), is_active=True, version=1
+    )
+    for index in range(count):
+        options = [f'Option {letter} for question {index + 1}' for letter in 'ABCD']
+        quiz.questions.append(Question(
+            id=index + 1, quiz_id=1, question_text=f'Synthetic question {index + 1}: which option is correct?',
+            question_type='multiple_choice', options=options, correct_answer=rng.choice(options),
+            points=rng.randint(1, 5), order=index, tag=f'topic{index % 4 + 1}'
+        ))
+    return quiz
+
+
+def build_submissions(count, questions, rng):
+    started = datetime(2024, 1, 1)
+    return [
+        UserResponse(
+            id=index + 1, user_id=rng.randint(1, 500), quiz_id=1, participant_name=None,
+            answers={str(q.id): rng.choice(q.options) for q in questions},
+            score=rng.randint(0, 60), total_points=60, submitted_at=started + timedelta(seconds=index),
+            attempt_id=None
+        )
+        for index in range(count)
+    ]
+
+
+def best_of(repeat, func):
+    """Fastest of ``repeat`` runs, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return round(min(timings) * 1000, 3)
+
+
+def measure(name, build, providers, compressor, repeat):
+    payload = build()
+    result = {'payload': name, 'to_dict_ms': best_of(repeat, build)}
+    body = None
+    for provider_name, provider in providers.items():
+        result[f'{provider_name}_dumps_ms'] = best_of(repeat, lambda: provider.dumps(payload))
+        body = provider.dumps(payload).encode('utf-8')
+    result['raw_bytes'] = len(body)
+    result['gzip_bytes'] = len(compressor.compress(body, 'gzip'))
+    if brotli is not None:
+        result['br_bytes'] = len(compressor.compress(body, 'br'))
+    return result
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    quiz = build_quiz(args.questions, rng)
+    submissions = build_submissions(args.submissions, quiz.questions[:20], rng)
+    quiz_fields = parse_fields(args.quiz_fields)
+    submission_fields = parse_fields(args.submission_fields)
+
+    app = Flask(__name__)
+    providers = {'stdlib': DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+    compressor = Compressor()
+    compressor.configure(level=Config.COMPRESS_LEVEL, brotli_quality=Config.BROTLI_QUALITY)
+
+    scenarios = [
+        ('quiz', lambda: {'quiz': quiz.to_dict()}),
+        ('quiz ?fields=', lambda: {'quiz': quiz.to_dict(fields=quiz_fields)}),
+        ('submissions', lambda: {'submissions': [sub.to_dict() for sub in submissions]}),
+        ('submissions ?fields=', lambda: {
+            'submissions': [sub.to_dict(fields=submission_fields) for sub in submissions]
+        }),
+    ]
+    results = [measure(name, build, providers, compressor, args.repeat) for name, build in scenarios]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'\n✅ {args.questions} question(s), {args.submissions} submission(s), best of {args.repeat} run(s)')
+    if orjson is None:
+        print('   (orjson is not installed: stdlib only)')
+    if brotli is None:
+        print('   (brotli is not installed: gzip only)')
+    for result in results:
+        timings = ', '.join(
+            f"{name} {result[f'{name}_dumps_ms']} ms" for name in providers
+        )
+        sizes = f"raw {result['raw_bytes']} B, gzip {result['gzip_bytes']} B"
+        if 'br_bytes' in result:
+            sizes += f", br {result['br_bytes']} B"
+        print(f"   - {result['payload']}: to_dict {result['to_dict_ms']} ms; dumps {timings}; {sizes}")
+
+
+if __name__ == '__main__':
+    main()
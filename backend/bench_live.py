@@ -0,0 +1,147 @@
+"""
+Live stream benchmark: memory per idle subscriber and fan-out of a burst
+Run: python bench_live.py [--quiz-id ID] [--subscribers 2000] [--events 200] [--json]
+
+Opens --subscribers streams on one quiz in this process, one thread each
+(as the gthread worker class serves them), and reports what an idle
+subscriber costs: Python heap (tracemalloc) and resident memory including
+its thread. It then submits --events answers through the API as fast as it
+can and reports how many frames each subscriber received and how long after
+the last submission every subscriber had the final count.
+
+Submissions are really stored: run it against a scratch database
+(e.g. DATABASE_URL=sqlite:////tmp/bench.db, after migrate.py and seed_quizzes.py).
+"""
+import argparse
+import json
+import threading
+import time
+import tracemalloc
+from app import app
+from models import db, Quiz
+import live
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark live score streams')
+    parser.add_argument('--quiz-id', type=int, help='Quiz to stream (default: the first active quiz)')
+    parser.add_argument('--subscribers', type=int, default=2000, help='Open streams (default 2000)')
+    parser.add_argument('--events', type=int, default=200, help='Submissions in the burst (default 200)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    return parser.parse_args()
+
+
+def rss_kib():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+class Subscriber:
+    """Drains one stream, remembering the last frame and when it arrived"""
+
+    __slots__ = ('frames', 'last_frame', 'received_at')
+
+    def __init__(self):
+        self.frames = 0
+        self.last_frame = None
+        self.received_at = None
+
+    def run(self, body):
+        for chunk in body:
+            if chunk.startswith(b'event:'):
+                self.frames += 1
+                self.last_frame = chunk
+                self.received_at = time.perf_counter()
+
+
+def submissions_in(frame):
+    return json.loads(frame.split(b'data: ', 1)[1])['submissions']
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError('Subscribers did not catch up')
+        time.sleep(0.01)
+
+
+def main():
+    args = parse_args()
+    with app.app_context():
+        query = db.session.query(Quiz).filter(Quiz.is_active.is_(True))
+        quiz = query.filter(Quiz.id == args.quiz_id).first() if args.quiz_id else query.order_by(Quiz.id).first()
+        if quiz is None:
+            raise SystemExit('No active quiz: run seed_quizzes.py first')
+        quiz_id = quiz.id
+        body = {
+            'name': 'bench_live',
+            'answers': {str(q.id): (q.options or [q.correct_answer])[0] for q in quiz.questions}
+        }
+    broadcaster = live.broadcaster
+    broadcaster.max_subscribers = max(broadcaster.max_subscribers, args.subscribers)
+    broadcaster.stream_timeout = 0
+
+    subscribers = [Subscriber() for _ in range(args.subscribers)]
+    tracemalloc.start()
+    heap_before = tracemalloc.get_traced_memory()[0]
+    rss_before = rss_kib()
+    with app.test_request_context():
+        channels = [broadcaster.join(quiz_id) for _ in subscribers]
+    threads = [
+        threading.Thread(target=subscriber.run, args=(broadcaster.stream(channel),), daemon=True)
+        for subscriber, channel in zip(subscribers, channels)
+    ]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: all(subscriber.frames for subscriber in subscribers))
+    time.sleep(0.5)  # Every subscriber is back waiting on the channel
+    heap_per_subscriber = (tracemalloc.get_traced_memory()[0] - heap_before) / args.subscribers
+    rss_per_subscriber = (rss_kib() - rss_before) / args.subscribers
+    tracemalloc.stop()
+
+    frames_before = [subscriber.frames for subscriber in subscribers]
+    client = app.test_client()
+    started = time.perf_counter()
+    for _ in range(args.events):
+        client.post(f'/api/submissions/quizzes/{quiz_id}/submit', json=body)
+    submitted = time.perf_counter()
+    with app.app_context():
+        expected = live.snapshot(quiz_id, broadcaster.leaderboard_size)['submissions']
+    wait_for(lambda: all(submissions_in(subscriber.last_frame) == expected for subscriber in subscribers))
+    delivered = max(subscriber.received_at for subscriber in subscribers)
+    frames = [subscriber.frames - before for subscriber, before in zip(subscribers, frames_before)]
+    stats = broadcaster.stats()
+    broadcaster.stop()
+
+    results = {
+        'quiz_id': quiz_id,
+        'subscribers': args.subscribers,
+        'heap_bytes_per_subscriber': round(heap_per_subscriber),
+        'rss_kib_per_subscriber': round(rss_per_subscriber, 1),
+        'events': args.events,
+        'submit_seconds': round(submitted - started, 3),
+        'frames_per_subscriber': max(frames),
+        'fan_out_ms': round((delivered - submitted) * 1000, 1),
+        'tick_interval': broadcaster.tick_interval,
+        'frames_built': stats['frames']
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'\n✅ {args.subscribers} subscriber(s) on quiz {quiz_id}')
+    print(f"   - idle subscriber: {results['heap_bytes_per_subscriber']} B Python heap, "
+          f"{results['rss_kib_per_subscriber']} KiB resident with its thread")
+    print(f"   - {args.events} submission(s) in {results['submit_seconds']} s -> "
+          f"at most {results['frames_per_subscriber']} frame(s) per subscriber, "
+          f"{results['frames_built']} frame(s) built in total")
+    print(f"   - every subscriber had the final count {results['fan_out_ms']} ms after the last submission "
+          f"(tick every {results['tick_interval']} s)")
+
+
+if __name__ == '__main__':
+    main()
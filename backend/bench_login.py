@@ -0,0 +1,136 @@
+"""
+Login throughput benchmark: a burst of concurrent logins while a probe keeps
+fetching /api/health and the quiz list, as during the start of an exam
+Run: python bench_login.py [--logins 400] [--concurrency 32] [--method scrypt:32768:8:1]
+                           [--hash-workers 2] [--queue-limit 32] [--json]
+
+Runs in-process against a scratch SQLite database, one thread per
+concurrent client (like a threaded gunicorn worker). Reports login
+throughput and latency, 503s from the full hashing queue, and the probe's
+latency during the burst.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD = 'exam-day-password'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure login throughput under a burst')
+    parser.add_argument('--logins', type=int, default=400, help='Total login requests (default 400)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Concurrent clients (default 32)')
+    parser.add_argument('--users', type=int, default=20, help='Distinct accounts (default 20)')
+    parser.add_argument('--method', help='PASSWORD_HASH_METHOD to benchmark (default: configured)')
+    parser.add_argument('--hash-workers', type=int, help='PASSWORD_HASH_WORKERS (default: configured)')
+    parser.add_argument('--queue-limit', type=int, help='PASSWORD_HASH_QUEUE_LIMIT (default: configured)')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    return parser.parse_args()
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None, 'max_ms': None}
+
+    def at(fraction):
+        return round(values[min(int(len(values) * fraction), len(values) - 1)] * 1000, 1)
+    return {'p50_ms': at(0.5), 'p95_ms': at(0.95), 'max_ms': round(values[-1] * 1000, 1)}
+
+
+def main():
+    args = parse_args()
+    scratch = tempfile.mkdtemp(prefix='quiz-login-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'login.db')}"
+    for name, value in (('PASSWORD_HASH_METHOD', args.method),
+                        ('PASSWORD_HASH_WORKERS', args.hash_workers),
+                        ('PASSWORD_HASH_QUEUE_LIMIT', args.queue_limit)):
+        if value is not None:
+            os.environ[name] = str(value)
+
+    from app import app
+    from migrate import run_migrations
+    from models import db, User
+    from passwords import hasher
+
+    if not run_migrations(app):
+        raise SystemExit(1)
+    with app.app_context():
+        for index in range(args.users):
+            user = User(username=f'student{index}', email=f'student{index}@example.com', role='student')
+            user.set_password(PASSWORD)
+            db.session.add(user)
+        db.session.commit()
+    hasher.configure(hasher.method, hasher.workers, hasher.queue_limit)  # Reset counters
+
+    client = app.test_client()
+    done = threading.Event()
+    probe_latencies = []
+
+    def probe():
+        paths = ('/api/health', '/api/quizzes?view=summary')
+        index = 0
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get(paths[index % 2])
+            probe_latencies.append(time.perf_counter() - started)
+            index += 1
+            time.sleep(0.01)
+
+    def login(index):
+        started = time.perf_counter()
+        response = client.post('/api/auth/login', json={
+            'username': f'student{index % args.users}', 'password': PASSWORD
+        })
+        return response.status_code, time.perf_counter() - started
+
+    probe_thread = threading.Thread(target=probe, daemon=True)
+    probe_thread.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(executor.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe_thread.join()
+
+    succeeded = [latency for status, latency in outcomes if status == 200]
+    results = {
+        'method': hasher.method,
+        'hash_workers': hasher.workers,
+        'queue_limit': hasher.queue_limit,
+        'concurrency': args.concurrency,
+        'logins': args.logins,
+        'succeeded': len(succeeded),
+        'busy_503': sum(1 for status, _ in outcomes if status == 503),
+        'other_failures': sum(1 for status, _ in outcomes if status not in (200, 503)),
+        'elapsed_seconds': round(elapsed, 3),
+        'logins_per_second': round(len(succeeded) / elapsed, 1) if elapsed else None,
+        'login_latency': percentiles(succeeded),
+        'probe_requests': len(probe_latencies),
+        'probe_latency': percentiles(probe_latencies),
+        'hasher': hasher.stats()
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"\n✅ {results['succeeded']} of {args.logins} login(s) in {elapsed:.2f}s "
+          f"({results['logins_per_second']} logins/sec)")
+    print(f"   - Method: {results['method']}, {results['hash_workers']} hashing thread(s), "
+          f"queue limit {results['queue_limit']}, {args.concurrency} concurrent client(s)")
+    print(f"   - Busy (503): {results['busy_503']}, other failures: {results['other_failures']}")
+    login_latency = results['login_latency']
+    print(f"   - Login latency p50/p95/max: {login_latency['p50_ms']} / {login_latency['p95_ms']} / "
+          f"{login_latency['max_ms']} ms")
+    probe_latency = results['probe_latency']
+    print(f"   - Health/quiz-list latency during the burst p50/p95/max: {probe_latency['p50_ms']} / "
+          f"{probe_latency['p95_ms']} / {probe_latency['max_ms']} ms ({len(probe_latencies)} request(s))")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Startup benchmark: import time, time to first request and gunicorn worker boot
+Run: python bench_startup.py [--runs 5] [--workers 4] [--no-gunicorn] [--json]
+
+Runs against a scratch SQLite database in a temporary directory.
+
+- import: fresh interpreters timing `from app import app`, then the first
+  /api/health and /api/quizzes requests through the test client
+- gunicorn: with and without --preload, time until every worker is ready,
+  until the first HTTP response, and until a replacement worker is ready
+  after one is killed
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = """
+import json, time
+started = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+client = app.test_client()
+client.get('/api/health')
+first = time.perf_counter()
+client.get('/api/quizzes')
+second = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'first_request_seconds': first - imported,
+    'first_db_request_seconds': second - first
+}))
+"""
+
+# Appended to gunicorn.conf.py: report when each worker can take requests
+READY_HOOK = """
+import os as _os, sys as _sys, time as _time
+preload_app = {preload}
+workers = {workers}
+bind = '127.0.0.1:{port}'
+
+def post_worker_init(worker):
+    _sys.stderr.write(f'WORKER-READY {{_os.getpid()}} {{_time.time()}}\\n')
+    _sys.stderr.flush()
+"""
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _median(values):
+    return round(statistics.median(values), 4) if values else None
+
+
+def measure_import(env, runs):
+    """Median import / first-request timings over ``runs`` fresh interpreters"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_PROBE], cwd=BACKEND_DIR, env=env,
+            capture_output=True, text=True, check=True
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        sample['process_seconds'] = time.perf_counter() - started
+        samples.append(sample)
+    return {key: _median([sample[key] for sample in samples]) for key in samples[0]}
+
+
+def measure_gunicorn(env, workers, preload, scratch):
+    """Boot gunicorn, wait for every worker, then kill one and time its replacement"""
+    port = _free_port()
+    config_path = os.path.join(scratch, f"gunicorn-{'preload' if preload else 'plain'}.conf.py")
+    with open(os.path.join(BACKEND_DIR, 'gunicorn.conf.py'), encoding='utf-8') as source:
+        base_config = source.read()
+    with open(config_path, 'w', encoding='utf-8') as config:
+        config.write(base_config + READY_HOOK.format(preload=preload, workers=workers, port=port))
+
+    ready = []
+    ready_event = threading.Condition()
+    launched = time.time()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', config_path, 'app:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+
+    def read_log():
+        for line in process.stderr:
+            if line.startswith('WORKER-READY'):
+                _, pid, at = line.split()
+                with ready_event:
+                    ready.append((int(pid), float(at)))
+                    ready_event.notify_all()
+
+    threading.Thread(target=read_log, daemon=True).start()
+
+    def wait_for(count, timeout=60):
+        with ready_event:
+            if not ready_event.wait_for(lambda: len(ready) >= count, timeout=timeout):
+                raise RuntimeError(f'only {len(ready)} of {count} gunicorn workers became ready')
+            return list(ready)
+
+    try:
+        booted = wait_for(workers)
+        while True:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/api/health', timeout=5) as response:
+                    response.read()
+                break
+            except OSError:
+                time.sleep(0.01)
+        first_response = time.time() - launched
+
+        victim = booted[0][0]
+        killed_at = time.time()
+        os.kill(victim, signal.SIGKILL)
+        replacement = wait_for(workers + 1)[-1]
+
+        boot_times = sorted(at - launched for _, at in booted)
+        return {
+            'preload': preload,
+            'workers': workers,
+            'first_worker_ready_seconds': round(boot_times[0], 4),
+            'all_workers_ready_seconds': round(boot_times[-1], 4),
+            'first_response_seconds': round(first_response, 4),
+            'worker_restart_seconds': round(replacement[1] - killed_at, 4)
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure application import and worker startup time')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters for the import probe (default 5)')
+    parser.add_argument('--workers', type=int, default=4, help='Gunicorn workers (default 4)')
+    parser.add_argument('--no-gunicorn', action='store_true', help='Only run the import probe')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp(prefix='quiz-startup-')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(scratch, 'startup.db')}"
+    env['SUBMISSION_WRITE_BEHIND'] = 'false'
+    subprocess.run([sys.executable, 'migrate.py'], cwd=BACKEND_DIR, env=env,
+                   check=True, capture_output=True)
+
+    results = {'import': measure_import(env, args.runs), 'gunicorn': []}
+    if not args.no_gunicorn:
+        for preload in (False, True):
+            results['gunicorn'].append(measure_gunicorn(env, args.workers, preload, scratch))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    timings = results['import']
+    print(f"\n✅ Import probe (median of {args.runs} fresh interpreter(s))")
+    print(f"   - Process wall time: {timings['process_seconds'] * 1000:.0f} ms")
+    print(f"   - from app import app: {timings['import_seconds'] * 1000:.0f} ms")
+    print(f"   - First request (/api/health): {timings['first_request_seconds'] * 1000:.1f} ms")
+    print(f"   - First database request (/api/quizzes): {timings['first_db_request_seconds'] * 1000:.1f} ms")
+    for run in results['gunicorn']:
+        print(f"\n✅ Gunicorn, {run['workers']} worker(s), {'--preload' if run['preload'] else 'no preload'}")
+        print(f"   - First worker ready: {run['first_worker_ready_seconds'] * 1000:.0f} ms")
+        print(f"   - All workers ready: {run['all_workers_ready_seconds'] * 1000:.0f} ms")
+        print(f"   - First HTTP response: {run['first_response_seconds'] * 1000:.0f} ms")
+        print(f"   - Replacement after a worker crash: {run['worker_restart_seconds'] * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
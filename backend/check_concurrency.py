@@ -0,0 +1,134 @@
+"""
+Concurrency check: fire many quiz submissions at once from several worker
+processes (like gunicorn's) and report lock errors, latency and pool usage
+Run: python check_concurrency.py [--submits 200] [--workers 4] [--database-url URL]
+
+Metrics files and worker sockets go to a temporary directory, and without
+--database-url so does a scratch SQLite database, so the development database
+and instance/ are left untouched. Exits non-zero if any submission fails.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Parallel submit check against the database engine profile')
+    parser.add_argument('--submits', type=int, default=200, help='Total parallel submissions (default 200)')
+    parser.add_argument('--workers', type=int, default=4, help='Worker processes (default 4, as in the Procfile)')
+    parser.add_argument('--database-url', help='Database to test (default: scratch SQLite file)')
+    return parser.parse_args()
+
+
+def run_worker(count, quiz_id, answers, start_barrier, results):
+    """Submit ``count`` answers at once from one process"""
+    from app import app, init_worker
+    from models import db
+    import engine_profile
+
+    init_worker(app)  # Same per-fork setup as gunicorn's post_fork hook
+    client = app.test_client()
+    thread_barrier = threading.Barrier(count)
+
+    def submit(index):
+        thread_barrier.wait()
+        started = time.perf_counter()
+        response = client.post(
+            f'/api/submissions/quizzes/{quiz_id}/submit',
+            json={'name': f'Load {os.getpid()}-{index}', 'answers': answers}
+        )
+        body = response.get_json() or {}
+        return response.status_code, time.perf_counter() - started, body.get('message', '')
+
+    start_barrier.wait()
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        outcomes = list(executor.map(submit, range(count)))
+    with app.app_context():
+        pool = engine_profile.pool_status(db.engine)
+    results.put((outcomes, pool))
+
+
+def main():
+    args = parse_args()
+    scratch = tempfile.mkdtemp(prefix='quiz-concurrency-')
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(scratch, 'concurrency.db')}"
+    # Keep the run's metrics files and sockets out of instance/ (as tests/conftest.py does)
+    os.environ['METRICS_DIR'] = os.path.join(scratch, 'metrics')
+    os.environ['LIVE_BROKER_DIR'] = os.path.join(scratch, 'live')
+    os.environ['SUBMISSION_WRITE_BEHIND'] = 'false'
+
+    from app import app
+    from migrate import run_migrations
+    from models import db, Quiz, UserResponse
+    import seed
+    import seed_quizzes
+
+    if not run_migrations(app):
+        sys.exit(1)
+    if not args.database_url:
+        seed.create_admin()
+        seed_quizzes.seed_quizzes()
+
+    with app.app_context():
+        quiz = Quiz.query.filter_by(is_active=True).order_by(Quiz.id).first()
+        if quiz is None:
+            print("❌ No active quiz to submit against")
+            sys.exit(1)
+        quiz_id = quiz.id
+        answers = {str(q.id): q.correct_answer for q in quiz.questions}
+        before = UserResponse.query.filter_by(quiz_id=quiz_id).count()
+        db.engine.dispose()
+
+    context = multiprocessing.get_context('fork')
+    per_worker = [args.submits // args.workers + (1 if i < args.submits % args.workers else 0)
+                  for i in range(args.workers)]
+    start_barrier = context.Barrier(args.workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_worker, args=(count, quiz_id, answers, start_barrier, results))
+        for count in per_worker if count
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    outcomes = [outcome for worker_outcomes, _ in collected for outcome in worker_outcomes]
+    latencies = sorted(latency for _, latency, _ in outcomes)
+    succeeded = sum(1 for status, _, _ in outcomes if status == 200)
+    locked = [message for status, _, message in outcomes if 'database is locked' in message]
+    failed = [(status, message) for status, _, message in outcomes if status != 200]
+
+    with app.app_context():
+        stored = UserResponse.query.filter_by(quiz_id=quiz_id).count() - before
+
+    def percentile(fraction):
+        return latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000
+
+    print(f"\n{'✅' if not failed else '❌'} {succeeded} of {len(outcomes)} parallel submission(s) succeeded "
+          f"({args.workers} worker(s), {elapsed:.2f}s)")
+    print(f"   - Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    print(f"   - Rows stored: {stored}")
+    print(f"   - Lock errors: {len(locked)}")
+    print(f"   - Other failures: {len(failed) - len(locked)}")
+    print(f"   - Latency p50/p95/max: {percentile(0.5):.1f} / {percentile(0.95):.1f} / {latencies[-1] * 1000:.1f} ms")
+    for index, (_, pool) in enumerate(collected, start=1):
+        print(f"   - Worker {index} pool: {pool.get('checkouts', 0)} checkout(s), "
+              f"wait avg {pool.get('wait_seconds_avg', 0) * 1000:.1f} ms, "
+              f"max {pool.get('wait_seconds_max', 0) * 1000:.1f} ms, timeouts {pool.get('timeouts', 0)}")
+    for status, message in failed[:5]:
+        print(f"   - HTTP {status}: {message}")
+
+    sys.exit(1 if failed or stored != succeeded else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+gzip / brotli response compression negotiated from Accept-Encoding
+
+Text responses (JSON, NDJSON, CSV, plain text) of at least
+COMPRESS_MIN_SIZE bytes are compressed with the best encoding the client
+accepts: brotli when the optional ``brotli`` package is installed, else
+gzip. Streamed responses (exports) are compressed chunk by chunk as they
+are produced, so they keep streaming in constant memory. Server-sent
+event streams are never compressed: they must reach the client unbuffered.
+
+Compressed responses keep their ETag (it is derived from the resource
+version, not the bytes) and add ``Vary: Accept-Encoding`` so shared caches
+store each encoding separately.
+"""
+import gzip
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html'
+))
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 5
+DEFAULT_BROTLI_QUALITY = 4
+
+
+class Compressor:
+    """Per-app compression settings and the after_request hook"""
+
+    def __init__(self):
+        self.configure()
+
+    def configure(self, enabled=True, min_size=DEFAULT_MIN_SIZE, level=DEFAULT_LEVEL,
+                  brotli_quality=DEFAULT_BROTLI_QUALITY):
+        self.enabled = enabled
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+    def choose_encoding(self):
+        """The client's preferred encoding among those available, or None"""
+        return request.accept_encodings.best_match(self.encodings)
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    def compress_stream(self, chunks, encoding):
+        """Compress an iterable of str/bytes chunks as one stream"""
+        if encoding == 'br':
+            stream = brotli.Compressor(quality=self.brotli_quality)
+            compress, finish = stream.process, stream.finish
+        else:
+            stream = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+            compress, finish = stream.compress, stream.flush
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                compressed = compress(chunk)
+                if compressed:
+                    yield compressed
+            yield finish()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    def after_request(self, response):
+        if (
+            not self.enabled
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or 'no-transform' in response.headers.get('Cache-Control', '')
+        ):
+            return response
+
+        if response.is_streamed:
+            response.vary.add('Accept-Encoding')
+            encoding = self.choose_encoding()
+            if encoding is not None:
+                response.response = self.compress_stream(response.response, encoding)
+                response.headers['Content-Encoding'] = encoding
+                response.headers.pop('Content-Length', None)
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose_encoding()
+        if encoding is None:
+            return response
+        response.set_data(self.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+compressor = Compressor()
+
+
+def init_app(app):
+    """Compress responses (register after the other after_request hooks so timings include it)"""
+    compressor.configure(
+        enabled=app.config.get('RESPONSE_COMPRESSION', True),
+        min_size=app.config.get('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE),
+        level=app.config.get('COMPRESS_LEVEL', DEFAULT_LEVEL),
+        brotli_quality=app.config.get('BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+    )
+    app.after_request(compressor.after_request)
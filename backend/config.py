@@ -24,6 +24,24 @@ class Config:
         SQLALCHEMY_DATABASE_URI = 'sqlite:///quiz_app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Connection pool (defaults per database in engine_profile.py)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 0)) or None
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 0)) or None
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 0)) or None
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 0)) or None  # Seconds (PostgreSQL)
+    
+    # Per-request SQL profiling (see query_profile.py): Server-Timing header, an INFO
+    # log line per request, and a WARNING with statement fingerprints for requests
+    # over SLOW_REQUEST_QUERIES statements or SLOW_REQUEST_DB_MS of database time (0 = off)
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() in ('1', 'true', 'yes')
+    SQL_PROFILE_LOG = os.getenv('SQL_PROFILE_LOG', 'false').lower() in ('1', 'true', 'yes')
+    SLOW_REQUEST_QUERIES = int(os.getenv('SLOW_REQUEST_QUERIES', 0))
+    SLOW_REQUEST_DB_MS = float(os.getenv('SLOW_REQUEST_DB_MS', 0))
+    
+    # SQLite tuning (WAL journal and synchronous=NORMAL are always applied to file databases)
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 10000))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    
     # Secret keys
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret-key-change-in-production')
@@ -31,6 +49,72 @@ class Config:
     # JWT configuration
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))  # 1 hour default
     
+    # Authenticated user records cached per worker for JWT routes (see identity_cache.py)
+    IDENTITY_CACHE_TTL = float(os.getenv('IDENTITY_CACHE_TTL', 30))
+    IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 10000))
+    
+    # Password hashing: Werkzeug method string (cost), pool threads and how many
+    # more hashes may queue before logins get 503 (see passwords.py)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 32))
+    
+    # Compiled grading plans kept per worker (LRU, see grading.py)
+    GRADER_CACHE_SIZE = int(os.getenv('GRADER_CACHE_SIZE', 256))
+    
+    # Question-id pools of quizzes that draw questions per attempt, kept per worker (LRU, see sampling.py)
+    QUESTION_POOL_CACHE_SIZE = int(os.getenv('QUESTION_POOL_CACHE_SIZE', 256))
+    
+    # Seconds a worker serves a cached leaderboard before reloading it
+    LEADERBOARD_TTL = float(os.getenv('LEADERBOARD_TTL', 5))
+    
+    # Rows per multi-row INSERT (and per transaction) for bulk submission and roster loads
+    BATCH_INSERT_CHUNK_SIZE = int(os.getenv('BATCH_INSERT_CHUNK_SIZE', 1000))
+    
+    # Processes hashing passwords during roster imports (default: one per CPU)
+    ROSTER_HASH_PROCESSES = int(os.getenv('ROSTER_HASH_PROCESSES', 0)) or None
+    # At most this many for a roster uploaded to POST /api/auth/roster, which spawns them
+    # from a web worker (1 hashes in the request thread); use import_roster.py for large rosters
+    ROSTER_HTTP_HASH_PROCESSES = int(os.getenv('ROSTER_HTTP_HASH_PROCESSES', 2))
+    
+    # Write-behind submissions: journal locally, flush to the database in batches
+    SUBMISSION_WRITE_BEHIND = os.getenv('SUBMISSION_WRITE_BEHIND', 'false').lower() in ('1', 'true', 'yes')
+    SUBMISSION_JOURNAL_PATH = os.getenv('SUBMISSION_JOURNAL_PATH')  # Default: instance/submission_journal.db
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 0.5))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500))
+    WRITE_BEHIND_CLAIM_TIMEOUT = float(os.getenv('WRITE_BEHIND_CLAIM_TIMEOUT', 60))
+    
+    # Directory of the per-worker metrics files behind /api/metrics (default: instance/metrics)
+    METRICS_DIR = os.getenv('METRICS_DIR')
+    
+    # In-progress attempt drafts: per-worker LRU size, idle expiry (seconds),
+    # and at most DRAFT_FLUSH_BATCH drafts written every DRAFT_FLUSH_INTERVAL seconds
+    DRAFT_CACHE_SIZE = int(os.getenv('DRAFT_CACHE_SIZE', 10000))
+    DRAFT_TTL = float(os.getenv('DRAFT_TTL', 1800))
+    DRAFT_FLUSH_INTERVAL = float(os.getenv('DRAFT_FLUSH_INTERVAL', 5))
+    DRAFT_FLUSH_BATCH = int(os.getenv('DRAFT_FLUSH_BATCH', 500))
+    
+    # Live score streams (see live.py): at most one frame per quiz every LIVE_TICK_INTERVAL
+    # seconds, a refresh and keep-alive every LIVE_HEARTBEAT_INTERVAL, streams closed after
+    # LIVE_STREAM_TIMEOUT seconds (clients reconnect; 0 = never), LIVE_MAX_SUBSCRIBERS per worker
+    # (gunicorn.conf.py caps it below GUNICORN_THREADS unless the worker class is gevent)
+    LIVE_TICK_INTERVAL = float(os.getenv('LIVE_TICK_INTERVAL', 1))
+    LIVE_HEARTBEAT_INTERVAL = float(os.getenv('LIVE_HEARTBEAT_INTERVAL', 15))
+    LIVE_STREAM_TIMEOUT = float(os.getenv('LIVE_STREAM_TIMEOUT', 600))
+    LIVE_MAX_SUBSCRIBERS = int(os.getenv('LIVE_MAX_SUBSCRIBERS', 5000))
+    LIVE_LEADERBOARD_SIZE = int(os.getenv('LIVE_LEADERBOARD_SIZE', 10))
+    # Directory of the workers' notification sockets (default: instance/live; keep the path short)
+    LIVE_BROKER_DIR = os.getenv('LIVE_BROKER_DIR')
+    
+    # JSON encoder behind jsonify: 'orjson' (stdlib when orjson is not installed) or 'stdlib'
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    
+    # gzip/brotli compression of text responses of at least COMPRESS_MIN_SIZE bytes (see compression.py)
+    RESPONSE_COMPRESSION = os.getenv('RESPONSE_COMPRESSION', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 5))
+    BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+    
     # CORS configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:5173').split(',')
 
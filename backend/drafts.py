@@ -0,0 +1,344 @@
+"""
+Autosaved answers of in-progress attempts, coalesced in memory
+
+PATCH /api/quizzes/<id>/attempts/<attempt_id>/draft merges the client's
+answers into a per-worker LRU of drafts (DRAFT_CACHE_SIZE attempts, idle
+ones expire after DRAFT_TTL seconds). Saves only touch memory: a background
+thread writes the latest state of each changed draft to
+quiz_attempts.draft_answers every DRAFT_FLUSH_INTERVAL seconds, at most
+DRAFT_FLUSH_BATCH drafts per tick, so however often a client saves, an
+attempt costs at most one UPDATE per interval. Drafts evicted or expired
+while unsaved are kept aside and written first on the next tick.
+
+Flushes are last-writer-wins on the save time and skip submitted attempts,
+so a stale copy in another gunicorn worker never overwrites a newer draft
+or resurrects a finalized one; drafts of attempts found submitted (through
+another worker) are dropped after the flush, so later saves are refused.
+A draft only holds answers to its attempt's drawn questions. A worker that has no copy starts from the
+last flushed state; clients send their full answer map on every autosave,
+so nothing is lost when consecutive saves land on different workers.
+submit_quiz finalizes the draft: unsent draft answers are merged into the
+submission and the draft is cleared.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from sqlalchemy import bindparam, or_, update
+from models import db, QuizAttempt
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_TTL = 1800
+DEFAULT_FLUSH_INTERVAL = 5.0
+DEFAULT_FLUSH_BATCH = 500
+MAX_ANSWER_LENGTH = 500
+
+
+class DraftError(Exception):
+    """Invalid draft contents"""
+
+
+class Draft:
+    """One attempt's in-progress answers"""
+
+    __slots__ = ('quiz_id', 'user_id', 'token', 'question_ids', 'answers', 'revision', 'saved_at', 'touched')
+
+    def __init__(self, quiz_id, user_id, token, question_ids, answers=None, revision=0, saved_at=None):
+        self.quiz_id = quiz_id
+        self.user_id = user_id
+        self.token = token  # The attempt's, so cached saves check access without a query
+        self.question_ids = frozenset(str(question_id) for question_id in question_ids)
+        # Drafts saved before answers were checked may hold other questions' ids
+        self.answers = {key: value for key, value in (answers or {}).items() if key in self.question_ids}
+        self.revision = revision
+        self.saved_at = saved_at
+        self.touched = time.monotonic()
+
+    def to_dict(self):
+        return {
+            'answers': dict(self.answers),
+            'revision': self.revision,
+            'saved_at': self.saved_at.isoformat() if self.saved_at else None
+        }
+
+    def snapshot(self):
+        """to_dict plus what access checks need"""
+        return dict(self.to_dict(), quiz_id=self.quiz_id, user_id=self.user_id, token=self.token)
+
+
+def validate_changes(changes):
+    """Check a PATCH body's answers: {question_id: answer string or None (clear)}"""
+    if not isinstance(changes, dict):
+        raise DraftError('answers must be an object of question_id: answer')
+    for key, value in changes.items():
+        if not str(key).isdigit():
+            raise DraftError(f'Invalid question id: {key}')
+        if value is not None and (not isinstance(value, str) or len(value) > MAX_ANSWER_LENGTH):
+            raise DraftError(f'Answer for question {key} must be a string of at most {MAX_ANSWER_LENGTH} characters')
+
+
+class DraftStore:
+    """Thread-safe LRU of drafts keyed by attempt id, with TTL expiry and a flusher thread"""
+
+    def __init__(self):
+        self._drafts = OrderedDict()  # attempt_id -> Draft, least recently used first
+        self._dirty = OrderedDict()  # attempt_id -> None, oldest unsaved change first
+        self._evicted = {}  # attempt_id -> Draft dropped from the LRU before it was flushed
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.app = None
+        self.configure()
+
+    def configure(self, max_size=DEFAULT_CACHE_SIZE, ttl=DEFAULT_TTL,
+                  flush_interval=DEFAULT_FLUSH_INTERVAL, flush_batch=DEFAULT_FLUSH_BATCH):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.saves = 0
+        self.rows_flushed = 0
+        self.failed_flushes = 0
+        self.last_error = None
+
+    # Cache
+
+    def _expired(self, draft, now):
+        return now - draft.touched > self.ttl
+
+    def _evict(self, attempt_id):
+        """Drop a draft from the LRU (lock held), keeping it aside if unsaved"""
+        draft = self._drafts.pop(attempt_id)
+        if attempt_id in self._dirty:
+            del self._dirty[attempt_id]
+            self._evicted[attempt_id] = draft
+
+    def _lookup(self, attempt_id, now):
+        """The live draft (lock held), reviving an unsaved evicted one"""
+        draft = self._drafts.get(attempt_id)
+        if draft is not None and self._expired(draft, now):
+            self._evict(attempt_id)
+            draft = None
+        if draft is None:
+            draft = self._evicted.pop(attempt_id, None)
+            if draft is None:
+                return None
+            self._drafts[attempt_id] = draft
+            self._dirty[attempt_id] = None
+        self._drafts.move_to_end(attempt_id)
+        return draft
+
+    def _sweep(self, now):
+        """Evict expired drafts and the least recently used ones over the limit (lock held)"""
+        while self._drafts:
+            attempt_id, draft = next(iter(self._drafts.items()))
+            if len(self._drafts) <= self.max_size and not self._expired(draft, now):
+                break
+            self._evict(attempt_id)
+
+    def get(self, attempt_id):
+        """Snapshot {quiz_id, user_id, token, answers, revision, saved_at} of a cached draft, or None"""
+        with self._lock:
+            draft = self._lookup(attempt_id, time.monotonic())
+            if draft is None:
+                return None
+            return draft.snapshot()
+
+    def reconcile(self, attempt_id, stored):
+        """
+        Snapshot of the newer of the cached draft and ``stored`` (a Draft read
+        from quiz_attempts, possibly flushed by another worker since this
+        worker cached its copy); a stale cached copy is replaced.
+        """
+        with self._lock:
+            draft = self._lookup(attempt_id, time.monotonic())
+            if draft is None:
+                return stored.snapshot()
+            if stored.saved_at is None or (draft.saved_at is not None and draft.saved_at >= stored.saved_at):
+                return draft.snapshot()
+            self._drafts[attempt_id] = stored
+            self._dirty.pop(attempt_id, None)
+            return stored.snapshot()
+
+    def save(self, attempt_id, changes, seed=None):
+        """
+        Merge ``changes`` into the attempt's draft; ``seed`` (a Draft loaded
+        from quiz_attempts) is used when the draft is not cached.
+
+        Returns the draft's snapshot, or None when it is not cached and no
+        seed was given. Raises DraftError when a change is for a question
+        the attempt did not draw.
+        """
+        self.ensure_started()
+        now = time.monotonic()
+        with self._lock:
+            draft = self._lookup(attempt_id, now)
+            if draft is None:
+                if seed is None:
+                    return None
+                draft = self._drafts[attempt_id] = seed
+            for key in changes:
+                if str(key) not in draft.question_ids:
+                    raise DraftError(f'Question {key} is not part of this attempt')
+            answers = dict(draft.answers)
+            for key, value in changes.items():
+                if value is None:
+                    answers.pop(str(key), None)
+                else:
+                    answers[str(key)] = value
+            draft.answers = answers
+            draft.revision += 1
+            draft.saved_at = datetime.utcnow()
+            draft.touched = now
+            self._dirty[attempt_id] = None
+            self.saves += 1
+            self._sweep(now)
+            return draft.snapshot()
+
+    def finalize(self, attempt_id):
+        """Forget an attempt's draft (it was submitted); returns its answers or None"""
+        with self._lock:
+            draft = self._drafts.pop(attempt_id, None) or self._evicted.pop(attempt_id, None)
+            self._dirty.pop(attempt_id, None)
+            self._evicted.pop(attempt_id, None)
+            return draft.answers if draft is not None else None
+
+    def clear(self):
+        with self._lock:
+            self._drafts.clear()
+            self._dirty.clear()
+            self._evicted.clear()
+
+    # Flushing
+
+    def ensure_started(self):
+        """Start the flusher thread in this process if it is not running"""
+        if self.app is None:
+            return
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='draft-flusher', daemon=True)
+            self._thread.start()
+
+    def stop(self, drain=True):
+        """Stop the flusher, optionally writing every unsaved draft"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+        if drain and self.app is not None:
+            try:
+                while self.flush_once():
+                    pass
+            except Exception as e:
+                self.failed_flushes += 1
+                self.last_error = str(e)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush_once()
+            except Exception as e:
+                self.failed_flushes += 1
+                self.last_error = str(e)
+
+    def _take_batch(self):
+        """Up to flush_batch unsaved drafts, evicted ones first (lock held)"""
+        self._sweep(time.monotonic())
+        batch = []
+        while self._evicted and len(batch) < self.flush_batch:
+            attempt_id, draft = self._evicted.popitem()
+            batch.append((attempt_id, draft, draft.revision))
+        while self._dirty and len(batch) < self.flush_batch:
+            attempt_id, _ = self._dirty.popitem(last=False)
+            draft = self._drafts[attempt_id]
+            batch.append((attempt_id, draft, draft.revision))
+        return batch
+
+    def flush_once(self):
+        """Write one batch of unsaved drafts; returns the number written"""
+        with self._lock:
+            batch = self._take_batch()
+        if not batch:
+            return 0
+        rows = [
+            {
+                'attempt_id': attempt_id,
+                'new_answers': dict(draft.answers),
+                'new_revision': revision,
+                'new_saved_at': draft.saved_at
+            }
+            for attempt_id, draft, revision in batch
+        ]
+        table = QuizAttempt.__table__
+        statement = update(table).where(
+            table.c.id == bindparam('attempt_id'),
+            table.c.submitted_at.is_(None),
+            or_(table.c.draft_saved_at.is_(None), table.c.draft_saved_at <= bindparam('new_saved_at'))
+        ).values(
+            draft_answers=bindparam('new_answers'),
+            draft_revision=bindparam('new_revision'),
+            draft_saved_at=bindparam('new_saved_at')
+        )
+        with self.app.app_context():
+            try:
+                db.session.execute(statement, rows)
+                db.session.commit()
+                # Submitted through another worker: the UPDATE skipped them
+                submitted = [attempt_id for (attempt_id,) in db.session.query(QuizAttempt.id).filter(
+                    QuizAttempt.id.in_([attempt_id for attempt_id, _, _ in batch]),
+                    QuizAttempt.submitted_at.is_not(None)
+                )]
+                db.session.rollback()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    # Still unsaved: retried on the next tick
+                    for attempt_id, draft, _ in batch:
+                        if attempt_id in self._drafts:
+                            self._dirty[attempt_id] = None
+                        else:
+                            self._evicted.setdefault(attempt_id, draft)
+                raise
+        for attempt_id in submitted:
+            self.finalize(attempt_id)
+        self.rows_flushed += len(rows)
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._drafts),
+                'max_size': self.max_size,
+                'unsaved': len(self._dirty) + len(self._evicted),
+                'saves': self.saves,
+                'rows_flushed': self.rows_flushed,
+                'failed_flushes': self.failed_flushes,
+                'last_error': self.last_error
+            }
+
+
+draft_store = DraftStore()
+
+
+def init_app(app):
+    """Configure the draft store; its flusher starts with the first save in each worker"""
+    draft_store.app = app
+    draft_store.configure(
+        max_size=app.config.get('DRAFT_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+        ttl=app.config.get('DRAFT_TTL', DEFAULT_TTL),
+        flush_interval=app.config.get('DRAFT_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+        flush_batch=app.config.get('DRAFT_FLUSH_BATCH', DEFAULT_FLUSH_BATCH)
+    )
+    atexit.register(draft_store.stop)
@@ -0,0 +1,169 @@
+"""
+Database engine profile: connection pooling, SQLite tuning and pool statistics
+
+init_app must run before db.init_app: it fills SQLALCHEMY_ENGINE_OPTIONS
+for the configured database.
+
+PostgreSQL gets a sized QueuePool with pre-ping and recycling, so
+connections dropped by the server or a proxy are replaced transparently.
+
+SQLite file databases get a small pool whose connections are switched to
+WAL with synchronous=NORMAL, a busy timeout and memory-mapped reads on
+connect. WAL lets the gunicorn workers read while one of them writes, and
+the busy timeout makes writers queue for the lock instead of failing with
+"database is locked".
+
+Both use ProfiledQueuePool, which records how long checkouts wait for a
+connection; pool_status() reports it next to the pool's live counters.
+"""
+import sqlite3
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# PostgreSQL
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 20
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_POOL_RECYCLE = 1800
+
+# SQLite (one writer at a time, so a larger pool only adds lock waiters)
+DEFAULT_SQLITE_POOL_SIZE = 5
+DEFAULT_SQLITE_MAX_OVERFLOW = 10
+DEFAULT_SQLITE_BUSY_TIMEOUT_MS = 10000
+DEFAULT_SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+# PRAGMAs applied to every new SQLite connection (set by init_app)
+_sqlite_pragmas = {}
+
+# Called with the pool each time a checkout times out (see on_checkout_timeout)
+_timeout_listeners = []
+
+
+def on_checkout_timeout(listener):
+    """
+    Call ``listener(pool)`` whenever a ProfiledQueuePool checkout times out
+
+    SQLAlchemy has no pool event for timeouts. The listener is kept at module
+    level, so it also covers the pool that replaces the engine's after dispose().
+    """
+    if listener not in _timeout_listeners:
+        _timeout_listeners.append(listener)
+
+
+class ProfiledQueuePool(QueuePool):
+    """QueuePool that records checkout wait times and timeouts"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            for listener in _timeout_listeners:
+                listener(self)
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                if waited > self.wait_seconds_max:
+                    self.wait_seconds_max = waited
+
+
+@event.listens_for(ProfiledQueuePool, 'connect')
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection) or not _sqlite_pragmas:
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _sqlite_pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def _is_sqlite_memory(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """Engine options for the database in ``config['SQLALCHEMY_DATABASE_URI']``"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+
+    if backend == 'sqlite':
+        if _is_sqlite_memory(url):
+            return {}  # In-memory databases keep SQLAlchemy's single-connection pool
+        busy_timeout_ms = config.get('SQLITE_BUSY_TIMEOUT_MS', DEFAULT_SQLITE_BUSY_TIMEOUT_MS)
+        return {
+            'poolclass': ProfiledQueuePool,
+            'pool_size': config.get('DB_POOL_SIZE') or DEFAULT_SQLITE_POOL_SIZE,
+            'max_overflow': config.get('DB_MAX_OVERFLOW') or DEFAULT_SQLITE_MAX_OVERFLOW,
+            'pool_timeout': config.get('DB_POOL_TIMEOUT') or DEFAULT_POOL_TIMEOUT,
+            # The driver's own busy handler, so waits also cover connect-time PRAGMAs
+            'connect_args': {'timeout': busy_timeout_ms / 1000}
+        }
+
+    return {
+        'poolclass': ProfiledQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE') or DEFAULT_POOL_SIZE,
+        'max_overflow': config.get('DB_MAX_OVERFLOW') or DEFAULT_MAX_OVERFLOW,
+        'pool_timeout': config.get('DB_POOL_TIMEOUT') or DEFAULT_POOL_TIMEOUT,
+        'pool_recycle': config.get('DB_POOL_RECYCLE') or DEFAULT_POOL_RECYCLE,
+        'pool_pre_ping': True,
+        # Reuse the most recently returned connection so idle ones can be recycled
+        'pool_use_lifo': True
+    }
+
+
+def init_app(app):
+    """Fill SQLALCHEMY_ENGINE_OPTIONS (explicit settings win) and the SQLite PRAGMAs"""
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    _sqlite_pragmas.clear()
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and not _is_sqlite_memory(url):
+        _sqlite_pragmas.update({
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': app.config.get('SQLITE_BUSY_TIMEOUT_MS', DEFAULT_SQLITE_BUSY_TIMEOUT_MS),
+            'mmap_size': app.config.get('SQLITE_MMAP_SIZE', DEFAULT_SQLITE_MMAP_SIZE)
+        })
+
+
+def pool_status(engine):
+    """Live pool counters plus checkout wait statistics"""
+    pool = engine.pool
+    data = {'dialect': engine.dialect.name, 'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        data.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0)
+        })
+    if isinstance(pool, ProfiledQueuePool):
+        with pool._stats_lock:
+            checkouts = pool.checkouts
+            data.update({
+                'checkouts': checkouts,
+                'wait_seconds_avg': round(pool.wait_seconds_total / checkouts, 6) if checkouts else 0.0,
+                'wait_seconds_max': round(pool.wait_seconds_max, 6),
+                'timeouts': pool.timeouts
+            })
+    return data
@@ -0,0 +1,53 @@
+"""
+Write quizzes and their questions to a question bank file
+Run: python export_questions.py <file> [--format csv|ndjson] [--quiz-id N ...]
+
+The file can be loaded again with import_questions.py.
+"""
+import argparse
+import sys
+import time
+from app import app
+from exports import YIELD_PER, iter_csv, iter_ndjson
+from question_bank import BANK_FIELDS, bank_statement, iter_bank_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export quizzes and questions as a question bank')
+    parser.add_argument('file', help='Output file ("-" for stdout)')
+    parser.add_argument('--format', choices=('csv', 'ndjson'),
+                        help='Bank format (default: csv for .csv files, otherwise NDJSON)')
+    parser.add_argument('--quiz-id', type=int, action='append', default=None,
+                        help='Only export this quiz (repeatable)')
+    args = parser.parse_args()
+
+    bank_format = args.format or ('csv' if args.file.lower().endswith('.csv') else 'ndjson')
+
+    started = time.perf_counter()
+    exported = 0
+
+    def counted(rows):
+        nonlocal exported
+        for row in rows:
+            exported += 1
+            yield row
+
+    with app.app_context():
+        target = sys.stdout if args.file == '-' else open(args.file, 'w', encoding='utf-8', newline='')
+        try:
+            bank = counted(iter_bank_rows(bank_statement(args.quiz_id), YIELD_PER))
+            chunks = iter_csv(bank, BANK_FIELDS) if bank_format == 'csv' else iter_ndjson(bank)
+            for chunk in chunks:
+                target.write(chunk)
+        finally:
+            if target is not sys.stdout:
+                target.close()
+
+    if target is not sys.stdout:
+        print(f"✅ Exported question bank to {args.file}")
+        print(f"   - Questions: {exported}")
+        print(f"   - Elapsed: {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
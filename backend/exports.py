@@ -0,0 +1,67 @@
+"""
+Streaming NDJSON/CSV export helpers
+
+Each helper turns an iterator of plain dicts into an iterator of encoded
+text chunks, so a Flask response can stream rows straight from a
+server-side cursor without materializing the result set.
+"""
+import csv
+import io
+import json
+from flask import Response, stream_with_context
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+# Rows fetched per round trip from the server-side cursor
+YIELD_PER = 1000
+
+
+def _json_default(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def iter_ndjson(rows):
+    """Yield one JSON document per row, newline-terminated"""
+    for row in rows:
+        yield json.dumps(row, default=_json_default, separators=(',', ':')) + '\n'
+
+
+def iter_csv(rows, fieldnames):
+    """
+    Yield a CSV header followed by one line per row.
+
+    Values that are lists or dicts (e.g. answers, options) are written as
+    JSON so the file round-trips.
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({
+            key: json.dumps(value, separators=(',', ':'))
+            if isinstance(value, (dict, list)) else
+            (value.isoformat() if hasattr(value, 'isoformat') else value)
+            for key, value in row.items()
+        })
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    remainder = buffer.getvalue()
+    if remainder:
+        yield remainder
+
+
+def export_response(rows, export_format, filename, fieldnames):
+    """Build a streaming attachment response for ``rows`` in the given format"""
+    if export_format == 'csv':
+        body = iter_csv(rows, fieldnames)
+    else:
+        body = iter_ndjson(rows)
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
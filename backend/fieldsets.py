@@ -0,0 +1,66 @@
+"""
+Sparse fieldsets: ?fields= trims the dictionaries an endpoint returns
+
+``?fields=id,title,questions.id,questions.question_text`` keeps those keys
+of each top-level object and, for ``questions``, of each nested object.
+A name without a dot keeps the whole value. Unknown names are ignored.
+The to_dict methods take the parsed tree so that values nobody asked for
+(such as a quiz's questions) are never built.
+"""
+
+
+def parse_fields(value):
+    """
+    Parse a ?fields= value into a tree: {name: None (whole value) or subtree}.
+
+    Returns None when the parameter is absent; raises ValueError when it
+    names no field or has an empty path segment.
+    """
+    if value is None:
+        return None
+    tree = {}
+    for path in value.split(','):
+        path = path.strip()
+        if not path:
+            continue
+        names = path.split('.')
+        if not all(names):
+            raise ValueError(f'Invalid field: {path}')
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                break  # The whole value is already requested
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    if not tree:
+        raise ValueError('fields must name at least one field')
+    return tree
+
+
+def wants(fields, name):
+    """True if ``name`` is part of the response"""
+    return fields is None or name in fields
+
+
+def subfields(fields, name):
+    """The subtree requested for ``name`` (None: everything)"""
+    return None if fields is None else fields.get(name)
+
+
+def pick(data, fields):
+    """Keep the requested keys of a dict, recursing into nested dicts and lists of dicts"""
+    if fields is None:
+        return data
+    picked = {}
+    for name, subtree in fields.items():
+        if name not in data:
+            continue
+        value = data[name]
+        if subtree is not None:
+            if isinstance(value, dict):
+                value = pick(value, subtree)
+            elif isinstance(value, list):
+                value = [pick(item, subtree) if isinstance(item, dict) else item for item in value]
+        picked[name] = value
+    return picked
@@ -0,0 +1,222 @@
+"""
+Compiled grading plans and the per-process grader cache
+
+A GradingPlan is a quiz's answer key (the persisted Question.answer_key
+values) plus one normalizer per question, so grading a submission is a loop
+of string compares. Plans are cached per
+worker in a bounded LRU keyed by quiz id and tagged with the quiz's version
+stamp: a worker only reuses a plan while the version in the database still
+matches, so edits made through any gunicorn worker are picked up by all.
+"""
+import threading
+from collections import OrderedDict, namedtuple
+import numpy as np
+from models import Question, NORMALIZERS, TYPE_CODES, TYPE_UNKNOWN, normalize_answer
+
+DEFAULT_CACHE_SIZE = 256
+
+CompiledQuestion = namedtuple('CompiledQuestion', [
+    'id', 'key', 'question_text', 'question_type', 'correct_answer', 'answer_key', 'normalize', 'points',
+    'option_keys'
+])
+
+
+class GradingPlan:
+    """Immutable, pre-normalized answer key for one version of a quiz"""
+
+    __slots__ = ('quiz_id', 'version', 'questions', 'total_points', 'pool', '_by_id')
+
+    def __init__(self, quiz_id, version, questions, pool=None):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.questions = tuple(questions)
+        self.total_points = sum(q.points for q in self.questions)
+        self.pool = pool  # The whole-quiz plan this one was cut from (see subset)
+        self._by_id = None
+
+    @classmethod
+    def compile(cls, quiz_id, version, questions):
+        """Build a plan from Question rows, in the quiz's question order"""
+        compiled = []
+        for q in questions:
+            type_code = q.type_code or TYPE_CODES.get(q.question_type, TYPE_UNKNOWN)
+            answer_key = q.answer_key
+            if answer_key is None:
+                answer_key = normalize_answer(q.question_type, q.correct_answer)
+            normalize = NORMALIZERS.get(type_code)
+            # Normalized option -> position in q.options (first one wins on duplicates)
+            option_keys = {}
+            if normalize is not None and isinstance(q.options, list):
+                for index, option in enumerate(q.options):
+                    option_keys.setdefault(normalize(option), index)
+            compiled.append(CompiledQuestion(
+                id=q.id,
+                key=str(q.id),
+                question_text=q.question_text,
+                question_type=q.question_type,
+                correct_answer=q.correct_answer,
+                answer_key=answer_key,
+                normalize=normalize,
+                points=q.points,
+                option_keys=option_keys
+            ))
+        return cls(quiz_id, version, compiled)
+
+    def subset(self, question_ids):
+        """
+        Plan for the questions drawn for one attempt, in the given order.
+
+        Ids that are no longer part of the quiz are skipped. Built from the
+        cached plan in O(len(question_ids)).
+        """
+        if self._by_id is None:
+            self._by_id = {q.id: q for q in self.questions}
+        by_id = self._by_id
+        return GradingPlan(
+            self.quiz_id, self.version, (by_id[qid] for qid in question_ids if qid in by_id), pool=self
+        )
+
+    def grade(self, answers):
+        """
+        Grade a {question_id: answer} mapping.
+
+        Returns (earned_points, total_points, results) with the same results
+        shape and the same comparison rules as Question.check_answer.
+        """
+        earned_points = 0
+        results = {}
+
+        for q in self.questions:
+            user_answer = answers.get(q.key) or answers.get(q.id)
+            is_correct = (
+                user_answer is not None
+                and q.normalize is not None
+                and q.normalize(user_answer) == q.answer_key
+            )
+
+            if is_correct:
+                earned_points += q.points
+
+            results[q.id] = {
+                'question_id': q.id,
+                'question_text': q.question_text,
+                'question_type': q.question_type,
+                'user_answer': user_answer,
+                'correct_answer': q.correct_answer,
+                'is_correct': is_correct,
+                'points': q.points,
+                'earned_points': q.points if is_correct else 0
+            }
+
+        return earned_points, self.total_points, results
+
+    def normalize_matrix(self, answer_dicts):
+        """
+        Normalize many {question_id: answer} mappings into a dense matrix.
+
+        Returns (given, answered): an (n_submissions, n_questions) object
+        matrix of normalized answers and a boolean mask of answered cells.
+        """
+        n_rows, n_questions = len(answer_dicts), len(self.questions)
+        given = np.empty((n_rows, n_questions), dtype=object)
+        answered = np.zeros((n_rows, n_questions), dtype=bool)
+
+        for i, answers in enumerate(answer_dicts):
+            for j, q in enumerate(self.questions):
+                user_answer = answers.get(q.key) or answers.get(q.id)
+                if user_answer is not None:
+                    given[i, j] = q.normalize(user_answer) if q.normalize else None
+                    answered[i, j] = True
+
+        return given, answered
+
+    def grade_matrix(self, answer_dicts, normalized=None):
+        """
+        Grade many {question_id: answer} mappings at once.
+
+        The normalized answer matrix is compared against the answer-key row
+        in one vectorized operation. ``normalized`` may pass a precomputed
+        normalize_matrix result. Returns (correct, scores): a boolean matrix
+        and an int64 score vector.
+        """
+        given, answered = normalized if normalized is not None else self.normalize_matrix(answer_dicts)
+
+        keys = np.array([q.answer_key for q in self.questions], dtype=object)
+        gradable = np.array([q.normalize is not None for q in self.questions], dtype=bool)
+
+        correct = (given == keys) & answered & gradable
+        scores = correct.astype(np.int64) @ self.points_vector()
+        return correct, scores
+
+    def points_vector(self):
+        """Question points as an int64 vector, in question order"""
+        return np.array([q.points for q in self.questions], dtype=np.int64)
+
+
+class GraderCache:
+    """Thread-safe LRU of GradingPlans keyed by quiz id"""
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, quiz_id, version):
+        """Return the cached plan for this quiz version, or None"""
+        with self._lock:
+            plan = self._plans.get(quiz_id)
+            if plan is None or plan.version != version:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(quiz_id)
+            self.hits += 1
+            return plan
+
+    def put(self, plan):
+        """Store a plan, evicting the least recently used ones over the limit"""
+        with self._lock:
+            current = self._plans.get(plan.quiz_id)
+            if current is not None and current.version > plan.version:
+                return  # A newer plan was compiled concurrently; keep it
+            self._plans[plan.quiz_id] = plan
+            self._plans.move_to_end(plan.quiz_id)
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+
+    def invalidate(self, quiz_id):
+        """Drop this worker's plan for a quiz (other workers see the version change)"""
+        with self._lock:
+            self._plans.pop(quiz_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._plans),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+grader_cache = GraderCache()
+
+
+def init_app(app):
+    """Size the process-wide grader cache from app config"""
+    grader_cache.max_size = app.config.get('GRADER_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+
+def get_grading_plan(quiz_id, version):
+    """Return a compiled plan for the quiz version, loading questions only on a miss"""
+    plan = grader_cache.get(quiz_id, version)
+    if plan is None:
+        questions = Question.query.filter_by(quiz_id=quiz_id).order_by(Question.id).all()
+        plan = GradingPlan.compile(quiz_id, version, questions)
+        grader_cache.put(plan)
+    return plan
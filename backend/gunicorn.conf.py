@@ -0,0 +1,45 @@
+"""
+Gunicorn settings for production
+Run: gunicorn -c gunicorn.conf.py app:app
+
+The application is imported once in the master (preload_app) and the
+workers fork from it, so a worker boot or a restart after a crash costs a
+fork instead of a full import. Migrations are not run here; see migrate.py.
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 4))
+# Threads per worker (gthread), so a login waiting on the password hashing
+# pool does not hold up other requests in the same worker
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = True
+# 'gevent' (pip install gevent) serves each connection on a greenlet instead of
+# a thread: use it for an instance dedicated to the live score streams (see
+# live.py), which stay open; with gthread every stream holds one of the threads
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+if worker_class == 'gevent':
+    # Patch before the preloaded application creates its locks, threads and sockets
+    from gevent import monkey
+    monkey.patch_all()
+else:
+    # Every live stream holds a thread for as long as it is open: serve at most half
+    # of them (default) and never all of them, so spectators cannot starve the API.
+    # Read by config.py, which the preloaded application imports after this file
+    live_streams = int(os.getenv('LIVE_MAX_SUBSCRIBERS', threads // 2))
+    os.environ['LIVE_MAX_SUBSCRIBERS'] = str(max(min(live_streams, threads - 1), 0))
+
+
+def on_starting(server):
+    """Start /api/metrics from zero: drop the previous run's worker files"""
+    import app  # Configures the metrics directory (already imported when preloading)
+    import metrics
+    metrics.metrics.reset()
+
+
+def post_fork(server, worker):
+    """Give each forked worker its own database connections and background threads"""
+    from app import app, init_worker
+    init_worker(app)
@@ -0,0 +1,62 @@
+"""
+Conditional GET helpers (ETag / Last-Modified) for versioned resources
+"""
+import hashlib
+from datetime import timezone
+from flask import request, make_response
+
+# Clients may keep a copy but must revalidate it on every use; the response
+# differs for admins (answers included), so caches must key on Authorization.
+CACHE_CONTROL = 'no-cache'
+VARY = 'Authorization'
+
+
+def quiz_etag(quiz_id, version, include_answers=False, fields=None):
+    """Strong ETag for one quiz version, visibility variant and ?fields= selection"""
+    variant = 'admin' if include_answers else 'public'
+    if fields is None:
+        return f'quiz-{quiz_id}-v{version}-{variant}'
+    digest = hashlib.sha1(fields.encode('utf-8')).hexdigest()[:16]
+    return f'quiz-{quiz_id}-v{version}-{variant}-{digest}'
+
+
+def collection_etag(name, version, variant, params=None):
+    """Strong ETag for a collection version, variant and query parameters"""
+    digest = hashlib.sha1(repr(sorted((params or {}).items())).encode('utf-8')).hexdigest()[:16]
+    return f'{name}-v{version}-{variant}-{digest}'
+
+
+def _http_timestamp(value):
+    """Naive UTC datetime -> aware datetime truncated to HTTP-date precision"""
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    True if the current request's validators match the resource.
+
+    If-None-Match takes precedence over If-Modified-Since, as in RFC 9110.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    last_modified = _http_timestamp(last_modified)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag, Last-Modified and revalidation headers to a response"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_timestamp(last_modified)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.vary.add(VARY)
+    return response
+
+
+def not_modified_response(etag, last_modified=None):
+    """Empty 304 response carrying the current validators"""
+    return with_validators(make_response('', 304), etag, last_modified)
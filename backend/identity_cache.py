@@ -0,0 +1,135 @@
+"""
+Per-worker TTL/LRU cache of authenticated users
+
+Registered as Flask-JWT-Extended's user lookup, so every @jwt_required
+route gets the token's user as ``flask_jwt_extended.current_user`` (a
+read-only CachedUser) and admin checks use the stored role rather than the
+one baked into the token. Repeated requests with the same token, such as
+clients polling /api/auth/me, are answered without a database round trip.
+
+Entries are dropped when the User row is updated or deleted through the
+ORM in this worker; changes made by other workers are picked up when the
+entry expires after IDENTITY_CACHE_TTL seconds.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import jsonify
+from flask_jwt_extended import get_current_user, verify_jwt_in_request
+from sqlalchemy import event
+from models import db, User
+
+DEFAULT_TTL = 30.0
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class CachedUser(namedtuple('CachedUser', 'id username email role created_at')):
+    """Read-only snapshot of a User row"""
+    __slots__ = ()
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def to_dict(self, include_email=False):
+        return User.to_dict(self, include_email=include_email)
+
+
+class IdentityCache:
+    """Thread-safe LRU of user id -> (expires_at, CachedUser)"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        """Return the CachedUser for ``user_id`` (None if it does not exist)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        row = db.session.query(
+            User.id, User.username, User.email, User.role, User.created_at
+        ).filter(User.id == user_id).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        user = CachedUser(*row)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_user(mapper, connection, target):
+    identity_cache.invalidate(target.id)
+
+
+def _load_user(jwt_header, jwt_data):
+    try:
+        user_id = int(jwt_data['sub'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return identity_cache.get(user_id)
+
+
+def _user_not_found(jwt_header, jwt_data):
+    return jsonify({'error': 'User not found'}), 404
+
+
+def optional_user():
+    """
+    The caller's CachedUser on a public route, or None
+
+    Verifies the request's token when it has one (routes that are not
+    @jwt_required must, or get_jwt() never sees it); a missing, expired or
+    invalid token is served as an anonymous caller.
+    """
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_current_user()
+    except Exception:
+        return None
+
+
+def init_app(app, jwt):
+    """Configure the cache and register it as the JWT user lookup"""
+    identity_cache.ttl = app.config.get('IDENTITY_CACHE_TTL', DEFAULT_TTL)
+    identity_cache.max_entries = app.config.get('IDENTITY_CACHE_SIZE', DEFAULT_MAX_ENTRIES)
+    jwt.user_lookup_loader(_load_user)
+    jwt.user_lookup_error_loader(_user_not_found)
@@ -0,0 +1,73 @@
+"""
+Create quizzes and questions in bulk from a question bank
+Run: python import_questions.py <file> [--format csv|ndjson] [--quiz-id N] [--owner admin] [--chunk-size N] [--report report.json]
+
+Bank rows (see question_bank.py, or export_questions.py for an example):
+quiz_ref,quiz_title,quiz_description,quiz_is_active,quiz_draw_count,quiz_draw_by,question_text,question_type,options,correct_answer,points,tag
+"""
+import argparse
+import json
+import sys
+from app import app
+from models import User
+from question_bank import BankImportError, import_question_bank, iter_bank
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-create quizzes and questions from a question bank')
+    parser.add_argument('file', help='CSV, JSON array or NDJSON bank ("-" for stdin)')
+    parser.add_argument('--format', choices=('csv', 'ndjson'),
+                        help='Bank format (default: csv for .csv files, otherwise JSON/NDJSON)')
+    parser.add_argument('--quiz-id', type=int, default=None,
+                        help='Append every question to this existing quiz instead of creating quizzes')
+    parser.add_argument('--owner', default='admin', help='Username recorded as the creator of new quizzes')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Rows per multi-row INSERT and commit (default: BATCH_INSERT_CHUNK_SIZE)')
+    parser.add_argument('--report', help='Write the full report to this JSON file')
+    args = parser.parse_args()
+
+    bank_format = args.format or ('csv' if args.file.lower().endswith('.csv') else 'ndjson')
+
+    with app.app_context():
+        owner = User.query.filter_by(username=args.owner).first()
+        if owner is None:
+            print(f"❌ User '{args.owner}' not found")
+            sys.exit(1)
+
+        chunk_size = args.chunk_size or app.config['BATCH_INSERT_CHUNK_SIZE']
+        source = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8', newline='')
+        try:
+            report = import_question_bank(
+                iter_bank(source, bank_format), owner.id, chunk_size=chunk_size, into_quiz_id=args.quiz_id
+            )
+        except BankImportError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+    for item in report['errors']:
+        print(f"   - Row {item['row']}: {item['error']}")
+    if report['errors_truncated']:
+        print(f"   - ... {report['failed'] - len(report['errors'])} more")
+    for quiz in report['quizzes_created']:
+        if 'error' in quiz:
+            print(f"   - Quiz {quiz['quiz_ref']}: {quiz['error']}")
+
+    print(f"\n✅ Imported {report['inserted']} of {report['received']} question(s)")
+    print(f"   - Quizzes created: {len(report['quizzes_created'])}")
+    print(f"   - Invalid rows: {report['failed']}")
+    print(f"   - Elapsed: {report['elapsed_seconds']}s ({report['rows_per_second']} rows/sec)")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"   - Report written to {args.report}")
+
+    if report['failed']:
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
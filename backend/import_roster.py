@@ -0,0 +1,60 @@
+"""
+Create student accounts in bulk from a CSV or NDJSON roster
+Run: python import_roster.py <file> [--format csv|ndjson] [--chunk-size N] [--processes N] [--report report.json]
+
+CSV rosters need a header row: username,email,password[,role]
+"""
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk-create user accounts from a roster file')
+    parser.add_argument('file', help='CSV, JSON array or NDJSON roster ("-" for stdin)')
+    parser.add_argument('--format', choices=('csv', 'ndjson'),
+                        help='Roster format (default: csv for .csv files, otherwise JSON/NDJSON)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Rows per uniqueness check and multi-row INSERT (default: BATCH_INSERT_CHUNK_SIZE)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Password hashing processes (default: ROSTER_HASH_PROCESSES or one per CPU)')
+    parser.add_argument('--report', help='Write the full per-row report to this JSON file')
+    args = parser.parse_args()
+
+    # Imported here so the hashing processes (spawned) do not build the app
+    from app import app
+    from roster import import_roster, iter_roster
+
+    roster_format = args.format or ('csv' if args.file.lower().endswith('.csv') else 'ndjson')
+
+    with app.app_context():
+        chunk_size = args.chunk_size or app.config['BATCH_INSERT_CHUNK_SIZE']
+        processes = args.processes or app.config.get('ROSTER_HASH_PROCESSES')
+        source = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8', newline='')
+        try:
+            report = import_roster(iter_roster(source, roster_format), chunk_size=chunk_size, processes=processes)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+    for item in report['results']:
+        if 'error' in item:
+            print(f"   - Row {item['row']}: {item['error']}")
+
+    print(f"\n✅ Created {report['created']} of {report['received']} account(s)")
+    print(f"   - Conflicts: {report['conflicts']}")
+    print(f"   - Invalid rows: {report['failed']}")
+    print(f"   - Password hashing: {report['hash_method']} across {report['hash_processes']} process(es)")
+    print(f"   - Elapsed: {report['elapsed_seconds']}s ({report['rows_per_second']} rows/sec)")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"   - Report written to {args.report}")
+
+    if report['conflicts'] or report['failed']:
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
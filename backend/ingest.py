@@ -0,0 +1,238 @@
+"""
+Bulk submission ingestion shared by the batch endpoint and ingest_submissions.py
+
+Records are read from a JSON array or an NDJSON stream, graded a chunk at a
+time against the quiz's compiled grading plan, and written with one
+multi-row INSERT plus one quiz-stats increment (and one commit) per chunk.
+"""
+import csv
+import json
+import time
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import insert
+from models import db, Quiz, User, UserResponse
+from grading import get_grading_plan
+from sampling import reject_pooled
+from quiz_stats import StatsDelta, apply_delta
+from leaderboard import leaderboard_cache
+import live
+import response_answers
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+class IngestError(ValueError):
+    """Raised for problems that abort a whole batch (e.g. unknown quiz)"""
+
+
+def iter_records(lines, key='submissions'):
+    """
+    Yield (row_number, record, error) from an iterable of text lines.
+
+    The input may be a JSON array (optionally wrapped as {key: [...]}) or
+    NDJSON with one object per line. NDJSON is parsed line by line, so
+    arbitrarily large files stream in constant memory.
+    """
+    lines = iter(lines)
+    for first in lines:
+        if first.strip():
+            break
+    else:
+        return
+
+    try:
+        head = json.loads(first)
+    except ValueError:
+        head = None  # Not a complete line on its own: a multi-line document
+
+    if head is None or isinstance(head, list) or (isinstance(head, dict) and key in head):
+        text = first + ''.join(lines) if head is None else None
+        if text is not None:
+            try:
+                head = json.loads(text)
+            except ValueError:
+                # Not a JSON document either; report it line by line as NDJSON
+                yield from _iter_ndjson(text.splitlines())
+                return
+        payload = head.get(key) if isinstance(head, dict) else head
+        if not isinstance(payload, list):
+            yield 1, None, f'Expected a JSON array of {key}'
+            return
+        for row, record in enumerate(payload, start=1):
+            yield row, record, None
+        return
+
+    yield 1, head, None
+    yield from _iter_ndjson(lines, start=2)
+
+
+def iter_csv_records(lines):
+    """Yield (row_number, record, error) from CSV lines with a header row"""
+    reader = csv.DictReader(lines)
+    for row, record in enumerate(reader, start=1):
+        if None in record:
+            yield row, None, 'Too many columns'
+        else:
+            yield row, record, None
+
+
+def _iter_ndjson(lines, start=1):
+    row = start - 1
+    for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, json.loads(line), None
+        except ValueError as e:
+            yield row, None, f'Invalid JSON: {e}'
+
+
+def _parse_record(record):
+    """Validate one submission record; returns (fields, error)"""
+    if not isinstance(record, dict):
+        return None, 'Submission must be a JSON object'
+
+    answers = record.get('answers')
+    if not answers or not isinstance(answers, dict):
+        return None, 'No answers provided'
+
+    name = record.get('name') or ''
+    if not isinstance(name, str):
+        return None, 'name must be a string'
+
+    user_id = record.get('user_id')
+    if user_id is not None and (not isinstance(user_id, int) or isinstance(user_id, bool)):
+        return None, 'user_id must be an integer'
+
+    submitted_at = record.get('submitted_at')
+    if submitted_at is not None:
+        try:
+            submitted_at = datetime.fromisoformat(str(submitted_at))
+        except ValueError:
+            return None, 'submitted_at must be an ISO 8601 timestamp'
+
+    return {
+        'answers': answers,
+        'participant_name': name.strip() or None,
+        'user_id': user_id,
+        'submitted_at': submitted_at
+    }, None
+
+
+def ingest_submissions(quiz_id, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Grade and store many submissions for one quiz.
+
+    ``records`` is an iterable of (row_number, record, error) tuples as
+    produced by iter_records. Returns a report with per-row scores or errors
+    and the overall throughput.
+    """
+    quiz = db.session.query(Quiz.version, Quiz.draw_count).filter(Quiz.id == quiz_id).first()
+    if quiz is None:
+        raise IngestError('Quiz not found')
+    # Rows carry no attempt, so there is no drawn question set to grade them against
+    reject_pooled(quiz.draw_count, 'Batch ingest')
+
+    plan = get_grading_plan(quiz_id, quiz.version)
+    chunk_size = max(1, int(chunk_size))
+    started = time.perf_counter()
+    results = []
+    inserted = 0
+    graded = answers_graded = answers_correct = 0
+    records = iter(records)
+
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+
+        valid = []
+        for row, record, error in chunk:
+            fields = None
+            if error is None:
+                fields, error = _parse_record(record)
+            if error:
+                results.append({'row': row, 'error': error})
+            else:
+                valid.append((row, fields))
+
+        # One IN query per chunk instead of letting a missing user fail the whole INSERT
+        user_ids = {fields['user_id'] for _, fields in valid if fields['user_id'] is not None}
+        if user_ids:
+            known = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(user_ids))}
+            unknown = user_ids - known
+            if unknown:
+                results.extend(
+                    {'row': row, 'error': f"Unknown user_id {fields['user_id']}"}
+                    for row, fields in valid if fields['user_id'] in unknown
+                )
+                valid = [(row, fields) for row, fields in valid if fields['user_id'] not in unknown]
+
+        if not valid:
+            continue
+
+        answer_dicts = [fields['answers'] for _, fields in valid]
+        normalized = plan.normalize_matrix(answer_dicts)
+        correct, scores = plan.grade_matrix(answer_dicts, normalized=normalized)
+        graded += len(valid)
+        answers_graded += correct.size
+        answers_correct += int(correct.sum())
+        now = datetime.utcnow()
+        mappings = [
+            {
+                'user_id': fields['user_id'],
+                'quiz_id': quiz_id,
+                'participant_name': fields['participant_name'],
+                'answers': fields['answers'],
+                'score': int(score),
+                'total_points': plan.total_points,
+                'submitted_at': fields['submitted_at'] or now
+            }
+            for (_, fields), score in zip(valid, scores)
+        ]
+
+        try:
+            ids = db.session.scalars(
+                insert(UserResponse).returning(UserResponse.id, sort_by_parameter_order=True),
+                mappings
+            ).all()
+            response_answers.insert_rows(response_answers.matrix_rows(plan, ids, *normalized, correct))
+            delta = StatsDelta(quiz_id, [q.id for q in plan.questions])
+            delta.add_matrix(scores, plan.total_points, correct)
+            apply_delta(delta, plan.version)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            results.extend({'row': row, 'error': f'Insert failed: {e}'} for row, _ in valid)
+            continue
+
+        inserted += len(ids)
+        for (row, _), submission_id, mapping in zip(valid, ids, mappings):
+            results.append({
+                'row': row,
+                'submission_id': submission_id,
+                'score': mapping['score'],
+                'total_points': plan.total_points
+            })
+
+    if inserted:
+        leaderboard_cache.invalidate(quiz_id)
+        live.publish(quiz_id)
+    
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda item: item['row'])
+    failed = sum(1 for item in results if 'error' in item)
+    return {
+        'quiz_id': quiz_id,
+        'received': len(results),
+        'inserted': inserted,
+        'failed': failed,
+        'graded': graded,
+        'answers_graded': answers_graded,
+        'answers_correct': answers_correct,
+        'elapsed_seconds': round(elapsed, 4),
+        'rows_per_second': round(len(results) / elapsed, 1) if elapsed > 0 else None,
+        'results': results
+    }
@@ -0,0 +1,53 @@
+"""
+Bulk-load quiz submissions from a JSON array or NDJSON file
+Run: python ingest_submissions.py <quiz_id> <file> [--chunk-size N] [--report report.json]
+"""
+import argparse
+import json
+import sys
+from app import app
+from ingest import IngestError, ingest_submissions, iter_records
+from sampling import PooledQuizError
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Grade and store many submissions for one quiz')
+    parser.add_argument('quiz_id', type=int, help='Quiz to submit against')
+    parser.add_argument('file', help='JSON array or NDJSON file of submissions ("-" for stdin)')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Rows per multi-row INSERT (default: BATCH_INSERT_CHUNK_SIZE)')
+    parser.add_argument('--report', help='Write the full per-row report to this JSON file')
+    args = parser.parse_args()
+
+    with app.app_context():
+        chunk_size = args.chunk_size or app.config['BATCH_INSERT_CHUNK_SIZE']
+        source = sys.stdin if args.file == '-' else open(args.file, encoding='utf-8')
+        try:
+            report = ingest_submissions(args.quiz_id, iter_records(source), chunk_size=chunk_size)
+        except (IngestError, PooledQuizError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+    for item in report['results']:
+        if 'error' in item:
+            print(f"   - Row {item['row']}: {item['error']}")
+
+    print(f"\n✅ Ingested {report['inserted']} of {report['received']} submission(s) "
+          f"for quiz {report['quiz_id']}")
+    print(f"   - Failed: {report['failed']}")
+    print(f"   - Elapsed: {report['elapsed_seconds']}s ({report['rows_per_second']} rows/sec)")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"   - Report written to {args.report}")
+
+    if report['failed']:
+        sys.exit(2)
+
+
+if __name__ == '__main__':
+    main()
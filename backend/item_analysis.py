@@ -0,0 +1,221 @@
+"""
+Psychometric item analysis over stored quiz responses
+
+Responses are streamed from user_responses in yield_per partitions, turned
+into a dense (submissions x questions) correctness matrix with the quiz's
+GradingPlan (the same normalizers as Question.check_answer and live
+grading) and folded into additive sufficient statistics:
+
+    n, sum(x_j), sum(X), sum(X^2), sum(x_j * X), MCQ option counts
+
+where x_j is 1 when item j is correct and X is the total score. Difficulty,
+corrected point-biserial discrimination and Cronbach's alpha follow from
+those sums, so the state never grows with the number of submissions.
+
+The state is stored per quiz in item_analyses together with the quiz version
+and the highest response id folded in. A later run for the same version
+only streams newer responses; a new quiz version starts over.
+
+Ids are allocated before commit, so a response can become visible after a
+higher id was already folded in. The state therefore also lists the folded
+ids of the trailing RESCAN_WINDOW ids below the watermark (``recent_ids``,
+every folded id above ``recent_after``): each run re-reads from
+``recent_after`` and skips those, picking up responses that committed late.
+"""
+from datetime import datetime
+import numpy as np
+from sqlalchemy import select
+from models import db, Quiz, Question, UserResponse, ItemAnalysis
+from grading import get_grading_plan
+from sampling import reject_pooled
+
+YIELD_PER = 5000
+RESCAN_WINDOW = 10000  # Ids below the watermark that may still be committing
+OTHER_OPTION = '(other)'
+
+
+class ItemAccumulator:
+    """Additive item statistics for one GradingPlan"""
+
+    def __init__(self, plan, options_by_question, state=None):
+        self.plan = plan
+        self.points = plan.points_vector().astype(np.float64)
+        size = len(plan.questions)
+        # Distractor counts only for multiple choice questions with options
+        self.options = {
+            j: [str(option).strip() for option in options_by_question.get(q.id) or []]
+            for j, q in enumerate(plan.questions)
+            if q.question_type == 'multiple_choice'
+        }
+        if state is None:
+            self.n = 0
+            self.sum_x = np.zeros(size)
+            self.sum_total = 0.0
+            self.sum_total_sq = 0.0
+            self.sum_x_total = np.zeros(size)
+            self.answered = np.zeros(size)
+            self.option_counts = {j: {} for j in self.options}
+        else:
+            self.n = state['n']
+            self.sum_x = np.array(state['sum_x'], dtype=np.float64)
+            self.sum_total = state['sum_total']
+            self.sum_total_sq = state['sum_total_sq']
+            self.sum_x_total = np.array(state['sum_x_total'], dtype=np.float64)
+            self.answered = np.array(state['answered'], dtype=np.float64)
+            self.option_counts = {int(j): counts for j, counts in state['option_counts'].items()}
+
+    def to_state(self):
+        return {
+            'n': self.n,
+            'sum_x': self.sum_x.tolist(),
+            'sum_total': self.sum_total,
+            'sum_total_sq': self.sum_total_sq,
+            'sum_x_total': self.sum_x_total.tolist(),
+            'answered': self.answered.tolist(),
+            'option_counts': {str(j): counts for j, counts in self.option_counts.items()}
+        }
+
+    def add(self, answer_dicts):
+        """Fold in a chunk of {question_id: answer} mappings"""
+        if not answer_dicts:
+            return
+        given, answered = self.plan.normalize_matrix(answer_dicts)
+        correct, _ = self.plan.grade_matrix(answer_dicts, normalized=(given, answered))
+        x = correct.astype(np.float64)
+        total = x @ self.points
+
+        self.n += len(answer_dicts)
+        self.sum_x += x.sum(axis=0)
+        self.sum_total += float(total.sum())
+        self.sum_total_sq += float(total @ total)
+        self.sum_x_total += total @ x
+        self.answered += answered.sum(axis=0)
+
+        for j, options in self.options.items():
+            counts = self.option_counts[j]
+            valid = set(options)
+            column = given[answered[:, j], j]
+            values, frequencies = np.unique(column.astype(str), return_counts=True)
+            for value, frequency in zip(values.tolist(), frequencies.tolist()):
+                key = value if value in valid else OTHER_OPTION
+                counts[key] = counts.get(key, 0) + frequency
+
+    def result(self):
+        """Difficulty, discrimination, distractors and reliability from the sums"""
+        n = self.n
+        items = []
+        alpha = None
+        mean_total = std_total = None
+
+        if n:
+            w = self.points
+            p = self.sum_x / n
+            mean_total = self.sum_total / n
+            var_total = max(self.sum_total_sq / n - mean_total ** 2, 0.0)
+            std_total = var_total ** 0.5
+
+            # Corrected point-biserial: item vs. total score without the item
+            var_x = p * (1 - p)
+            mean_rest = mean_total - w * p
+            e_x_rest = (self.sum_x_total - w * self.sum_x) / n
+            e_rest_sq = (self.sum_total_sq - 2 * w * self.sum_x_total + w * w * self.sum_x) / n
+            var_rest = np.maximum(e_rest_sq - mean_rest ** 2, 0.0)
+            cov = e_x_rest - p * mean_rest
+            denominator = np.sqrt(var_x * var_rest)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                discrimination = np.where(denominator > 0, cov / denominator, np.nan)
+
+            k = len(w)
+            item_var_sum = float((w * w * var_x).sum())
+            if k > 1 and var_total > 0:
+                alpha = k / (k - 1) * (1 - item_var_sum / var_total)
+
+            for j, q in enumerate(self.plan.questions):
+                item = {
+                    'question_id': q.id,
+                    'question_type': q.question_type,
+                    'points': q.points,
+                    'difficulty': round(float(p[j]), 4),
+                    'discrimination': (
+                        None if np.isnan(discrimination[j]) else round(float(discrimination[j]), 4)
+                    ),
+                    'answered': int(self.answered[j])
+                }
+                if j in self.options:
+                    counts = self.option_counts[j]
+                    item['distractors'] = [
+                        {'option': option, 'count': counts.get(option, 0), 'is_correct': option == q.answer_key}
+                        for option in self.options[j]
+                    ] + [{'option': OTHER_OPTION, 'count': counts.get(OTHER_OPTION, 0), 'is_correct': False}]
+                    item['blank'] = n - int(self.answered[j])
+                items.append(item)
+
+        return {
+            'quiz_id': self.plan.quiz_id,
+            'quiz_version': self.plan.version,
+            'submission_count': n,
+            'mean_score': round(mean_total, 4) if mean_total is not None else None,
+            'score_stddev': round(std_total, 4) if std_total is not None else None,
+            'cronbach_alpha': round(alpha, 4) if alpha is not None else None,
+            'items': items
+        }
+
+
+def analyze_quiz(quiz_id, refresh=False):
+    """
+    Return the item analysis for a quiz, folding in responses added since
+    the cached run (or recomputing from scratch when the quiz version
+    changed or ``refresh`` is set). Commits the updated cache row.
+    """
+    quiz = db.session.query(Quiz.version, Quiz.draw_count).filter(Quiz.id == quiz_id).first()
+    if quiz is None:
+        raise ValueError('Quiz not found')
+    # Each response answers only its drawn questions: the test-score statistics
+    # would count every other question in the pool as answered wrong
+    reject_pooled(quiz.draw_count, 'Item analysis')
+
+    cached = db.session.get(ItemAnalysis, quiz_id)
+    incremental = cached is not None and not refresh and cached.quiz_version == quiz.version
+    if incremental:
+        # States saved before recent_ids existed resume at the watermark itself
+        folded = set(cached.state.get('recent_ids', ()))
+        start_after = cached.state.get('recent_after', cached.last_response_id)
+    else:
+        folded = set()
+        start_after = 0
+
+    latest_id, pending = db.session.query(
+        db.func.max(UserResponse.id), db.func.count(UserResponse.id)
+    ).filter(UserResponse.quiz_id == quiz_id, UserResponse.id > start_after).one()
+    latest_id = max(latest_id or 0, cached.last_response_id if incremental else 0)
+    if incremental and pending == len(folded):
+        return cached.result
+
+    plan = get_grading_plan(quiz_id, quiz.version)
+    options_by_question = dict(db.session.query(Question.id, Question.options).filter(
+        Question.quiz_id == quiz_id, Question.question_type == 'multiple_choice'
+    ))
+    accumulator = ItemAccumulator(plan, options_by_question, cached.state if incremental else None)
+
+    statement = select(UserResponse.id, UserResponse.answers).where(
+        UserResponse.quiz_id == quiz_id,
+        UserResponse.id > start_after,
+        UserResponse.id <= latest_id
+    ).order_by(UserResponse.id).execution_options(yield_per=YIELD_PER)
+    recent_after = max(start_after, latest_id - RESCAN_WINDOW)
+    recent_ids = []
+    for partition in db.session.execute(statement).partitions():
+        accumulator.add([answers or {} for response_id, answers in partition if response_id not in folded])
+        recent_ids.extend(response_id for response_id, _ in partition if response_id > recent_after)
+
+    result = accumulator.result()
+    if cached is None:
+        cached = ItemAnalysis(quiz_id=quiz_id)
+        db.session.add(cached)
+    cached.quiz_version = quiz.version
+    cached.last_response_id = latest_id
+    cached.state = {**accumulator.to_state(), 'recent_after': recent_after, 'recent_ids': recent_ids}
+    cached.result = result
+    cached.computed_at = datetime.utcnow()
+    db.session.commit()
+    return result
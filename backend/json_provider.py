@@ -0,0 +1,69 @@
+"""
+Pluggable JSON provider for jsonify / request.get_json
+
+JSON_PROVIDER selects the encoder: 'orjson' (the default) serializes with
+orjson when it is installed, 'stdlib' keeps Flask's json-module provider.
+OrjsonProvider produces the same documents as Flask's provider (keys
+sorted when ``sort_keys`` is set, datetimes as HTTP dates, the same
+``default`` hook) except that non-ASCII text is written as UTF-8 rather
+than escaped. Anything orjson cannot encode (e.g. integers beyond 64 bits)
+falls back to the stdlib encoder, as do callers passing json.dumps keyword
+arguments.
+"""
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib provider is used instead
+    orjson = None
+
+PROVIDERS = ('orjson', 'stdlib')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding"""
+
+    def _options(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def _encode(self, obj, indent=False):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._options(indent))
+        except TypeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            encoded = self._encode(obj)
+            if encoded is not None:
+                return encoded.decode('utf-8')
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        encoded = self._encode(obj, indent)
+        if encoded is None:
+            return super().response(obj)
+        return self._app.response_class(encoded + b'\n', mimetype=self.mimetype)
+
+
+def init_app(app):
+    """Install the configured JSON provider on the app"""
+    provider = app.config.get('JSON_PROVIDER', 'orjson')
+    if provider not in PROVIDERS:
+        raise ValueError(f"JSON_PROVIDER must be one of: {', '.join(PROVIDERS)}")
+    if provider == 'orjson' and orjson is not None:
+        app.json = OrjsonProvider(app)
+    else:
+        app.json = DefaultJSONProvider(app)
@@ -0,0 +1,136 @@
+"""
+Per-quiz leaderboards served from a short-TTL in-process cache
+
+Entries are ordered by score (highest first), then submission time and id
+(earliest first), matching the ix_user_responses_quiz_score index, so
+loading the top N is an index range scan. submit_quiz offers each new
+submission to the cached board of its worker, which inserts it in place
+when it qualifies; other workers pick it up when their entry expires.
+"""
+import bisect
+import threading
+import time
+from sqlalchemy import and_, func, or_
+from models import db, UserResponse
+
+DEFAULT_TTL = 5.0
+MAX_ENTRIES = 100
+
+
+def _sort_key(entry):
+    return (-entry['score'], entry['submitted_at'], entry['submission_id'])
+
+
+def entry_for(row):
+    """Leaderboard entry for a UserResponse (or a row with the same columns)"""
+    return {
+        'submission_id': row.id,
+        'participant_name': row.participant_name,
+        'user_id': row.user_id,
+        'score': row.score,
+        'total_points': row.total_points,
+        'submitted_at': row.submitted_at
+    }
+
+
+def load_top(quiz_id, limit):
+    """Top ``limit`` submissions for a quiz, straight from the database"""
+    rows = db.session.query(
+        UserResponse.id, UserResponse.participant_name, UserResponse.user_id,
+        UserResponse.score, UserResponse.total_points, UserResponse.submitted_at
+    ).filter(UserResponse.quiz_id == quiz_id).order_by(
+        UserResponse.score.desc(), UserResponse.submitted_at.asc(), UserResponse.id.asc()
+    ).limit(limit).all()
+    return [entry_for(row) for row in rows]
+
+
+def rank_of(quiz_id, score, submitted_at, submission_id):
+    """1-based rank of a submission: one COUNT over the index range ahead of it"""
+    ahead = db.session.query(func.count(UserResponse.id)).filter(
+        UserResponse.quiz_id == quiz_id,
+        or_(
+            UserResponse.score > score,
+            and_(UserResponse.score == score, UserResponse.submitted_at < submitted_at),
+            and_(
+                UserResponse.score == score,
+                UserResponse.submitted_at == submitted_at,
+                UserResponse.id < submission_id
+            )
+        )
+    ).scalar()
+    return ahead + 1
+
+
+class LeaderboardCache:
+    """Thread-safe map of quiz id -> (expires_at, ordered top entries)"""
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._boards = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def top(self, quiz_id, limit):
+        """Return the top ``limit`` entries, reloading the board if it expired"""
+        now = time.monotonic()
+        with self._lock:
+            board = self._boards.get(quiz_id)
+            if board is not None and board[0] > now:
+                self.hits += 1
+                return list(board[1][:limit])
+            self.misses += 1
+
+        entries = load_top(quiz_id, self.max_entries)
+        with self._lock:
+            self._boards[quiz_id] = (now + self.ttl, entries)
+        return entries[:limit]
+
+    def offer(self, quiz_id, entry):
+        """Insert a new submission into a cached board if it makes the cut"""
+        with self._lock:
+            board = self._boards.get(quiz_id)
+            if board is None:
+                return
+            expires_at, entries = board
+            key = _sort_key(entry)
+            if len(entries) >= self.max_entries and key >= _sort_key(entries[-1]):
+                return
+            position = bisect.bisect_right([_sort_key(e) for e in entries], key)
+            entries = entries[:position] + [entry] + entries[position:]
+            self._boards[quiz_id] = (expires_at, entries[:self.max_entries])
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            self._boards.pop(quiz_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {'boards': len(self._boards), 'hits': self.hits, 'misses': self.misses}
+
+
+leaderboard_cache = LeaderboardCache()
+
+
+def init_app(app):
+    """Configure the process-wide leaderboard cache from app config"""
+    leaderboard_cache.ttl = app.config.get('LEADERBOARD_TTL', DEFAULT_TTL)
+
+
+def offer_submission(quiz_id, entry):
+    """Offer a freshly committed submission's entry to its quiz's cached leaderboard"""
+    leaderboard_cache.offer(quiz_id, entry)
+
+
+def to_dict(entry, rank):
+    """Serialize a leaderboard entry with its rank"""
+    return {
+        'rank': rank,
+        'submission_id': entry['submission_id'],
+        'participant_name': entry['participant_name'],
+        'user_id': entry['user_id'],
+        'score': entry['score'],
+        'total_points': entry['total_points'],
+        'submitted_at': entry['submitted_at'].isoformat() if entry['submitted_at'] else None
+    }
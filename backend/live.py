@@ -0,0 +1,382 @@
+"""
+Live quiz scores pushed to spectators as server-sent events
+
+GET /api/quizzes/<id>/live subscribes to a quiz's channel in the worker
+that serves it. Submissions do not send anything to subscribers directly:
+publish() only marks the quiz's channel changed, in this worker and (via
+LiveBroker) in every other worker that has subscribers. A ticker thread
+per worker wakes every LIVE_TICK_INTERVAL seconds, reads one snapshot of
+each changed quiz (submission count from quiz_stats and the top
+LIVE_LEADERBOARD_SIZE entries, two indexed reads), encodes it as a single
+SSE frame and wakes the quiz's subscribers, who all write that same bytes
+object. A burst of submissions therefore costs one snapshot and one frame
+per tick and worker, however many submissions or subscribers there are.
+
+Subscribers keep no queue: a slow client simply skips to the newest frame,
+so an idle connection costs its generator and a wait on the channel's
+condition (see bench_live.py), plus its worker thread with the gthread
+worker class or a greenlet with gevent. Channels are also refreshed every
+LIVE_HEARTBEAT_INTERVAL seconds, which catches changes whose notification
+was dropped (batch ingests, deletions, a full peer socket) and sends a
+keep-alive comment so dead connections are noticed.
+"""
+import atexit
+import os
+import socket
+import threading
+import time
+from models import db, QuizStats
+import leaderboard
+
+DEFAULT_TICK_INTERVAL = 1.0
+DEFAULT_HEARTBEAT_INTERVAL = 15.0
+DEFAULT_STREAM_TIMEOUT = 600.0
+DEFAULT_MAX_SUBSCRIBERS = 5000
+DEFAULT_LEADERBOARD_SIZE = 10
+RECONNECT_MS = 3000
+KEEP_ALIVE = b': keep-alive\n\n'
+SOCKET_PREFIX = 'live-'
+SOCKET_SUFFIX = '.sock'
+
+
+class LiveFull(Exception):
+    """This worker already serves LIVE_MAX_SUBSCRIBERS streams"""
+
+
+def snapshot(quiz_id, size):
+    """What subscribers of a quiz see: its submission count and leaderboard"""
+    count = db.session.query(QuizStats.attempt_count).filter(QuizStats.quiz_id == quiz_id).scalar()
+    entries = leaderboard.load_top(quiz_id, size)
+    return {
+        'quiz_id': quiz_id,
+        'submissions': count or 0,
+        'leaderboard': [leaderboard.to_dict(entry, rank) for rank, entry in enumerate(entries, start=1)]
+    }
+
+
+class LiveBroker:
+    """
+    Change notifications between the workers of one host
+
+    A local stand-in for a pub/sub broker: each worker with subscribers
+    binds a UNIX datagram socket in ``directory`` and publishing sends the
+    quiz id to every socket there. Sends never block; a notification a
+    busy worker cannot take is counted as dropped and picked up by that
+    worker's next heartbeat refresh. Sockets of exited workers are removed
+    when a send to them is refused.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.on_message = None
+        self._socket = None
+        self._path = None
+        self._sender = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    def configure(self, directory, on_message):
+        self.directory = directory
+        self.on_message = on_message
+
+    def bind(self):
+        """Start receiving notifications in this process"""
+        if self._pid == os.getpid() and self._socket is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._socket is not None:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f'{SOCKET_PREFIX}{os.getpid()}{SOCKET_SUFFIX}')
+            if os.path.exists(path):
+                os.unlink(path)
+            receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receiver.bind(path)
+            self._socket, self._path, self._pid = receiver, path, os.getpid()
+            threading.Thread(target=self._receive, args=(receiver,), name='live-broker', daemon=True).start()
+
+    def close(self):
+        if self._socket is not None and self._pid == os.getpid():
+            self._socket.close()
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass
+        self._socket = self._path = None
+
+    def _receive(self, receiver):
+        while True:
+            try:
+                message = receiver.recv(64)
+            except OSError:
+                return  # Closed
+            self.received += 1
+            try:
+                quiz_id = int(message)
+            except ValueError:
+                continue
+            self.on_message(quiz_id)
+
+    def _sending_socket(self):
+        if self._sender is None or self._sender[0] != os.getpid():
+            sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sender.setblocking(False)
+            self._sender = (os.getpid(), sender)
+        return self._sender[1]
+
+    def publish(self, quiz_id):
+        """Notify every other bound worker that a quiz changed"""
+        if self.directory is None:
+            return
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return  # No worker has subscribers yet
+        message = str(quiz_id).encode()
+        own = os.path.basename(self._path) if self._pid == os.getpid() and self._path else None
+        sender = None
+        for name in names:
+            if name == own or not (name.startswith(SOCKET_PREFIX) and name.endswith(SOCKET_SUFFIX)):
+                continue
+            if sender is None:
+                sender = self._sending_socket()
+            path = os.path.join(self.directory, name)
+            try:
+                sender.sendto(message, path)
+                self.sent += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Left behind by a worker that exited
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            except OSError:
+                self.dropped += 1  # Receiver's buffer is full
+
+
+class Channel:
+    """The latest frame of one quiz, shared by its subscribers in this worker"""
+
+    __slots__ = ('quiz_id', 'subscribers', 'condition', 'payload', 'frame', 'sequence', 'dirty', 'built_at')
+
+    def __init__(self, quiz_id):
+        self.quiz_id = quiz_id
+        self.subscribers = 0
+        self.condition = threading.Condition()
+        self.payload = None
+        self.frame = None
+        self.sequence = 0
+        self.dirty = False
+        self.built_at = 0.0
+
+
+class LiveBroadcaster:
+    """Per-worker quiz channels, their subscribers and the ticker thread that refreshes them"""
+
+    def __init__(self):
+        self._channels = {}  # quiz_id -> Channel with at least one subscriber
+        self._subscribers = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self.app = None
+        self.broker = LiveBroker()
+        self.configure()
+
+    def configure(self, tick_interval=DEFAULT_TICK_INTERVAL, heartbeat_interval=DEFAULT_HEARTBEAT_INTERVAL,
+                  stream_timeout=DEFAULT_STREAM_TIMEOUT, max_subscribers=DEFAULT_MAX_SUBSCRIBERS,
+                  leaderboard_size=DEFAULT_LEADERBOARD_SIZE):
+        self.tick_interval = tick_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stream_timeout = stream_timeout
+        self.max_subscribers = max_subscribers
+        self.leaderboard_size = leaderboard_size
+        self.events = 0
+        self.frames = 0
+        self.rejected = 0
+        self.failed_ticks = 0
+        self.last_error = None
+
+    # Subscribers
+
+    def join(self, quiz_id):
+        """
+        Subscribe to a quiz and return its channel (call from a request:
+        the first subscriber of a quiz in this worker builds its first frame)
+        """
+        self.ensure_started()
+        with self._lock:
+            if self._subscribers >= self.max_subscribers:
+                self.rejected += 1
+                raise LiveFull(f'At most {self.max_subscribers} live streams per worker')
+            channel = self._channels.get(quiz_id)
+            if channel is None:
+                channel = self._channels[quiz_id] = Channel(quiz_id)
+            channel.subscribers += 1
+            self._subscribers += 1
+        if channel.frame is None:
+            try:
+                self._refresh(channel)
+            except Exception:
+                self.leave(channel)
+                raise
+        return channel
+
+    def leave(self, channel):
+        """Unsubscribe (once per join)"""
+        with self._lock:
+            channel.subscribers -= 1
+            self._subscribers -= 1
+            if channel.subscribers == 0 and self._channels.get(channel.quiz_id) is channel:
+                del self._channels[channel.quiz_id]
+
+    def stream(self, channel):
+        """
+        SSE body for a joined channel: every new frame, or a keep-alive after
+        heartbeat_interval idle seconds. Ends after stream_timeout seconds
+        (the browser reconnects, possibly to a less busy worker). The caller
+        leaves the channel when the response is closed, which also happens
+        when the client goes away or the body is never iterated.
+        """
+        deadline = time.monotonic() + self.stream_timeout if self.stream_timeout else None
+        seen = 0
+        yield f'retry: {RECONNECT_MS}\n\n'.encode()
+        while not self._stopping.is_set():
+            with channel.condition:
+                if channel.sequence == seen:
+                    channel.condition.wait(self.heartbeat_interval)
+                sequence, frame = channel.sequence, channel.frame
+            if sequence != seen:
+                seen = sequence
+                yield frame
+            else:
+                yield KEEP_ALIVE
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+    # Changes
+
+    def notify(self, quiz_id):
+        """Mark a quiz changed; its subscribers get a new frame on the next tick"""
+        channel = self._channels.get(quiz_id)
+        if channel is not None:
+            channel.dirty = True
+            self.events += 1
+
+    def _refresh(self, channel):
+        """Read the quiz's snapshot and wake its subscribers if it changed"""
+        channel.built_at = time.monotonic()
+        payload = snapshot(channel.quiz_id, self.leaderboard_size)
+        if payload == channel.payload:
+            return False
+        frame = f'event: scores\ndata: {self.app.json.dumps(payload)}\n\n'.encode()
+        with channel.condition:
+            channel.payload = payload
+            channel.frame = frame
+            channel.sequence += 1
+            channel.condition.notify_all()
+        self.frames += 1
+        return True
+
+    def tick_once(self):
+        """Refresh the changed channels and those due a heartbeat; returns the frames sent"""
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                channel for channel in self._channels.values()
+                if channel.dirty or now - channel.built_at >= self.heartbeat_interval
+            ]
+            for channel in due:
+                channel.dirty = False
+        if not due:
+            return 0
+        sent = 0
+        with self.app.app_context():
+            for channel in due:
+                try:
+                    sent += self._refresh(channel)
+                except Exception:
+                    channel.dirty = True  # Retried on the next tick
+                    raise
+        return sent
+
+    # Ticker
+
+    def ensure_started(self):
+        """Start the ticker thread and the broker receiver in this process"""
+        if self.app is None:
+            return
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self.broker.bind()
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='live-ticker', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the ticker, end open streams and stop receiving notifications"""
+        self._stopping.set()
+        with self._lock:
+            channels = list(self._channels.values())
+        for channel in channels:
+            with channel.condition:
+                channel.condition.notify_all()
+        self.broker.close()
+
+    def _run(self):
+        while not self._stopping.wait(self.tick_interval):
+            try:
+                self.tick_once()
+            except Exception as e:
+                self.failed_ticks += 1
+                self.last_error = str(e)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': self._subscribers,
+                'max_subscribers': self.max_subscribers,
+                'channels': len(self._channels),
+                'events': self.events,
+                'frames': self.frames,
+                'rejected': self.rejected,
+                'notifications_sent': self.broker.sent,
+                'notifications_received': self.broker.received,
+                'notifications_dropped': self.broker.dropped,
+                'failed_ticks': self.failed_ticks,
+                'last_error': self.last_error
+            }
+
+
+broadcaster = LiveBroadcaster()
+
+
+def init_app(app):
+    """Configure the broadcaster; its ticker starts with the first subscriber in each worker"""
+    broadcaster.app = app
+    broadcaster.configure(
+        tick_interval=app.config.get('LIVE_TICK_INTERVAL', DEFAULT_TICK_INTERVAL),
+        heartbeat_interval=app.config.get('LIVE_HEARTBEAT_INTERVAL', DEFAULT_HEARTBEAT_INTERVAL),
+        stream_timeout=app.config.get('LIVE_STREAM_TIMEOUT', DEFAULT_STREAM_TIMEOUT),
+        max_subscribers=app.config.get('LIVE_MAX_SUBSCRIBERS', DEFAULT_MAX_SUBSCRIBERS),
+        leaderboard_size=app.config.get('LIVE_LEADERBOARD_SIZE', DEFAULT_LEADERBOARD_SIZE)
+    )
+    broadcaster.broker.configure(
+        app.config.get('LIVE_BROKER_DIR') or os.path.join(app.instance_path, 'live'),
+        broadcaster.notify
+    )
+    atexit.register(broadcaster.stop)
+
+
+def publish(quiz_id):
+    """A quiz's submissions changed (call after the commit): refresh its live subscribers everywhere"""
+    broadcaster.notify(quiz_id)
+    broadcaster.broker.publish(quiz_id)
@@ -0,0 +1,331 @@
+"""
+Prometheus metrics shared across gunicorn workers
+
+Each process records its samples in its own memory-mapped file in
+METRICS_DIR (``metrics-<pid>.db``, default instance/metrics): an
+append-only list of (key, float64) entries updated in place, so recording a
+request costs a few dict lookups and memory writes and never takes a lock
+shared with other processes. GET /api/metrics reads every worker's file and
+adds the samples up. Counters and histograms include workers that have
+exited, so they never go backwards; gauges only count live workers.
+
+The directory is emptied when the server starts (gunicorn.conf.py's
+on_starting hook, or ``python app.py``); otherwise the counters would carry
+over from the previous run.
+"""
+import glob
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from models import db
+import engine_profile
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests handled, by route and status code'),
+    'http_request_duration_seconds': ('histogram', 'Request latency, by route'),
+    'http_requests_in_flight': ('gauge', 'Requests being handled, by blueprint'),
+    'db_pool_size': ('gauge', 'Configured connection pool size'),
+    'db_pool_checked_out': ('gauge', 'Connections checked out of the pool'),
+    'db_pool_overflow': ('gauge', 'Overflow connections open beyond the pool size'),
+    'db_pool_checkouts_total': ('counter', 'Connection checkouts'),
+    'db_pool_checkout_timeouts_total': ('counter', 'Checkouts that timed out waiting for a connection'),
+    'quiz_submissions_graded_total': ('counter', 'Submissions graded, by mode (single or batch)'),
+    'quiz_answers_graded_total': ('counter', 'Answers graded, by mode'),
+    'quiz_answers_correct_total': ('counter', 'Answers graded correct, by mode'),
+}
+
+_SEPARATOR = '\x1f'  # Between metric name, label text and histogram bound in a key
+_HEADER = struct.Struct('<I4x')  # Bytes in use
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+_BOUNDS = tuple(repr(bound) for bound in LATENCY_BUCKETS) + ('+Inf',)
+
+
+def _key(name, labels='', bound=''):
+    return f'{name}{_SEPARATOR}{labels}{_SEPARATOR}{bound}'
+
+
+_POOL_SIZE = _key('db_pool_size')
+_POOL_CHECKED_OUT = _key('db_pool_checked_out')
+_POOL_OVERFLOW = _key('db_pool_overflow')
+_POOL_CHECKOUTS = _key('db_pool_checkouts_total')
+_POOL_TIMEOUTS = _key('db_pool_checkout_timeouts_total')
+
+
+def _read_entries(buffer):
+    """(key, value, value_position) for each entry of one metrics file"""
+    used = _HEADER.unpack_from(buffer, 0)[0] if len(buffer) >= _HEADER.size else 0
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(buffer, position)[0]
+        padded = length + (-(length + _LENGTH.size) % 8)
+        key = bytes(buffer[position + _LENGTH.size:position + _LENGTH.size + length]).decode('utf-8')
+        position += _LENGTH.size + padded
+        yield key, _VALUE.unpack_from(buffer, position)[0], position
+        position += _VALUE.size
+
+
+class MmapedValues:
+    """Append-only key -> float64 file written by one process"""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+            size = _INITIAL_SIZE
+        self._capacity = size
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._used = _HEADER.unpack_from(self._mmap, 0)[0] or _HEADER.size
+        _HEADER.pack_into(self._mmap, 0, self._used)
+
+        # A reused pid continues from the earlier process's values
+        self._positions = {key: position for key, _, position in _read_entries(self._mmap)}
+
+    def _position(self, key):
+        position = self._positions.get(key)
+        if position is None:
+            encoded = key.encode('utf-8')
+            padded = len(encoded) + (-(len(encoded) + _LENGTH.size) % 8)
+            size = _LENGTH.size + padded + _VALUE.size
+            if self._used + size > self._capacity:
+                self._grow(self._used + size)
+            struct.pack_into(f'<I{padded}sd', self._mmap, self._used, len(encoded), encoded, 0.0)
+            position = self._used + _LENGTH.size + padded
+            self._used += size
+            _HEADER.pack_into(self._mmap, 0, self._used)  # Publish the entry once it is complete
+            self._positions[key] = position
+        return position
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        self._mmap.close()
+        self._file.truncate(capacity)
+        self._mmap = mmap.mmap(self._file.fileno(), capacity)
+        self._capacity = capacity
+
+    def inc(self, key, amount=1.0):
+        with self._lock:
+            position = self._position(key)
+            _VALUE.pack_into(self._mmap, position, _VALUE.unpack_from(self._mmap, position)[0] + amount)
+
+    def set(self, key, value):
+        with self._lock:
+            _VALUE.pack_into(self._mmap, self._position(key), value)
+
+    def close(self):
+        with self._lock:
+            self._mmap.close()
+            self._file.close()
+
+
+def _is_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _braces(labels):
+    return f'{{{labels}}}' if labels else ''
+
+
+def _format(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class Metrics:
+    """Per-process recorder plus the cross-process exposition"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.directory = None
+        self._values = None
+        self._pid = None
+        self._keys = {}
+
+    def configure(self, directory):
+        with self._lock:
+            if self._values is not None:
+                self._values.close()
+            self.directory = directory
+            self._values = None
+            self._keys = {}
+            os.makedirs(directory, exist_ok=True)
+
+    def reset(self):
+        """Remove every worker's file (call before the workers start)"""
+        with self._lock:
+            if self._values is not None:
+                self._values.close()
+                self._values = None
+            for path in glob.glob(os.path.join(self.directory, 'metrics-*.db')):
+                os.remove(path)
+
+    def _store(self):
+        # Each process (gunicorn worker) writes its own file
+        values = self._values
+        if values is None or self._pid != os.getpid():
+            with self._lock:
+                if self._values is None or self._pid != os.getpid():
+                    path = os.path.join(self.directory, f'metrics-{os.getpid()}.db')
+                    self._values = MmapedValues(path)
+                    self._pid = os.getpid()
+                values = self._values
+        return values
+
+    def _request_keys(self, blueprint, rule, method, status):
+        cache_key = (rule, method, status)
+        keys = self._keys.get(cache_key)
+        if keys is None:
+            route = f'blueprint="{blueprint}",route="{rule}",method="{method}"'
+            keys = (
+                _key('http_requests_total', f'{route},status="{status}"'),
+                tuple(_key('http_request_duration_seconds', route, bound) for bound in _BOUNDS),
+                _key('http_request_duration_seconds', route, 'sum')
+            )
+            self._keys[cache_key] = keys
+        return keys
+
+    def _in_flight_key(self, blueprint):
+        key = self._keys.get(blueprint)
+        if key is None:
+            key = self._keys[blueprint] = _key('http_requests_in_flight', f'blueprint="{blueprint}"')
+        return key
+
+    def request_started(self, blueprint):
+        self._store().inc(self._in_flight_key(blueprint))
+
+    def request_finished(self, blueprint, rule, method, status, seconds):
+        values = self._store()
+        total_key, bucket_keys, sum_key = self._request_keys(blueprint, rule, method, status)
+        values.inc(total_key)
+        values.inc(bucket_keys[bisect_left(LATENCY_BUCKETS, seconds)])
+        values.inc(sum_key, seconds)
+        values.inc(self._in_flight_key(blueprint), -1.0)
+
+    def request_aborted(self, blueprint):
+        """The request ended without a response to record"""
+        self._store().inc(self._in_flight_key(blueprint), -1.0)
+
+    def submissions_graded(self, mode, submissions, answers, correct):
+        values = self._store()
+        labels = f'mode="{mode}"'
+        values.inc(_key('quiz_submissions_graded_total', labels), submissions)
+        values.inc(_key('quiz_answers_graded_total', labels), answers)
+        values.inc(_key('quiz_answers_correct_total', labels), correct)
+
+    def connection_checked_out(self, pool):
+        values = self._store()
+        values.inc(_POOL_CHECKED_OUT)
+        values.inc(_POOL_CHECKOUTS)
+        if isinstance(pool, QueuePool):
+            values.set(_POOL_SIZE, pool.size())
+            values.set(_POOL_OVERFLOW, max(pool.overflow(), 0))
+
+    def checkout_timed_out(self, pool):
+        self._store().inc(_POOL_TIMEOUTS)
+
+    def connection_checked_in(self):
+        self._store().inc(_POOL_CHECKED_OUT, -1.0)
+
+    def collect(self):
+        """Samples summed over every worker's file: {(name, labels, bound): value}"""
+        samples = {}
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.db')):
+            try:
+                pid = int(os.path.basename(path)[len('metrics-'):-len('.db')])
+                with open(path, 'rb') as source:
+                    buffer = source.read()
+            except (ValueError, OSError):
+                continue
+            live = _is_alive(pid)
+            for key, value, _ in _read_entries(buffer):
+                name, labels, bound = key.split(_SEPARATOR)
+                if not live and METRICS.get(name, ('gauge',))[0] == 'gauge':
+                    continue
+                samples[(name, labels, bound)] = samples.get((name, labels, bound), 0.0) + value
+        return samples
+
+    def render(self):
+        """Prometheus text exposition format"""
+        samples = self.collect()
+        by_name = {}
+        for (name, labels, bound), value in samples.items():
+            by_name.setdefault(name, {}).setdefault(labels, {})[bound] = value
+
+        lines = []
+        for name, (kind, description) in METRICS.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, values in sorted(by_name.get(name, {}).items()):
+                if kind == 'histogram':
+                    cumulative = 0.0
+                    for bound in _BOUNDS:
+                        cumulative += values.get(bound, 0.0)
+                        bucket_labels = f'{labels},le="{bound}"' if labels else f'le="{bound}"'
+                        lines.append(f'{name}_bucket{{{bucket_labels}}} {_format(cumulative)}')
+                    lines.append(f'{name}_sum{_braces(labels)} {repr(values.get("sum", 0.0))}')
+                    lines.append(f'{name}_count{_braces(labels)} {_format(cumulative)}')
+                else:
+                    lines.append(f'{name}{_braces(labels)} {_format(values[""])}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_blueprint = request.blueprint or 'app'
+    metrics.request_started(g.metrics_blueprint)
+
+
+def _finish_request(response):
+    started = g.pop('metrics_started', None)
+    if started is not None:
+        rule = request.url_rule
+        metrics.request_finished(
+            g.metrics_blueprint, rule.rule if rule is not None else 'unmatched',
+            request.method, response.status_code, time.perf_counter() - started
+        )
+    return response
+
+
+def _teardown_request(exception=None):
+    # after_request did not run (unhandled error): keep the in-flight gauge right
+    if g.pop('metrics_started', None) is not None:
+        metrics.request_aborted(g.metrics_blueprint)
+
+
+def init_app(app):
+    """Record every request and configure the shared metrics directory"""
+    metrics.configure(app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics'))
+    with app.app_context():
+        engine = db.engine
+    # Pool listeners carry over to the pool that replaces this one after dispose()
+    event.listen(engine, 'checkout', lambda *args: metrics.connection_checked_out(engine.pool))
+    event.listen(engine, 'checkin', lambda *args: metrics.connection_checked_in())
+    engine_profile.on_checkout_timeout(metrics.checkout_timed_out)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
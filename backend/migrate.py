@@ -0,0 +1,27 @@
+"""
+One-shot database migration entry point
+Run: python migrate.py
+
+Applies all pending Alembic migrations and exits. Run it once per deploy
+(e.g. the Procfile release phase) before the web workers start; the
+workers themselves never migrate.
+"""
+import sys
+from flask_migrate import upgrade
+
+
+def run_migrations(app):
+    """Upgrade the database to the latest revision; returns True on success"""
+    with app.app_context():
+        try:
+            upgrade()
+        except Exception as e:
+            print(f"❌ Database migration failed: {e}")
+            return False
+    print("✅ Database migrations completed successfully")
+    return True
+
+
+if __name__ == '__main__':
+    from app import app
+    sys.exit(0 if run_migrations(app) else 1)
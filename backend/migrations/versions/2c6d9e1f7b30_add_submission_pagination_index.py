@@ -0,0 +1,26 @@
+"""Add (quiz_id, submitted_at, id) index to user_responses
+
+Revision ID: 2c6d9e1f7b30
+Revises: e7a19c4b8f62
+Create Date: 2026-10-17 15:07:22.540916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c6d9e1f7b30'
+down_revision = 'e7a19c4b8f62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_responses', schema=None) as batch_op:
+        batch_op.create_index('ix_user_responses_quiz_submitted_at_id', ['quiz_id', 'submitted_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_responses', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_responses_quiz_submitted_at_id')
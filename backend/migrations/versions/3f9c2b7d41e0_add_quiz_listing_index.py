@@ -0,0 +1,26 @@
+"""Add (created_at, id) index to quizzes for keyset pagination
+
+Revision ID: 3f9c2b7d41e0
+Revises: 1a26e08d96af
+Create Date: 2026-10-17 09:12:31.482910
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2b7d41e0'
+down_revision = '1a26e08d96af'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.create_index('ix_quizzes_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.drop_index('ix_quizzes_created_at_id')
@@ -0,0 +1,28 @@
+"""Add journal_key to user_responses for idempotent write-behind flushes
+
+Revision ID: 5b8e3f60d2a7
+Revises: c52e07b1a9d4
+Create Date: 2026-10-17 12:41:17.903552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e3f60d2a7'
+down_revision = 'c52e07b1a9d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_responses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('journal_key', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_user_responses_journal_key'), ['journal_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('user_responses', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_responses_journal_key'))
+        batch_op.drop_column('journal_key')
@@ -0,0 +1,33 @@
+"""Add item_analyses cache table
+
+Revision ID: 71d3b5e09c4a
+Revises: 9a0f4d2c6e18
+Create Date: 2026-10-17 17:44:02.815337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '71d3b5e09c4a'
+down_revision = '9a0f4d2c6e18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('item_analyses',
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('quiz_version', sa.Integer(), nullable=False),
+    sa.Column('last_response_id', sa.Integer(), nullable=False),
+    sa.Column('state', sa.JSON(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('quiz_id')
+    )
+
+
+def downgrade():
+    op.drop_table('item_analyses')
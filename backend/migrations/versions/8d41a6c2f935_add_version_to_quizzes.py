@@ -0,0 +1,26 @@
+"""Add version stamp to quizzes
+
+Revision ID: 8d41a6c2f935
+Revises: 3f9c2b7d41e0
+Create Date: 2026-10-17 10:03:54.207118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41a6c2f935'
+down_revision = '3f9c2b7d41e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,54 @@
+"""Add quiz_stats and question_stats aggregate tables
+
+Revision ID: 9a0f4d2c6e18
+Revises: 2c6d9e1f7b30
+Create Date: 2026-10-17 16:25:49.371205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a0f4d2c6e18'
+down_revision = '2c6d9e1f7b30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Populate for existing submissions afterwards with: python rebuild_stats.py
+    op.create_table('quiz_stats',
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('score_sum', sa.BigInteger(), nullable=False),
+    sa.Column('score_sq_sum', sa.BigInteger(), nullable=False),
+    sa.Column('percent_sum', sa.Float(), nullable=False),
+    sa.Column('bucket_0', sa.Integer(), nullable=False),
+    sa.Column('bucket_1', sa.Integer(), nullable=False),
+    sa.Column('bucket_2', sa.Integer(), nullable=False),
+    sa.Column('bucket_3', sa.Integer(), nullable=False),
+    sa.Column('bucket_4', sa.Integer(), nullable=False),
+    sa.Column('bucket_5', sa.Integer(), nullable=False),
+    sa.Column('bucket_6', sa.Integer(), nullable=False),
+    sa.Column('bucket_7', sa.Integer(), nullable=False),
+    sa.Column('bucket_8', sa.Integer(), nullable=False),
+    sa.Column('bucket_9', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('quiz_id')
+    )
+    op.create_table('question_stats',
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('attempt_count', sa.Integer(), nullable=False),
+    sa.Column('correct_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('quiz_id', 'question_id')
+    )
+
+
+def downgrade():
+    op.drop_table('question_stats')
+    op.drop_table('quiz_stats')
@@ -0,0 +1,30 @@
+"""Add autosaved draft columns to quiz_attempts
+
+Revision ID: a3c5e8f1b7d4
+Revises: f1b6c83e2d47
+Create Date: 2026-10-17 23:05:31.204417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e8f1b7d4'
+down_revision = 'f1b6c83e2d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quiz_attempts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('draft_answers', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('draft_revision', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('draft_saved_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempts', schema=None) as batch_op:
+        batch_op.drop_column('draft_saved_at')
+        batch_op.drop_column('draft_revision')
+        batch_op.drop_column('draft_answers')
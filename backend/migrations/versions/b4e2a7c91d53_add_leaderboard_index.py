@@ -0,0 +1,29 @@
+"""Add (quiz_id, score DESC, submitted_at) index to user_responses
+
+Revision ID: b4e2a7c91d53
+Revises: 71d3b5e09c4a
+Create Date: 2026-10-17 18:42:10.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e2a7c91d53'
+down_revision = '71d3b5e09c4a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_user_responses_quiz_score',
+        'user_responses',
+        ['quiz_id', sa.text('score DESC'), 'submitted_at'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_user_responses_quiz_score', table_name='user_responses')
@@ -0,0 +1,43 @@
+"""Add updated_at to quizzes and collection_versions table for conditional GET
+
+Revision ID: c52e07b1a9d4
+Revises: 8d41a6c2f935
+Create Date: 2026-10-17 11:20:08.661034
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c52e07b1a9d4'
+down_revision = '8d41a6c2f935'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing quizzes were last modified no later than they were created
+    op.execute('UPDATE quizzes SET updated_at = created_at')
+
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+    collection_versions = op.create_table('collection_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.execute(collection_versions.insert().values(
+        name='quizzes', version=1, updated_at=sa.func.current_timestamp()
+    ))
+
+
+def downgrade():
+    op.drop_table('collection_versions')
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
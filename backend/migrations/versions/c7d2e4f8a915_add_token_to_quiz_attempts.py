@@ -0,0 +1,27 @@
+"""Add token to quiz_attempts
+
+Revision ID: c7d2e4f8a915
+Revises: a3c5e8f1b7d4
+Create Date: 2026-10-18 09:12:44.381502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e4f8a915'
+down_revision = 'a3c5e8f1b7d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing attempts keep a NULL token: only a logged-in owner can still use them
+    with op.batch_alter_table('quiz_attempts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token', sa.String(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('quiz_attempts', schema=None) as batch_op:
+        batch_op.drop_column('token')
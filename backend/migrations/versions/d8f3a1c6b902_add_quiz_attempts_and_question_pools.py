@@ -0,0 +1,65 @@
+"""Add quiz_attempts table, per-attempt draw settings and question tags
+
+Revision ID: d8f3a1c6b902
+Revises: b4e2a7c91d53
+Create Date: 2026-10-17 20:05:37.441902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f3a1c6b902'
+down_revision = 'b4e2a7c91d53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('quiz_attempts',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('quiz_version', sa.Integer(), nullable=False),
+    sa.Column('question_ids', sa.JSON(), nullable=False),
+    sa.Column('total_points', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('submitted_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('quiz_attempts', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_quiz_attempts_quiz_id'), ['quiz_id'], unique=False)
+
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('draw_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('draw_by', sa.String(length=20), nullable=True))
+
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tag', sa.String(length=50), nullable=True))
+
+    with op.batch_alter_table('user_responses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('attempt_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_user_responses_attempt_id', 'quiz_attempts', ['attempt_id'], ['id'], ondelete='SET NULL'
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('user_responses', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_user_responses_attempt_id', type_='foreignkey')
+        batch_op.drop_column('attempt_id')
+
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.drop_column('tag')
+
+    with op.batch_alter_table('quizzes', schema=None) as batch_op:
+        batch_op.drop_column('draw_by')
+        batch_op.drop_column('draw_count')
+
+    with op.batch_alter_table('quiz_attempts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_quiz_attempts_quiz_id'))
+
+    op.drop_table('quiz_attempts')
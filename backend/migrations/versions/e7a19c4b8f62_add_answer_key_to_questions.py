@@ -0,0 +1,76 @@
+"""Add pre-normalized answer_key and type_code to questions
+
+Revision ID: e7a19c4b8f62
+Revises: 5b8e3f60d2a7
+Create Date: 2026-10-17 13:58:40.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a19c4b8f62'
+down_revision = '5b8e3f60d2a7'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Frozen copy of models.TYPE_CODES / normalize_answer as of this revision
+TYPE_CODES = {'multiple_choice': 1, 'true_false': 2, 'text': 3}
+
+
+def _answer_key(question_type, correct_answer):
+    if question_type == 'multiple_choice':
+        return str(correct_answer).strip()
+    if question_type in ('true_false', 'text'):
+        return str(correct_answer).strip().lower()
+    return None
+
+
+def upgrade():
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('type_code', sa.SmallInteger(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('answer_key', sa.String(length=500), nullable=True))
+
+    # Backfill in primary-key batches; normalization is done in Python so the
+    # stored keys match live grading exactly (SQL TRIM/LOWER differ on Unicode)
+    questions = sa.table(
+        'questions',
+        sa.column('id', sa.Integer),
+        sa.column('question_type', sa.String),
+        sa.column('correct_answer', sa.String),
+        sa.column('type_code', sa.SmallInteger),
+        sa.column('answer_key', sa.String)
+    )
+    update = questions.update().where(questions.c.id == sa.bindparam('question_id')).values(
+        type_code=sa.bindparam('new_type_code'),
+        answer_key=sa.bindparam('new_answer_key')
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(questions.c.id, questions.c.question_type, questions.c.correct_answer)
+            .where(questions.c.id > last_id)
+            .order_by(questions.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(update, [
+            {
+                'question_id': row.id,
+                'new_type_code': TYPE_CODES.get(row.question_type, 0),
+                'new_answer_key': _answer_key(row.question_type, row.correct_answer)
+            }
+            for row in rows
+        ])
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('questions', schema=None) as batch_op:
+        batch_op.drop_column('answer_key')
+        batch_op.drop_column('type_code')
@@ -0,0 +1,157 @@
+"""Add response_answers table (one graded row per submission and question)
+
+Revision ID: f1b6c83e2d47
+Revises: d8f3a1c6b902
+Create Date: 2026-10-17 21:42:10.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b6c83e2d47'
+down_revision = 'd8f3a1c6b902'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Frozen copy of models.NORMALIZERS / grading.GradingPlan as of this revision
+NORMALIZERS = {
+    'multiple_choice': lambda value: str(value).strip(),
+    'true_false': lambda value: str(value).strip().lower(),
+    'text': lambda value: str(value).strip().lower()
+}
+ANSWER_TEXT_LENGTH = 500
+
+
+def _compile(question):
+    normalize = NORMALIZERS.get(question.question_type)
+    answer_key = question.answer_key
+    if answer_key is None and normalize is not None:
+        answer_key = normalize(question.correct_answer)
+    option_keys = {}
+    if normalize is not None and isinstance(question.options, list):
+        for index, option in enumerate(question.options):
+            option_keys.setdefault(normalize(option), index)
+    return question.id, normalize, answer_key, option_keys, question.points
+
+
+def _answer_row(response_id, answers, compiled):
+    question_id, normalize, answer_key, option_keys, points = compiled
+    user_answer = answers.get(str(question_id)) or answers.get(question_id)
+    normalized = normalize(user_answer) if user_answer is not None and normalize else None
+    is_correct = normalized is not None and normalized == answer_key
+    option_index = answer_text = None
+    if normalized is not None:
+        option_index = option_keys.get(normalized)
+        if option_index is None:
+            answer_text = str(normalized)[:ANSWER_TEXT_LENGTH]
+    return {
+        'response_id': response_id,
+        'question_id': question_id,
+        'option_index': option_index,
+        'answer_text': answer_text,
+        'is_correct': is_correct,
+        'earned_points': points if is_correct else 0
+    }
+
+
+def upgrade():
+    op.create_table('response_answers',
+    sa.Column('response_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('option_index', sa.SmallInteger(), nullable=True),
+    sa.Column('answer_text', sa.String(length=500), nullable=True),
+    sa.Column('is_correct', sa.Boolean(), nullable=False),
+    sa.Column('earned_points', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['response_id'], ['user_responses.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('response_id', 'question_id')
+    )
+    with op.batch_alter_table('response_answers', schema=None) as batch_op:
+        batch_op.create_index('ix_response_answers_question_correct', ['question_id', 'is_correct'], unique=False)
+        batch_op.create_index(
+            'ix_response_answers_question_answer',
+            ['question_id', 'option_index', 'answer_text', 'is_correct'], unique=False
+        )
+
+    # Backfill existing submissions in primary-key batches, graded against
+    # the current questions (the key a submission was graded with is not
+    # stored); drawn attempts only get rows for the questions they were given
+    questions = sa.table(
+        'questions',
+        sa.column('id', sa.Integer),
+        sa.column('quiz_id', sa.Integer),
+        sa.column('question_type', sa.String),
+        sa.column('correct_answer', sa.String),
+        sa.column('answer_key', sa.String),
+        sa.column('options', sa.JSON),
+        sa.column('points', sa.Integer)
+    )
+    responses = sa.table(
+        'user_responses',
+        sa.column('id', sa.Integer),
+        sa.column('quiz_id', sa.Integer),
+        sa.column('answers', sa.JSON),
+        sa.column('attempt_id', sa.Integer)
+    )
+    attempts = sa.table(
+        'quiz_attempts',
+        sa.column('id', sa.Integer),
+        sa.column('question_ids', sa.JSON)
+    )
+    response_answers = sa.table(
+        'response_answers',
+        sa.column('response_id', sa.Integer),
+        sa.column('question_id', sa.Integer),
+        sa.column('option_index', sa.SmallInteger),
+        sa.column('answer_text', sa.String),
+        sa.column('is_correct', sa.Boolean),
+        sa.column('earned_points', sa.Integer)
+    )
+    connection = op.get_bind()
+    quizzes = {}  # quiz_id -> ({question_id: compiled}, compiled in question order)
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(responses.c.id, responses.c.quiz_id, responses.c.answers, attempts.c.question_ids)
+            .select_from(responses.outerjoin(attempts, attempts.c.id == responses.c.attempt_id))
+            .where(responses.c.id > last_id)
+            .order_by(responses.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        missing = {row.quiz_id for row in rows} - quizzes.keys()
+        if missing:
+            for quiz_id in missing:
+                quizzes[quiz_id] = ({}, [])
+            for question in connection.execute(
+                sa.select(questions).where(questions.c.quiz_id.in_(missing)).order_by(questions.c.id)
+            ):
+                by_id, ordered = quizzes[question.quiz_id]
+                compiled = _compile(question)
+                by_id[question.id] = compiled
+                ordered.append(compiled)
+
+        answer_rows = []
+        for row in rows:
+            by_id, ordered = quizzes[row.quiz_id]
+            graded = ordered if row.question_ids is None else [
+                by_id[question_id] for question_id in row.question_ids if question_id in by_id
+            ]
+            answers = row.answers if isinstance(row.answers, dict) else {}
+            answer_rows.extend(_answer_row(row.id, answers, compiled) for compiled in graded)
+        if answer_rows:
+            connection.execute(response_answers.insert(), answer_rows)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('response_answers', schema=None) as batch_op:
+        batch_op.drop_index('ix_response_answers_question_answer')
+        batch_op.drop_index('ix_response_answers_question_correct')
+
+    op.drop_table('response_answers')
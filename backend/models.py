@@ -1,13 +1,45 @@
 """
 Database models for the Quiz Management System
 """
+import hmac
+import secrets
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import JSON
+from sqlalchemy import JSON, event
+from passwords import hasher
+from fieldsets import pick, subfields, wants
 
 db = SQLAlchemy()
 
+QUESTION_TYPES = ('multiple_choice', 'true_false', 'text')
+
+# Compact integer codes persisted on Question.type_code (0 = unknown type)
+TYPE_UNKNOWN = 0
+TYPE_CODES = {'multiple_choice': 1, 'true_false': 2, 'text': 3}
+
+
+def _strip(value):
+    return str(value).strip()
+
+
+def _fold(value):
+    return str(value).strip().lower()
+
+
+# Multiple choice answers only ignore surrounding whitespace; true/false and
+# text answers are also case-insensitive
+NORMALIZERS = {1: _strip, 2: _fold, 3: _fold}
+
+
+def normalize_answer(question_type, value):
+    """
+    Normalize an answer for comparison under the given question type's rules.
+
+    Returns None for unknown types.
+    """
+    normalizer = NORMALIZERS.get(TYPE_CODES.get(question_type, TYPE_UNKNOWN))
+    return normalizer(value) if normalizer else None
+
 
 class User(db.Model):
     """User model for authentication and authorization"""
@@ -24,12 +56,19 @@ class User(db.Model):
     quizzes_created = db.relationship('Quiz', backref='creator', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Hash and set the user's password"""
-        self.password_hash = generate_password_hash(password)
+        """Hash and set the user's password (PASSWORD_HASH_METHOD, in the hashing pool)"""
+        self.password_hash = hasher.hash(password)
     
     def check_password(self, password):
         """Check if the provided password matches the hash"""
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+    
+    def rehash_password_if_needed(self, password):
+        """Re-hash a verified password stored with outdated parameters; returns True if it changed"""
+        if not hasher.needs_rehash(self.password_hash):
+            return False
+        self.password_hash = hasher.rehash(password)
+        return True
     
     def to_dict(self, include_email=False):
         """Convert user to dictionary"""
@@ -56,24 +95,68 @@ class Quiz(db.Model):
     description = db.Column(db.Text, nullable=True)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    version = db.Column(db.Integer, default=1, nullable=False)  # Bumped on every content change
+    draw_count = db.Column(db.Integer, nullable=True)  # Questions drawn per attempt (None: all of them)
+    draw_by = db.Column(db.String(20), nullable=True)  # Stratify draws by 'tag' or 'points' (see sampling.py)
+    
+    __table_args__ = (
+        # Supports newest-first keyset pagination of the quiz listing
+        db.Index('ix_quizzes_created_at_id', 'created_at', 'id'),
+    )
     
     # Relationships
     questions = db.relationship('Question', backref='quiz', lazy=True, cascade='all, delete-orphan', order_by='Question.id')
     
-    def to_dict(self, include_answers=False):
-        """Convert quiz to dictionary"""
-        data = {
+    def to_dict(self, include_answers=False, fields=None):
+        """
+        Convert quiz to dictionary (``fields``: a fieldsets.parse_fields tree)
+
+        Quizzes that draw questions per attempt only list their pool for
+        include_answers; students get their questions from an attempt.
+        Questions are only loaded when ``fields`` asks for them.
+        """
+        data = pick({
             'id': self.id,
             'title': self.title,
             'description': self.description,
             'created_by': self.created_by,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_active': self.is_active,
-            'questions': [q.to_dict(include_answer=include_answers) for q in self.questions]
-        }
+            'version': self.version,
+            'draw_count': self.draw_count,
+            'draw_by': self.draw_by
+        }, fields)
+        if wants(fields, 'questions'):
+            question_fields = subfields(fields, 'questions')
+            data['questions'] = [
+                q.to_dict(include_answer=include_answers, fields=question_fields) for q in self.questions
+            ] if include_answers or not self.draw_count else []
         return data
     
+    def bump_version(self):
+        """Atomically increment the version stamp (applied on flush)"""
+        self.version = Quiz.version + 1
+    
+    def to_summary_dict(self, question_count=0, total_points=0, fields=None):
+        """Convert quiz to a lightweight listing dictionary (no questions)"""
+        return pick({
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'created_by': self.created_by,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'is_active': self.is_active,
+            'version': self.version,
+            'draw_count': self.draw_count,
+            'draw_by': self.draw_by,
+            'question_count': question_count,
+            'total_points': total_points
+        }, fields)
+    
     def __repr__(self):
         return f'<Quiz {self.title}>'
 
@@ -90,8 +173,11 @@ class Question(db.Model):
     correct_answer = db.Column(db.String(500), nullable=False)
     points = db.Column(db.Integer, default=1, nullable=False)
     order = db.Column(db.Integer, default=0, nullable=False)  # For ordering questions
+    type_code = db.Column(db.SmallInteger, default=TYPE_UNKNOWN, nullable=False)  # TYPE_CODES[question_type]
+    answer_key = db.Column(db.String(500), nullable=True)  # correct_answer pre-normalized for grading
+    tag = db.Column(db.String(50), nullable=True)  # Optional topic, for stratified draws
     
-    def to_dict(self, include_answer=False):
+    def to_dict(self, include_answer=False, fields=None):
         """Convert question to dictionary"""
         data = {
             'id': self.id,
@@ -100,31 +186,86 @@ class Question(db.Model):
             'question_type': self.question_type,
             'options': self.options,
             'points': self.points,
-            'order': self.order
+            'order': self.order,
+            'tag': self.tag
         }
         if include_answer:
             data['correct_answer'] = self.correct_answer
-        return data
+        return pick(data, fields)
+    
+    def compile_answer_key(self):
+        """Fill type_code and answer_key from question_type and correct_answer"""
+        self.type_code = TYPE_CODES.get(self.question_type, TYPE_UNKNOWN)
+        self.answer_key = normalize_answer(self.question_type, self.correct_answer)
     
     def check_answer(self, user_answer):
         """Check if user's answer is correct"""
-        if self.question_type == 'true_false':
-            # Normalize true/false answers
-            user_answer = str(user_answer).strip().lower()
-            correct = str(self.correct_answer).strip().lower()
-            return user_answer == correct
-        elif self.question_type == 'multiple_choice':
-            # For multiple choice, compare exact match
-            return str(user_answer).strip() == str(self.correct_answer).strip()
-        elif self.question_type == 'text':
-            # For text answers, case-insensitive comparison
-            return str(user_answer).strip().lower() == str(self.correct_answer).strip().lower()
-        return False
+        if self.answer_key is None or self.type_code is None:
+            self.compile_answer_key()  # Not flushed yet
+        normalizer = NORMALIZERS.get(self.type_code)
+        if normalizer is None:
+            return False
+        return normalizer(user_answer) == self.answer_key
     
     def __repr__(self):
         return f'<Question {self.id}: {self.question_text[:50]}...>'
 
 
+@event.listens_for(Question, 'before_insert')
+@event.listens_for(Question, 'before_update')
+def _compile_question_answer_key(mapper, connection, question):
+    """Keep the persisted answer key in step with every ORM write"""
+    question.compile_answer_key()
+
+
+class QuizAttempt(db.Model):
+    """The questions drawn for one attempt at a quiz; a submission grades exactly these"""
+    __tablename__ = 'quiz_attempts'
+
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    quiz_version = db.Column(db.Integer, nullable=False)  # Quiz version the questions were drawn from
+    question_ids = db.Column(JSON, nullable=False)  # [question_id, ...] in presentation order
+    total_points = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=True)  # Set once; an attempt is graded only once
+    draft_answers = db.Column(JSON, nullable=True)  # Autosaved answers (see drafts.py); cleared on submit
+    draft_revision = db.Column(db.Integer, default=0, nullable=False)
+    draft_saved_at = db.Column(db.DateTime, nullable=True)
+    # Secret returned when the attempt starts; resuming, autosaving and submitting must present it
+    token = db.Column(db.String(64), nullable=True, default=lambda: secrets.token_urlsafe(32))
+
+    def to_dict(self, include_token=False):
+        """Convert attempt to dictionary (the token only for the caller that started it)"""
+        data = {
+            'id': self.id,
+            'quiz_id': self.quiz_id,
+            'user_id': self.user_id,
+            'quiz_version': self.quiz_version,
+            'question_ids': self.question_ids,
+            'total_points': self.total_points,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None
+        }
+        if include_token:
+            data['token'] = self.token
+        return data
+
+    def __repr__(self):
+        return f'<QuizAttempt {self.id}: Quiz {self.quiz_id}, {len(self.question_ids or [])} questions>'
+
+
+def can_use_attempt(attempt_token, attempt_user_id, token, user_id):
+    """
+    Whether a caller may resume, autosave or submit an attempt: it presents
+    the attempt's token, or it is logged in as the user who started it
+    """
+    if attempt_user_id is not None and attempt_user_id == user_id:
+        return True
+    return bool(attempt_token) and isinstance(token, str) and hmac.compare_digest(attempt_token, token)
+
+
 class UserResponse(db.Model):
     """User response model for storing quiz submissions"""
     __tablename__ = 'user_responses'
@@ -137,24 +278,199 @@ class UserResponse(db.Model):
     score = db.Column(db.Integer, nullable=False)
     total_points = db.Column(db.Integer, nullable=False)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    journal_key = db.Column(db.String(64), nullable=True, unique=True, index=True)  # Set when written behind (see write_behind.py)
+    attempt_id = db.Column(db.Integer, db.ForeignKey('quiz_attempts.id', ondelete='SET NULL'), nullable=True)  # The drawn question set graded
+    
+    __table_args__ = (
+        # Supports newest-first keyset pagination and export of a quiz's submissions
+        db.Index('ix_user_responses_quiz_submitted_at_id', 'quiz_id', 'submitted_at', 'id'),
+        # Supports leaderboards (top-N scan) and rank counting
+        db.Index('ix_user_responses_quiz_score', quiz_id, score.desc(), submitted_at),
+    )
     
     # Relationships
     user = db.relationship('User', backref='responses', lazy=True)
     quiz = db.relationship('Quiz', backref='responses', lazy=True)
     
-    def to_dict(self):
-        """Convert response to dictionary"""
-        return {
+    def to_dict(self, fields=None):
+        """Convert response to dictionary (answers only read when ``fields`` asks for them)"""
+        data = {
             'id': self.id,
             'user_id': self.user_id,
             'quiz_id': self.quiz_id,
             'participant_name': self.participant_name,
-            'answers': self.answers,
             'score': self.score,
             'total_points': self.total_points,
-            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None
+            'submitted_at': self.submitted_at.isoformat() if self.submitted_at else None,
+            'attempt_id': self.attempt_id
         }
+        if wants(fields, 'answers'):
+            data['answers'] = self.answers
+        return pick(data, fields)
     
     def __repr__(self):
         return f'<UserResponse {self.id}: Quiz {self.quiz_id}, Score {self.score}/{self.total_points}>'
 
+
+class ResponseAnswer(db.Model):
+    """
+    One graded answer of a submission: a relational copy of UserResponse.answers
+
+    Every question a submission was graded on has a row, blank answers
+    included (option_index and answer_text both None). Written alongside the
+    response by response_answers.py.
+    """
+    __tablename__ = 'response_answers'
+
+    response_id = db.Column(db.Integer, db.ForeignKey('user_responses.id', ondelete='CASCADE'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True)
+    option_index = db.Column(db.SmallInteger, nullable=True)  # Position in Question.options of the chosen option
+    answer_text = db.Column(db.String(500), nullable=True)  # Normalized answer when it is not one of the options
+    is_correct = db.Column(db.Boolean, nullable=False)
+    earned_points = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        # Per-question correct rates: COUNT(*) ... GROUP BY question_id, is_correct
+        db.Index('ix_response_answers_question_correct', 'question_id', 'is_correct'),
+        # Answer distributions: COUNT(*) ... GROUP BY option_index, answer_text (covering)
+        db.Index('ix_response_answers_question_answer', 'question_id', 'option_index', 'answer_text', 'is_correct'),
+    )
+
+    def to_dict(self):
+        """Convert answer to dictionary"""
+        return {
+            'response_id': self.response_id,
+            'question_id': self.question_id,
+            'option_index': self.option_index,
+            'answer_text': self.answer_text,
+            'is_correct': self.is_correct,
+            'earned_points': self.earned_points
+        }
+
+    def __repr__(self):
+        return f'<ResponseAnswer {self.response_id}/{self.question_id}>'
+
+
+
+HISTOGRAM_BUCKETS = 10  # Fixed-width percentage buckets: [0,10), [10,20), ... [90,100]
+
+
+def histogram_bucket(score, total_points):
+    """Histogram bucket index for a score, by percentage of total points"""
+    if total_points <= 0:
+        return 0
+    return min(int(score * HISTOGRAM_BUCKETS // total_points), HISTOGRAM_BUCKETS - 1)
+
+
+class QuizStats(db.Model):
+    """Incrementally maintained score aggregates for a quiz (one row per quiz)"""
+    __tablename__ = 'quiz_stats'
+    
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), primary_key=True)
+    attempt_count = db.Column(db.Integer, default=0, nullable=False)
+    score_sum = db.Column(db.BigInteger, default=0, nullable=False)
+    score_sq_sum = db.Column(db.BigInteger, default=0, nullable=False)
+    percent_sum = db.Column(db.Float, default=0.0, nullable=False)
+    bucket_0 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_1 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_2 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_3 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_4 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_5 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_6 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_7 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_8 = db.Column(db.Integer, default=0, nullable=False)
+    bucket_9 = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def to_dict(self):
+        """Convert stats to dictionary"""
+        count = self.attempt_count
+        mean = self.score_sum / count if count else 0.0
+        variance = max(self.score_sq_sum / count - mean * mean, 0.0) if count else 0.0
+        return {
+            'quiz_id': self.quiz_id,
+            'attempt_count': count,
+            'average_score': round(mean, 4),
+            'score_stddev': round(variance ** 0.5, 4),
+            'average_percentage': round(self.percent_sum / count, 2) if count else 0.0,
+            'histogram': [
+                {
+                    'range': [bucket * 100 // HISTOGRAM_BUCKETS, (bucket + 1) * 100 // HISTOGRAM_BUCKETS],
+                    'count': getattr(self, f'bucket_{bucket}')
+                }
+                for bucket in range(HISTOGRAM_BUCKETS)
+            ],
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    def __repr__(self):
+        return f'<QuizStats {self.quiz_id}: {self.attempt_count} attempts>'
+
+
+class QuestionStats(db.Model):
+    """Per-question attempt and correct counts, maintained alongside QuizStats"""
+    __tablename__ = 'question_stats'
+    
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id', ondelete='CASCADE'), primary_key=True)
+    attempt_count = db.Column(db.Integer, default=0, nullable=False)
+    correct_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def to_dict(self):
+        """Convert question stats to dictionary"""
+        return {
+            'question_id': self.question_id,
+            'attempt_count': self.attempt_count,
+            'correct_count': self.correct_count,
+            'correct_rate': round(self.correct_count / self.attempt_count, 4) if self.attempt_count else 0.0
+        }
+    
+    def __repr__(self):
+        return f'<QuestionStats {self.quiz_id}/{self.question_id}: {self.correct_count}/{self.attempt_count}>'
+
+
+class ItemAnalysis(db.Model):
+    """Cached item-analysis state and result for one quiz version (see item_analysis.py)"""
+    __tablename__ = 'item_analyses'
+    
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quizzes.id', ondelete='CASCADE'), primary_key=True)
+    quiz_version = db.Column(db.Integer, nullable=False)
+    last_response_id = db.Column(db.Integer, default=0, nullable=False)  # Responses up to here are folded in
+    state = db.Column(JSON, nullable=False)  # Additive sufficient statistics
+    result = db.Column(JSON, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<ItemAnalysis {self.quiz_id} v{self.quiz_version}>'
+
+
+class CollectionVersion(db.Model):
+    """Monotonic version counter for a cacheable collection (e.g. the quiz listing)"""
+    __tablename__ = 'collection_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, default=1, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    QUIZZES = 'quizzes'
+    
+    @classmethod
+    def bump(cls, name):
+        """Atomically increment a collection's version in the current transaction"""
+        now = datetime.utcnow()
+        updated = cls.query.filter_by(name=name).update(
+            {cls.version: cls.version + 1, cls.updated_at: now},
+            synchronize_session=False
+        )
+        if not updated:
+            db.session.add(cls(name=name, version=1, updated_at=now))
+    
+    @classmethod
+    def current(cls, name):
+        """Return (version, updated_at) for a collection, or (0, None) if never bumped"""
+        row = db.session.query(cls.version, cls.updated_at).filter(cls.name == name).first()
+        return (row.version, row.updated_at) if row else (0, None)
+    
+    def __repr__(self):
+        return f'<CollectionVersion {self.name}: {self.version}>'
@@ -0,0 +1,138 @@
+"""
+Password hashing off the request thread
+
+Hashes are computed with Werkzeug using PASSWORD_HASH_METHOD (e.g.
+``scrypt:32768:8:1`` or ``pbkdf2:sha256:600000``). The work runs in a small
+per-process thread pool of PASSWORD_HASH_WORKERS threads. hashlib releases
+the GIL while hashing, so threads serving other routes keep running during
+a login burst.
+
+At most PASSWORD_HASH_QUEUE_LIMIT more hashes may wait for a pool thread.
+Beyond that HashingBusy is raised and the routes answer 503 with
+Retry-After instead of piling more CPU work onto the worker.
+
+Stored hashes carry their method, so needs_rehash() can tell when a
+password was hashed with different parameters; login then rehashes it
+with the current ones.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = 'scrypt:32768:8:1'  # Werkzeug's default
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_LIMIT = 32
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full"""
+    pass
+
+
+class PasswordHasher:
+    """Bounded thread pool for password hashing and verification"""
+
+    def __init__(self, method=DEFAULT_METHOD, workers=DEFAULT_WORKERS, queue_limit=DEFAULT_QUEUE_LIMIT):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.configure(method, workers, queue_limit)
+
+    def configure(self, method, workers, queue_limit):
+        with self._lock:
+            self.method = method
+            self.workers = max(1, workers)
+            self.queue_limit = max(0, queue_limit)
+            self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+            self._full_method = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            self.in_flight = 0
+            self.completed = 0
+            self.rejected = 0
+            self.rehashed = 0
+            self.seconds_total = 0.0
+
+    def _get_executor(self):
+        # Threads do not survive a fork: start a fresh pool in each worker
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix='password-hash'
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, function, *args):
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy('Too many password checks in progress')
+        try:
+            with self._lock:
+                self.in_flight += 1
+            started = time.perf_counter()
+            result = self._get_executor().submit(function, *args).result()
+            with self._lock:
+                self.completed += 1
+                self.seconds_total += time.perf_counter() - started
+            return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            slots.release()
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def rehash(self, password):
+        """Hash a password again because its stored parameters are outdated"""
+        password_hash = self.hash(password)
+        with self._lock:
+            self.rehashed += 1
+        return password_hash
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def full_method(self):
+        """The configured method with Werkzeug's defaults filled in, as stored in hashes"""
+        if self._full_method is None:
+            self._full_method = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._full_method
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with other parameters than the configured ones"""
+        return password_hash.split('$', 1)[0] != self.full_method()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'method': self.method,
+                'workers': self.workers,
+                'queue_limit': self.queue_limit,
+                'in_flight': self.in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'rehashed': self.rehashed,
+                'avg_seconds': round(self.seconds_total / self.completed, 4) if self.completed else None
+            }
+
+
+hasher = PasswordHasher()
+
+
+def init_app(app):
+    """Configure the process-wide hasher from app config"""
+    hasher.configure(
+        app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        app.config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS),
+        app.config.get('PASSWORD_HASH_QUEUE_LIMIT', DEFAULT_QUEUE_LIMIT)
+    )
@@ -0,0 +1,170 @@
+"""
+Per-request SQL statement counts and database time
+
+Cursor execute events on the application's engine are counted and timed
+against the request being served by the current thread (statements run by
+background threads, such as the write-behind writer, are not attributed to
+any request). Each response gets a Server-Timing header, e.g.
+
+    Server-Timing: db;dur=3.1;desc="4 queries", app;dur=9.8
+
+which browser dev tools show next to the request. With SQL_PROFILE_LOG
+every request is also logged at INFO. A request that issues more than
+SLOW_REQUEST_QUERIES statements or spends more than SLOW_REQUEST_DB_MS in
+the database is logged at WARNING with its normalized statement
+fingerprints, so repeated statements (N+1 patterns) stand out.
+
+Streamed responses are measured up to the point the body starts streaming.
+"""
+import logging
+import re
+import threading
+import time
+from flask import current_app, request
+from sqlalchemy import event
+from models import db
+
+MAX_FINGERPRINTS = 10
+
+_WHITESPACE = re.compile(r'\s+')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r'(?:\?|%s|%\(\w+\)s|:\w+)'
+_PLACEHOLDER_LIST = re.compile(rf'\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)')
+_REPEATED_ROWS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+
+
+def fingerprint(statement):
+    """Statement text with literals and parameter lists collapsed, so repeats group together"""
+    text = _WHITESPACE.sub(' ', statement).strip()
+    text = _LITERALS.sub('?', text)
+    text = _PLACEHOLDER_LIST.sub('(?)', text)
+    return _REPEATED_ROWS.sub('(?), ...', text)
+
+
+class RequestProfile:
+    """Statements issued while serving one request"""
+    __slots__ = ('started', 'queries', 'db_seconds', 'statements')
+
+    def __init__(self, keep_statements):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = [] if keep_statements else None  # (statement, seconds)
+
+    def fingerprints(self, limit=MAX_FINGERPRINTS):
+        """(fingerprint, count, seconds) for the statements that took the most time"""
+        groups = {}
+        for statement, seconds in self.statements or ():
+            key = fingerprint(statement)
+            count, total = groups.get(key, (0, 0.0))
+            groups[key] = (count + 1, total + seconds)
+        ranked = sorted(groups.items(), key=lambda item: item[1][1], reverse=True)
+        return [(key, count, total) for key, (count, total) in ranked[:limit]]
+
+
+class QueryProfiler:
+    """Attributes engine cursor events to the request served by the current thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self.configure()
+
+    def configure(self, server_timing=True, log_requests=False, slow_queries=0, slow_db_ms=0):
+        self.server_timing = server_timing
+        self.log_requests = log_requests
+        self.slow_queries = slow_queries  # 0 disables
+        self.slow_db_seconds = slow_db_ms / 1000.0  # 0 disables
+
+    @property
+    def keeps_statements(self):
+        return bool(self.slow_queries or self.slow_db_seconds)
+
+    def current(self):
+        """The RequestProfile of the request on this thread (None outside requests)"""
+        return getattr(self._local, 'profile', None)
+
+    def start(self):
+        self._local.profile = RequestProfile(self.keeps_statements)
+
+    def stop(self):
+        self._local.profile = None
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self._local, 'profile', None) is not None:
+            conn.info.setdefault('query_profile_started', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            return
+        started = conn.info.get('query_profile_started')
+        if not started:
+            return  # The request began while this statement was running
+        elapsed = time.perf_counter() - started.pop()
+        profile.queries += 1
+        profile.db_seconds += elapsed
+        if profile.statements is not None:
+            profile.statements.append((statement, elapsed))
+
+    def is_slow(self, profile):
+        return bool(
+            (self.slow_queries and profile.queries > self.slow_queries)
+            or (self.slow_db_seconds and profile.db_seconds > self.slow_db_seconds)
+        )
+
+
+profiler = QueryProfiler()
+
+
+def _start_request():
+    profiler.start()
+
+
+def _finish_request(response):
+    profile = profiler.current()
+    if profile is None:
+        return response
+
+    total_ms = (time.perf_counter() - profile.started) * 1000
+    db_ms = profile.db_seconds * 1000
+    if profiler.server_timing:
+        response.headers.add(
+            'Server-Timing', f'db;dur={db_ms:.1f};desc="{profile.queries} queries", app;dur={total_ms:.1f}'
+        )
+
+    summary = (f'{request.method} {request.path} {response.status_code}: '
+               f'{profile.queries} queries, {db_ms:.1f} ms db, {total_ms:.1f} ms total')
+    if profiler.is_slow(profile):
+        lines = [f'Slow request {summary}']
+        lines.extend(
+            f'  {count} x {seconds * 1000:.1f} ms  {text}' for text, count, seconds in profile.fingerprints()
+        )
+        current_app.logger.warning('\n'.join(lines))
+    elif profiler.log_requests:
+        current_app.logger.info(summary)
+    return response
+
+
+def _teardown_request(exception=None):
+    profiler.stop()
+
+
+def init_app(app):
+    """Listen to the app's engine and time every request (after db.init_app)"""
+    profiler.configure(
+        server_timing=app.config.get('SERVER_TIMING', True),
+        log_requests=app.config.get('SQL_PROFILE_LOG', False),
+        slow_queries=app.config.get('SLOW_REQUEST_QUERIES', 0),
+        slow_db_ms=app.config.get('SLOW_REQUEST_DB_MS', 0)
+    )
+    if profiler.log_requests or profiler.keeps_statements:
+        app.logger.setLevel(logging.INFO)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', profiler.before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', profiler.after_cursor_execute)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
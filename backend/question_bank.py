@@ -0,0 +1,229 @@
+"""
+Streaming question-bank import and export shared by the quiz routes and
+import_questions.py / export_questions.py
+
+A bank has one row per question, carrying its quiz's columns:
+
+    quiz_ref, quiz_title, quiz_description, quiz_is_active,
+    quiz_draw_count, quiz_draw_by,
+    question_text, question_type, options, correct_answer, points, tag
+
+as NDJSON or CSV (options as a JSON array in CSV). Rows with the same
+quiz_ref belong to one quiz, in row order; its columns are read from the
+first row. Export streams the join of
+quizzes and questions from a server-side cursor (quiz_ref is the quiz id);
+import parses the input a row at a time, validates each question with the
+same rules as create_quiz and writes one multi-row INSERT and one commit
+per chunk, so memory stays flat however large the bank is (only the
+quiz_ref -> quiz id map grows, with the number of quizzes).
+"""
+import json
+import time
+from itertools import islice
+from sqlalchemy import func, insert, select, update
+from models import db, Quiz, Question, CollectionVersion
+from grading import grader_cache
+from ingest import iter_csv_records, iter_records
+from question_sync import question_fields, validate_question
+from sampling import validate_draw, validate_pool_size
+
+DEFAULT_CHUNK_SIZE = 1000
+BANK_FORMATS = ('csv', 'ndjson')
+BANK_FIELDS = [
+    'quiz_ref', 'quiz_title', 'quiz_description', 'quiz_is_active', 'quiz_draw_count', 'quiz_draw_by',
+    'question_text', 'question_type', 'options', 'correct_answer', 'points', 'tag'
+]
+MAX_REPORTED_ERRORS = 1000
+
+
+class BankImportError(ValueError):
+    """Raised for problems that abort a whole import (e.g. unknown target quiz)"""
+
+
+def iter_bank(lines, bank_format):
+    """Records from a CSV or NDJSON/JSON bank (JSON may be wrapped as {"questions": [...]})"""
+    if bank_format == 'csv':
+        return iter_csv_records(lines)
+    return iter_records(lines, key='questions')
+
+
+def bank_statement(quiz_ids=None):
+    """SELECT of every bank row (optionally only ``quiz_ids``), quiz by quiz in question order"""
+    statement = select(
+        Quiz.id.label('quiz_ref'),
+        Quiz.title.label('quiz_title'),
+        Quiz.description.label('quiz_description'),
+        Quiz.is_active.label('quiz_is_active'),
+        Quiz.draw_count.label('quiz_draw_count'),
+        Quiz.draw_by.label('quiz_draw_by'),
+        Question.question_text,
+        Question.question_type,
+        Question.options,
+        Question.correct_answer,
+        Question.points,
+        Question.tag
+    ).join(Question, Question.quiz_id == Quiz.id).order_by(Quiz.id, Question.order, Question.id)
+    if quiz_ids:
+        statement = statement.where(Quiz.id.in_(quiz_ids))
+    return statement
+
+
+def iter_bank_rows(statement, yield_per):
+    """Plain dicts from a server-side cursor: constant memory"""
+    for row in db.session.execute(statement.execution_options(yield_per=yield_per)):
+        yield row._asdict()
+
+
+def _as_bool(value):
+    """quiz_is_active: missing or empty means active"""
+    if isinstance(value, str):
+        return value.strip().lower() not in ('0', 'false', 'no')
+    return True if value is None else bool(value)
+
+
+def _parse_row(record):
+    """Validate one bank row; returns (quiz_ref, quiz_columns, question_data, error)"""
+    if not isinstance(record, dict):
+        return None, None, None, 'Row must be an object'
+
+    question = {key: record.get(key) or '' for key in ('question_text', 'question_type', 'correct_answer')}
+    if not all(isinstance(value, str) for value in question.values()):
+        return None, None, None, 'question_text, question_type and correct_answer must be strings'
+
+    options = record.get('options')
+    if isinstance(options, str):
+        try:
+            options = json.loads(options) if options.strip() else []
+        except ValueError:
+            return None, None, None, 'options must be a JSON array'
+    options = options or []
+    if not isinstance(options, list):
+        return None, None, None, 'options must be a JSON array'
+
+    points = record.get('points')
+    try:
+        points = int(points) if points not in (None, '') else 1
+    except (TypeError, ValueError):
+        return None, None, None, 'points must be an integer'
+
+    question.update(options=options, points=points, tag=record.get('tag') or None)
+    error = validate_question(question)
+    if error:
+        return None, None, None, error
+
+    draw_count = record.get('quiz_draw_count')
+    if isinstance(draw_count, str):
+        try:
+            draw_count = int(draw_count) if draw_count.strip() else None
+        except ValueError:
+            return None, None, None, 'quiz_draw_count must be an integer'
+    quiz = {
+        'title': str(record.get('quiz_title') or '').strip(),
+        'description': str(record.get('quiz_description') or '').strip() or None,
+        'is_active': _as_bool(record.get('quiz_is_active')),
+        'draw_count': draw_count,
+        'draw_by': record.get('quiz_draw_by') or None
+    }
+    error = validate_draw(quiz)
+    if error:
+        return None, None, None, f'quiz_{error}'
+    return str(record.get('quiz_ref') or quiz['title']), quiz, question, None
+
+
+def import_question_bank(records, created_by, chunk_size=DEFAULT_CHUNK_SIZE, into_quiz_id=None):
+    """
+    Create quizzes and questions from bank rows.
+
+    ``records`` is an iterable of (row_number, record, error) tuples from
+    iter_bank. Each new quiz_ref creates a quiz owned by ``created_by`` when
+    its first valid question arrives. With ``into_quiz_id`` every question is
+    appended to that existing quiz instead. Returns counts, the created
+    quizzes and the row errors.
+
+    A created quiz that ends up drawing more questions than it received is
+    left inactive, with the reason as its ``error`` in the report.
+    """
+    chunk_size = max(1, int(chunk_size))
+    started = time.perf_counter()
+    quizzes = {}  # quiz_ref -> [quiz_id, next_order]
+    created = []
+    errors = []
+    failed = received = inserted = 0
+
+    if into_quiz_id is not None:
+        if db.session.query(Quiz.id).filter(Quiz.id == into_quiz_id).first() is None:
+            raise BankImportError('Quiz not found')
+        last_order = db.session.query(func.max(Question.order)).filter(Question.quiz_id == into_quiz_id).scalar()
+        target = [into_quiz_id, 0 if last_order is None else last_order + 1]
+
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        received += len(chunk)
+
+        mappings = []
+        for row, record, error in chunk:
+            quiz_ref = quiz = question = None
+            if error is None:
+                quiz_ref, quiz, question, error = _parse_row(record)
+            if error is None and into_quiz_id is None and quiz_ref not in quizzes and not quiz['title']:
+                error = 'Quiz title is required'
+            if error:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'row': row, 'error': error})
+                continue
+
+            if into_quiz_id is not None:
+                slot = target
+            else:
+                slot = quizzes.get(quiz_ref)
+                if slot is None:
+                    quiz_id = db.session.scalar(
+                        insert(Quiz).returning(Quiz.id), {'created_by': created_by, **quiz}
+                    )
+                    slot = quizzes[quiz_ref] = [quiz_id, 0, quiz['draw_count']]
+                    created.append({'quiz_ref': quiz_ref, 'quiz_id': quiz_id, 'title': quiz['title']})
+            mappings.append({'quiz_id': slot[0], **question_fields(question, slot[1])})
+            slot[1] += 1
+
+        if not mappings:
+            continue
+        db.session.execute(insert(Question), mappings)
+        if into_quiz_id is not None:
+            db.session.execute(update(Quiz).where(Quiz.id == into_quiz_id).values(version=Quiz.version + 1))
+        CollectionVersion.bump(CollectionVersion.QUIZZES)
+        db.session.commit()
+        inserted += len(mappings)
+
+    if into_quiz_id is not None and inserted:
+        grader_cache.invalidate(into_quiz_id)
+
+    undersized = {}
+    for quiz_id, pool_size, draw_count in quizzes.values():
+        error = validate_pool_size(draw_count, pool_size)
+        if error:
+            undersized[quiz_id] = f'{error}; the quiz was left inactive'
+    if undersized:
+        db.session.execute(
+            update(Quiz).where(Quiz.id.in_(undersized)).values(is_active=False, version=Quiz.version + 1)
+        )
+        CollectionVersion.bump(CollectionVersion.QUIZZES)
+        db.session.commit()
+        for entry in created:
+            if entry['quiz_id'] in undersized:
+                entry['error'] = undersized[entry['quiz_id']]
+
+    elapsed = time.perf_counter() - started
+    return {
+        'received': received,
+        'inserted': inserted,
+        'failed': failed,
+        'quizzes_created': created,
+        'elapsed_seconds': round(elapsed, 4),
+        'rows_per_second': round(received / elapsed, 1) if elapsed > 0 else None,
+        'errors': errors,
+        'errors_truncated': failed > len(errors)
+    }
@@ -0,0 +1,135 @@
+"""
+Question validation and incremental question updates for a quiz
+
+sync_questions matches the submitted questions to the quiz's existing ones
+by ``id`` and writes only the difference: one executemany UPDATE for the
+changed rows, one multi-row INSERT for the new ones and one DELETE for the
+ones left out. Unchanged questions keep their ids, so the question-id keys
+stored in UserResponse.answers stay valid.
+
+The bulk statements bypass the ORM events that compile answer keys, so
+type_code and answer_key are filled in here.
+"""
+from sqlalchemy import delete, insert, update
+from models import db, Question, QuestionStats, ResponseAnswer, QUESTION_TYPES, TYPE_CODES, TYPE_UNKNOWN, normalize_answer
+
+COMPARED_FIELDS = ('question_text', 'question_type', 'options', 'correct_answer', 'points', 'order', 'tag')
+
+
+class QuestionSyncError(ValueError):
+    """Raised when the submitted questions cannot be matched to the quiz"""
+
+
+def validate_question(q_data):
+    """The validation error for one submitted question, or None"""
+    question_text = q_data.get('question_text', '').strip()
+    question_type = q_data.get('question_type', '').strip().lower()
+    correct_answer = q_data.get('correct_answer', '').strip()
+    options = q_data.get('options', [])
+    tag = q_data.get('tag')
+
+    if not question_text:
+        return 'Question text is required'
+    if question_type not in QUESTION_TYPES:
+        return 'Invalid question type'
+    if not correct_answer:
+        return 'Correct answer is required'
+
+    # Validate options for MCQ
+    if question_type == 'multiple_choice':
+        if not options or len(options) < 2:
+            return 'Multiple choice questions require at least 2 options'
+        if correct_answer not in options:
+            return 'Correct answer must be one of the options'
+    elif question_type == 'true_false':
+        if correct_answer.lower() not in ['true', 'false']:
+            return 'True/False questions must have "True" or "False" as correct answer'
+    if tag is not None and (not isinstance(tag, str) or len(tag.strip()) > 50):
+        return 'Tag must be a string of at most 50 characters'
+    return None
+
+
+def question_fields(q_data, order):
+    """Column values for a submitted question (same cleanup as create_quiz)"""
+    question_type = q_data.get('question_type', '').strip().lower()
+    correct_answer = q_data.get('correct_answer', '').strip()
+    return {
+        'question_text': q_data.get('question_text', '').strip(),
+        'question_type': question_type,
+        'options': q_data.get('options', []),
+        'correct_answer': correct_answer,
+        'points': q_data.get('points', 1),
+        'order': order,
+        'tag': (q_data.get('tag') or '').strip() or None,
+        'type_code': TYPE_CODES.get(question_type, TYPE_UNKNOWN),
+        'answer_key': normalize_answer(question_type, correct_answer)
+    }
+
+
+def sync_questions(quiz_id, questions_data):
+    """
+    Make the quiz's questions match ``questions_data`` (in order).
+
+    Items with an ``id`` update that question (keeping its tag when the item
+    has no ``tag`` key); items without one are inserted. Existing questions not listed are deleted together with their
+    stats and response_answers rows. Returns {'inserted': [ids], 'updated': [ids], 'deleted':
+    [ids], 'unchanged': count}. Runs in the caller's transaction.
+    """
+    existing = {
+        row.id: row for row in db.session.query(
+            Question.id, *(getattr(Question, field) for field in COMPARED_FIELDS)
+        ).filter(Question.quiz_id == quiz_id)
+    }
+
+    seen = set()
+    updates = []
+    inserts = []
+    unchanged = 0
+    for idx, q_data in enumerate(questions_data):
+        fields = question_fields(q_data, idx)
+        question_id = q_data.get('id')
+        if question_id is None:
+            inserts.append({'quiz_id': quiz_id, **fields})
+            continue
+
+        if not isinstance(question_id, int) or question_id not in existing:
+            raise QuestionSyncError(f'Question {idx + 1}: question {question_id} does not belong to this quiz')
+        if question_id in seen:
+            raise QuestionSyncError(f'Question {idx + 1}: question {question_id} is listed twice')
+        seen.add(question_id)
+
+        current = existing[question_id]
+        if 'tag' not in q_data:
+            fields['tag'] = current.tag  # Clients that do not know about tags leave them alone
+        if all(getattr(current, field) == fields[field] for field in COMPARED_FIELDS):
+            unchanged += 1
+        else:
+            updates.append({'id': question_id, **fields})
+
+    # Insert before deleting: SQLite hands out the highest deleted rowid
+    # again, which would give a new question a removed question's id
+    inserted = []
+    if inserts:
+        inserted = db.session.scalars(
+            insert(Question).returning(Question.id, sort_by_parameter_order=True), inserts
+        ).all()
+    if updates:
+        db.session.execute(update(Question), updates)
+    deleted = sorted(set(existing) - seen)
+    if deleted:
+        db.session.execute(
+            delete(QuestionStats).where(QuestionStats.question_id.in_(deleted))
+        )
+        db.session.execute(
+            delete(ResponseAnswer).where(ResponseAnswer.question_id.in_(deleted))
+        )
+        db.session.execute(
+            delete(Question).where(Question.id.in_(deleted)), execution_options={'synchronize_session': False}
+        )
+
+    return {
+        'inserted': list(inserted),
+        'updated': [item['id'] for item in updates],
+        'deleted': deleted,
+        'unchanged': unchanged
+    }
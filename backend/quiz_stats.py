@@ -0,0 +1,233 @@
+"""
+Incrementally maintained quiz statistics
+
+Every graded submission is folded into a StatsDelta and applied with
+atomic ``column = column + :delta`` UPDATEs in the same transaction as the
+submission insert, so concurrent workers never lose increments and reading
+the stats is a primary-key lookup. rebuild_quiz_stats recomputes everything
+from user_responses when the aggregates need to be reset.
+"""
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import bindparam, select, update
+from models import (
+    db, Quiz, Question, QuizAttempt, QuizStats, QuestionStats, UserResponse, HISTOGRAM_BUCKETS, histogram_bucket
+)
+from grading import get_grading_plan
+
+REBUILD_YIELD_PER = 1000
+
+# (quiz_id -> version) whose stats rows this worker has already ensured exist
+_ensured = {}
+
+
+class StatsDelta:
+    """
+    Accumulated increments for one quiz's stats
+
+    Submissions of drawn attempts (see sampling.py) only count as attempts
+    of the questions they were given; every other submission counts
+    against all of ``question_ids``.
+    """
+
+    def __init__(self, quiz_id, question_ids):
+        self.quiz_id = quiz_id
+        self.question_ids = list(question_ids)
+        self.attempts = 0
+        self.sampled = 0  # Attempts counted per question in ``drawn`` instead
+        self.drawn = Counter()
+        self.score_sum = 0
+        self.score_sq_sum = 0
+        self.percent_sum = 0.0
+        self.buckets = Counter()
+        self.correct = Counter()
+
+    def add_score(self, score, total_points):
+        """Fold in one submission's score"""
+        self.attempts += 1
+        self.score_sum += score
+        self.score_sq_sum += score * score
+        self.percent_sum += (score / total_points * 100) if total_points > 0 else 0.0
+        self.buckets[histogram_bucket(score, total_points)] += 1
+
+    def add(self, score, total_points, correct_question_ids, drawn_question_ids=None):
+        """Fold in one graded submission (``drawn_question_ids``: the attempt's questions)"""
+        self.add_score(score, total_points)
+        self.correct.update(correct_question_ids)
+        if drawn_question_ids is not None:
+            self.sampled += 1
+            self.drawn.update(drawn_question_ids)
+
+    def question_attempts(self):
+        """{question_id: attempts} for every question this delta touches"""
+        full = self.attempts - self.sampled
+        question_ids = self.question_ids if full else list(self.drawn)
+        return {question_id: full + self.drawn.get(question_id, 0) for question_id in question_ids}
+
+    def add_correct_matrix(self, correct):
+        """Fold in per-question correct counts from a GradingPlan.grade_matrix result"""
+        for question_id, count in zip(self.question_ids, correct.sum(axis=0).tolist()):
+            if count:
+                self.correct[question_id] += count
+
+    def add_matrix(self, scores, total_points, correct):
+        """Fold in a batch graded by GradingPlan.grade_matrix"""
+        for score in scores.tolist():
+            self.add_score(score, total_points)
+        self.add_correct_matrix(correct)
+
+
+def _insert_missing(model, rows, key_columns):
+    """INSERT rows that do not exist yet, ignoring conflicts with concurrent inserts"""
+    if not rows:
+        return
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        db.session.execute(insert(model).on_conflict_do_nothing(index_elements=key_columns), rows)
+        return
+    columns = [getattr(model, name) for name in key_columns]
+    existing = set(db.session.execute(select(*columns).where(columns[0] == rows[0][key_columns[0]])).all())
+    missing = [row for row in rows if tuple(row[name] for name in key_columns) not in existing]
+    if missing:
+        db.session.execute(model.__table__.insert(), missing)
+
+
+def _ensure_rows(quiz_id, question_ids):
+    _insert_missing(QuizStats, [{
+        'quiz_id': quiz_id, 'attempt_count': 0, 'score_sum': 0, 'score_sq_sum': 0,
+        'percent_sum': 0.0, 'updated_at': datetime.utcnow(),
+        **{f'bucket_{bucket}': 0 for bucket in range(HISTOGRAM_BUCKETS)}
+    }], ['quiz_id'])
+    _insert_missing(QuestionStats, [
+        {'quiz_id': quiz_id, 'question_id': question_id, 'attempt_count': 0, 'correct_count': 0}
+        for question_id in question_ids
+    ], ['quiz_id', 'question_id'])
+
+
+def apply_delta(delta, version=None):
+    """
+    Apply a StatsDelta with atomic increments in the current transaction.
+
+    ``version`` is the quiz version the delta was graded against; stats rows
+    for that version's questions are created once per worker.
+    """
+    if not delta.attempts:
+        return
+    if version is None or _ensured.get(delta.quiz_id) != version:
+        _ensure_rows(delta.quiz_id, delta.question_ids)
+
+    values = {
+        QuizStats.attempt_count: QuizStats.attempt_count + delta.attempts,
+        QuizStats.score_sum: QuizStats.score_sum + delta.score_sum,
+        QuizStats.score_sq_sum: QuizStats.score_sq_sum + delta.score_sq_sum,
+        QuizStats.percent_sum: QuizStats.percent_sum + delta.percent_sum,
+        QuizStats.updated_at: datetime.utcnow()
+    }
+    for bucket, count in delta.buckets.items():
+        column = getattr(QuizStats, f'bucket_{bucket}')
+        values[column] = column + count
+    result = db.session.execute(
+        update(QuizStats).where(QuizStats.quiz_id == delta.quiz_id).values(values)
+    )
+    if result.rowcount == 0:
+        # Rows ensured by an earlier, rolled-back transaction: create them now
+        _ensure_rows(delta.quiz_id, delta.question_ids)
+        db.session.execute(update(QuizStats).where(QuizStats.quiz_id == delta.quiz_id).values(values))
+
+    question_attempts = delta.question_attempts()
+    if question_attempts:
+        table = QuestionStats.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.quiz_id == bindparam('b_quiz_id'))
+            .where(table.c.question_id == bindparam('b_question_id'))
+            .values(
+                attempt_count=table.c.attempt_count + bindparam('b_attempts'),
+                correct_count=table.c.correct_count + bindparam('b_correct')
+            ),
+            [
+                {
+                    'b_quiz_id': delta.quiz_id,
+                    'b_question_id': question_id,
+                    'b_attempts': attempts,
+                    'b_correct': delta.correct.get(question_id, 0)
+                }
+                for question_id, attempts in question_attempts.items()
+            ]
+        )
+
+    if version is not None:
+        _ensured[delta.quiz_id] = version
+
+
+def record_submission(plan, score, results):
+    """Apply one submission graded by GradingPlan.grade (or by an attempt's GradingPlan.subset)"""
+    pool = plan.pool or plan
+    delta = StatsDelta(plan.quiz_id, [q.id for q in pool.questions])
+    delta.add(
+        score, plan.total_points, [qid for qid, result in results.items() if result['is_correct']],
+        [q.id for q in plan.questions] if plan.pool is not None else None
+    )
+    apply_delta(delta, pool.version)
+
+
+def get_quiz_stats(quiz_id):
+    """Return the stats dict for a quiz (zeros if it has no submissions yet)"""
+    stats = db.session.get(QuizStats, quiz_id)
+    data = stats.to_dict() if stats else QuizStats(
+        quiz_id=quiz_id, attempt_count=0, score_sum=0, score_sq_sum=0, percent_sum=0.0,
+        **{f'bucket_{bucket}': 0 for bucket in range(HISTOGRAM_BUCKETS)}
+    ).to_dict()
+    # Only questions that still exist (stats of replaced questions are kept
+    # until the next rebuild where the database does not cascade deletes)
+    questions = db.session.query(QuestionStats).join(
+        Question, Question.id == QuestionStats.question_id
+    ).filter(QuestionStats.quiz_id == quiz_id).order_by(QuestionStats.question_id).all()
+    data['questions'] = [q.to_dict() for q in questions]
+    return data
+
+
+def rebuild_quiz_stats(quiz_id):
+    """
+    Recompute a quiz's stats from user_responses.
+
+    Scores and histogram use the stored scores; per-question counts regrade
+    the stored answers against the current questions, one yield_per
+    partition at a time so memory stays flat; submissions of drawn attempts
+    only count for the questions the attempt was given. Submissions committed while a
+    rebuild runs may be counted twice or not at all; rebuild when quiet.
+    """
+    quiz = db.session.query(Quiz.version).filter(Quiz.id == quiz_id).first()
+    if quiz is None:
+        raise ValueError('Quiz not found')
+    plan = get_grading_plan(quiz_id, quiz.version)
+
+    delta = StatsDelta(quiz_id, [q.id for q in plan.questions])
+    columns = {q.id: column for column, q in enumerate(plan.questions)}
+    statement = select(
+        UserResponse.answers, UserResponse.score, UserResponse.total_points, QuizAttempt.question_ids
+    ).outerjoin(QuizAttempt, QuizAttempt.id == UserResponse.attempt_id).where(
+        UserResponse.quiz_id == quiz_id
+    ).execution_options(yield_per=REBUILD_YIELD_PER)
+    for partition in db.session.execute(statement).partitions():
+        correct, _ = plan.grade_matrix([answers or {} for answers, _, _, _ in partition])
+        whole = []
+        for row, (_, score, total_points, drawn) in enumerate(partition):
+            if drawn is None:
+                delta.add_score(score, total_points)
+                whole.append(row)
+                continue
+            drawn = [qid for qid in drawn if qid in columns]
+            delta.add(score, total_points, [qid for qid in drawn if correct[row, columns[qid]]], drawn)
+        delta.add_correct_matrix(correct[whole])
+
+    db.session.query(QuestionStats).filter_by(quiz_id=quiz_id).delete(synchronize_session=False)
+    db.session.query(QuizStats).filter_by(quiz_id=quiz_id).delete(synchronize_session=False)
+    _ensure_rows(quiz_id, delta.question_ids)
+    apply_delta(delta, plan.version)
+    db.session.commit()
+    return delta.attempts
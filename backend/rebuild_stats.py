@@ -0,0 +1,29 @@
+"""
+Recompute quiz statistics from stored submissions
+Run: python rebuild_stats.py [quiz_id ...]   (all quizzes when no id is given)
+"""
+import sys
+from app import app
+from models import db, Quiz
+from quiz_stats import rebuild_quiz_stats
+
+
+def rebuild_stats(quiz_ids=None):
+    """Rebuild the quiz_stats/question_stats rows for the given (or all) quizzes"""
+    with app.app_context():
+        if not quiz_ids:
+            quiz_ids = [quiz_id for (quiz_id,) in db.session.query(Quiz.id).order_by(Quiz.id)]
+        
+        for quiz_id in quiz_ids:
+            try:
+                attempts = rebuild_quiz_stats(quiz_id)
+            except ValueError as e:
+                print(f"⚠️  Quiz {quiz_id}: {e}")
+                continue
+            print(f"   - Quiz {quiz_id}: {attempts} submission(s)")
+        
+        print(f"\n✅ Rebuilt stats for {len(quiz_ids)} quiz(zes)")
+
+
+if __name__ == '__main__':
+    rebuild_stats([int(arg) for arg in sys.argv[1:]])
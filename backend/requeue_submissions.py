@@ -0,0 +1,40 @@
+"""
+List dead-lettered write-behind submissions and move them back to the queue
+Run: python requeue_submissions.py [--list] [--id N ...]
+
+Entries land in the journal's dead_submissions table when they fail with a
+constraint, data or payload error (see write_behind.py). Fix the cause (e.g.
+restore the deleted quiz), then requeue them: the workers' writers pick them
+up on their next flush, under their original journal keys.
+"""
+import argparse
+from datetime import datetime
+from app import app
+from write_behind import SubmissionJournal, journal_path
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Requeue dead-lettered write-behind submissions')
+    parser.add_argument('--list', action='store_true', help='Only list the dead-lettered entries')
+    parser.add_argument('--id', type=int, action='append', dest='entry_ids',
+                        help='Requeue only this entry (repeatable; default: all)')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    journal = SubmissionJournal(journal_path(app))
+    entries = journal.dead_letters()
+    if args.list:
+        for entry_id, payload, _, failed_at, error in entries:
+            print(f"   - Entry {entry_id} (quiz {payload.get('quiz_id')}, "
+                  f"failed {datetime.fromtimestamp(failed_at).isoformat(timespec='seconds')}): {error}")
+        print(f"\n{len(entries)} dead-lettered submission(s) in {journal.path}")
+        return
+
+    moved = journal.requeue(args.entry_ids)
+    print(f"\n✅ Requeued {moved} of {len(entries)} dead-lettered submission(s)")
+
+
+if __name__ == '__main__':
+    main()
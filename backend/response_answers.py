@@ -0,0 +1,115 @@
+"""
+Normalized per-answer rows (response_answers) written alongside each submission
+
+UserResponse.answers keeps the answers exactly as submitted; response_answers
+holds one row per graded question with the chosen option's index (or the
+normalized answer when it matches no option), is_correct and earned points,
+so per-question correctness and answer distributions are plain GROUP BY
+queries over the (question_id, ...) indexes instead of blob decoding in
+Python. Rows are encoded with the same GradingPlan that graded the
+submission: the single submit path, batch ingest and the write-behind
+flusher all insert them in the transaction that stores the response.
+"""
+from sqlalchemy import case, func, insert, select
+from models import db, ResponseAnswer
+
+ANSWER_TEXT_LENGTH = 500
+
+
+def encode(question, normalized):
+    """(option_index, answer_text) for a normalized answer (None: blank)"""
+    if normalized is None:
+        return None, None
+    index = question.option_keys.get(normalized)
+    if index is not None:
+        return index, None
+    return None, str(normalized)[:ANSWER_TEXT_LENGTH]
+
+
+def submission_rows(plan, results, response_id=None):
+    """
+    Rows for one submission from GradingPlan.grade results.
+
+    ``response_id`` may be filled in later (write-behind journals the rows
+    before the response has an id).
+    """
+    rows = []
+    for q in plan.questions:
+        result = results[q.id]
+        user_answer = result['user_answer']
+        normalized = q.normalize(user_answer) if user_answer is not None and q.normalize else None
+        option_index, answer_text = encode(q, normalized)
+        rows.append({
+            'response_id': response_id,
+            'question_id': q.id,
+            'option_index': option_index,
+            'answer_text': answer_text,
+            'is_correct': result['is_correct'],
+            'earned_points': result['earned_points']
+        })
+    return rows
+
+
+def matrix_rows(plan, response_ids, given, answered, correct):
+    """Rows for many submissions from GradingPlan.normalize_matrix / grade_matrix output"""
+    rows = []
+    for i, response_id in enumerate(response_ids):
+        for j, q in enumerate(plan.questions):
+            is_correct = bool(correct[i, j])
+            option_index, answer_text = encode(q, given[i, j] if answered[i, j] else None)
+            rows.append({
+                'response_id': response_id,
+                'question_id': q.id,
+                'option_index': option_index,
+                'answer_text': answer_text,
+                'is_correct': is_correct,
+                'earned_points': q.points if is_correct else 0
+            })
+    return rows
+
+
+def insert_rows(rows):
+    """Insert answer rows in the current transaction (one executemany)"""
+    if rows:
+        # render_nulls: otherwise rows are batched separately per pattern of None columns
+        db.session.execute(insert(ResponseAnswer).execution_options(render_nulls=True), rows)
+
+
+def question_correctness(question_ids):
+    """{question_id: (answered_count, correct_count)} computed in SQL"""
+    if not question_ids:
+        return {}
+    statement = select(
+        ResponseAnswer.question_id,
+        func.count(),
+        func.sum(case((ResponseAnswer.is_correct, 1), else_=0))
+    ).where(ResponseAnswer.question_id.in_(question_ids)).group_by(ResponseAnswer.question_id)
+    return {
+        question_id: (int(count), int(correct or 0))
+        for question_id, count, correct in db.session.execute(statement)
+    }
+
+
+def answer_distribution(question_id, limit=None):
+    """
+    [(option_index, answer_text, count, correct_count)] for one question, most frequent first.
+
+    Blank answers are the row with both option_index and answer_text None.
+    correct_count is graded with the answer key each submission was graded
+    with, so it only differs from 0 or count after the key changed.
+    """
+    count = func.count().label('count')
+    statement = select(
+        ResponseAnswer.option_index, ResponseAnswer.answer_text, count,
+        func.sum(case((ResponseAnswer.is_correct, 1), else_=0))
+    ).where(
+        ResponseAnswer.question_id == question_id
+    ).group_by(ResponseAnswer.option_index, ResponseAnswer.answer_text).order_by(
+        count.desc(), ResponseAnswer.option_index, ResponseAnswer.answer_text
+    )
+    if limit is not None:
+        statement = statement.limit(limit)
+    return [
+        (option_index, answer_text, int(total), int(correct or 0))
+        for option_index, answer_text, total, correct in db.session.execute(statement)
+    ]
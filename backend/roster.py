@@ -0,0 +1,205 @@
+"""
+Bulk student account import shared by the roster endpoint and import_roster.py
+
+Rosters are CSV (header: username,email,password[,role]) or a JSON array /
+NDJSON stream of objects with the same fields. Each chunk of rows is
+checked for existing usernames and emails with one set-based query, its
+passwords are hashed in parallel across a process pool (hashing is CPU
+bound and dominates the import), and the accounts are written with one
+multi-row INSERT and one commit per chunk.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from models import db, User
+from passwords import hasher
+from ingest import iter_csv_records, iter_records
+
+DEFAULT_CHUNK_SIZE = 1000
+ROSTER_FORMATS = ('csv', 'ndjson')
+ROLES = ('student', 'admin')
+
+
+def iter_roster(lines, roster_format):
+    """Records from a CSV or JSON/NDJSON roster (JSON may be wrapped as {"users": [...]})"""
+    if roster_format == 'csv':
+        return iter_csv_records(lines)
+    return iter_records(lines, key='users')
+
+
+def _parse_user(record):
+    """Validate one roster row; returns (fields, error)"""
+    if not isinstance(record, dict):
+        return None, 'Row must be an object'
+
+    username = str(record.get('username') or '').strip()
+    email = str(record.get('email') or '').strip().lower()
+    password = record.get('password') or ''
+    role = str(record.get('role') or 'student').strip().lower()
+
+    if not username:
+        return None, 'Username is required'
+    if not email:
+        return None, 'Email is required'
+    if '@' not in email:
+        return None, 'Invalid email format'
+    if not isinstance(password, str) or len(password) < 6:
+        return None, 'Password must be at least 6 characters'
+    if role not in ROLES:
+        return None, 'Role must be either "admin" or "student"'
+
+    return {'username': username, 'email': email, 'password': password, 'role': role}, None
+
+
+def _existing(rows):
+    """Usernames and emails of ``rows`` that are already taken (one query)"""
+    usernames = {fields['username'] for _, fields in rows}
+    emails = {fields['email'] for _, fields in rows}
+    taken = db.session.execute(
+        select(User.username, User.email).where(
+            or_(User.username.in_(usernames), User.email.in_(emails))
+        )
+    ).all()
+    return {username for username, _ in taken}, {email for _, email in taken}
+
+
+def _hash_all(passwords, method, executor, processes):
+    if executor is None:
+        return [generate_password_hash(password, method) for password in passwords]
+    chunksize = max(1, len(passwords) // (processes * 4))
+    return list(executor.map(generate_password_hash, passwords, [method] * len(passwords), chunksize=chunksize))
+
+
+def import_roster(records, chunk_size=DEFAULT_CHUNK_SIZE, processes=None):
+    """
+    Create accounts for every valid, non-conflicting roster row.
+
+    ``records`` is an iterable of (row_number, record, error) tuples from
+    iter_roster. ``processes`` is the size of the hashing process pool
+    (default: one per CPU; 1 hashes in this process). Returns a report with
+    the new user id, or the error / conflicting field, per row.
+    """
+    chunk_size = max(1, int(chunk_size))
+    processes = processes or os.cpu_count() or 1
+    method = hasher.method
+    started = time.perf_counter()
+    results = []
+    created = 0
+    seen_usernames = {}
+    seen_emails = {}
+    records = iter(records)
+    executor = None
+
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+
+            candidates = []
+            for row, record, error in chunk:
+                fields = None
+                if error is None:
+                    fields, error = _parse_user(record)
+                if error:
+                    results.append({'row': row, 'error': error})
+                    continue
+                # Duplicates within the roster itself: the first occurrence wins
+                if fields['username'] in seen_usernames:
+                    results.append({'row': row, 'conflict': 'username', 'username': fields['username'],
+                                    'error': f"Duplicate username (row {seen_usernames[fields['username']]})"})
+                    continue
+                if fields['email'] in seen_emails:
+                    results.append({'row': row, 'conflict': 'email', 'username': fields['username'],
+                                    'error': f"Duplicate email (row {seen_emails[fields['email']]})"})
+                    continue
+                seen_usernames[fields['username']] = row
+                seen_emails[fields['email']] = row
+                candidates.append((row, fields))
+
+            if not candidates:
+                continue
+
+            if executor is None and processes > 1 and len(candidates) > 1:
+                # spawn: forking a threaded web worker is unsafe
+                executor = ProcessPoolExecutor(
+                    max_workers=processes, mp_context=multiprocessing.get_context('spawn')
+                )
+
+            hashed = None
+            for attempt in range(2):
+                taken_usernames, taken_emails = _existing(candidates)
+                valid = []
+                for row, fields in candidates:
+                    if fields['username'] in taken_usernames:
+                        results.append({'row': row, 'conflict': 'username', 'username': fields['username'],
+                                        'error': 'Username already exists'})
+                    elif fields['email'] in taken_emails:
+                        results.append({'row': row, 'conflict': 'email', 'username': fields['username'],
+                                        'error': 'Email already exists'})
+                    else:
+                        valid.append((row, fields))
+                # Return the connection to the pool while the passwords are hashed
+                db.session.rollback()
+                if not valid:
+                    break
+
+                if hashed is None:
+                    hashed = dict(zip(
+                        (row for row, _ in valid),
+                        _hash_all([fields['password'] for _, fields in valid], method, executor, processes)
+                    ))
+
+                mappings = [
+                    {
+                        'username': fields['username'],
+                        'email': fields['email'],
+                        'password_hash': hashed[row],
+                        'role': fields['role']
+                    }
+                    for row, fields in valid
+                ]
+                try:
+                    ids = db.session.scalars(
+                        insert(User).returning(User.id, sort_by_parameter_order=True), mappings
+                    ).all()
+                    db.session.commit()
+                except IntegrityError as e:
+                    # Someone registered one of these names since the check: re-check once
+                    db.session.rollback()
+                    if attempt == 0:
+                        candidates = valid
+                        continue
+                    results.extend({'row': row, 'error': f'Insert failed: {e.orig}'} for row, _ in valid)
+                    break
+
+                created += len(ids)
+                results.extend(
+                    {'row': row, 'user_id': user_id, 'username': fields['username']}
+                    for (row, fields), user_id in zip(valid, ids)
+                )
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    results.sort(key=lambda item: item['row'])
+    conflicts = sum(1 for item in results if 'conflict' in item)
+    failed = sum(1 for item in results if 'error' in item and 'conflict' not in item)
+    return {
+        'received': len(results),
+        'created': created,
+        'conflicts': conflicts,
+        'failed': failed,
+        'hash_method': method,
+        'hash_processes': processes,
+        'elapsed_seconds': round(elapsed, 4),
+        'rows_per_second': round(len(results) / elapsed, 1) if elapsed > 0 else None,
+        'results': results
+    }
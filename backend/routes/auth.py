@@ -1,14 +1,32 @@
 """
 Authentication routes for login and registration
 """
+import io
+import os
+import threading
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, current_user
 from models import db, User
+from passwords import HashingBusy
+import roster
 from datetime import datetime
 
+# One roster import at a time per worker, so uploads cannot multiply its hashing processes
+roster_import_lock = threading.Lock()
+
 auth_bp = Blueprint('auth', __name__)
 
 
+def busy_response():
+    """503 for requests turned away because the password hashing queue is full"""
+    response = jsonify({
+        'error': 'Server busy',
+        'message': 'Too many logins in progress. Please retry in a moment.'
+    })
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
 def validate_email(email):
     """Basic email validation"""
     if not email or '@' not in email:
@@ -59,6 +77,9 @@ def register():
         if User.query.filter_by(email=email).first():
             return jsonify({'error': 'Email already exists'}), 409
         
+        # Hand the database connection back to the pool while the password is hashed
+        db.session.close()
+        
         # Create new user
         user = User(
             username=username,
@@ -79,6 +100,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except HashingBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Registration failed', 'message': str(e)}), 500
@@ -129,9 +153,21 @@ def login():
             (User.username == username_or_email) | (User.email == username_or_email)
         ).first()
         
+        # Hand the database connection back to the pool while the password is
+        # checked (the detached user keeps its loaded columns)
+        db.session.close()
+        
         if not user or not user.check_password(password):
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        # Upgrade hashes stored with outdated PASSWORD_HASH_METHOD parameters
+        if user.rehash_password_if_needed(password):
+            db.session.add(user)
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()  # Keep the old hash; the login itself succeeded
+        
         # Generate token (identity must be a string)
         access_token = create_access_token(identity=str(user.id), additional_claims={'role': user.role})
         
@@ -141,6 +177,9 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except HashingBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -153,18 +192,67 @@ def login():
         return jsonify(error_response), 500
 
 
-@auth_bp.route('/me', methods=['GET'])
+@auth_bp.route('/roster', methods=['POST'])
 @jwt_required()
-def get_current_user():
-    """Get current authenticated user"""
+def import_roster():
+    """
+    Create accounts in bulk from a roster (admin only)
+
+    The body is CSV with a username,email,password[,role] header
+    (Content-Type: text/csv or ?format=csv), or a JSON array / NDJSON stream
+    of objects with the same fields. ?chunk_size= sets the rows per
+    uniqueness check and multi-row INSERT. Passwords are hashed by at most
+    ROSTER_HTTP_HASH_PROCESSES processes, one import per worker at a time.
+    """
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(int(user_id))
+        # Check admin access
+        if not current_user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
         
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        roster_format = request.args.get('format') or (
+            'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        )
+        if roster_format not in roster.ROSTER_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(roster.ROSTER_FORMATS)}"}), 400
+        try:
+            chunk_size = int(request.args.get('chunk_size', current_app.config['BATCH_INSERT_CHUNK_SIZE']))
+        except ValueError:
+            return jsonify({'error': 'chunk_size must be an integer'}), 400
+        
+        processes = min(
+            current_app.config.get('ROSTER_HASH_PROCESSES') or os.cpu_count() or 1,
+            max(current_app.config.get('ROSTER_HTTP_HASH_PROCESSES', 2), 1)
+        )
+        if not roster_import_lock.acquire(blocking=False):
+            response = jsonify({
+                'error': 'Server busy',
+                'message': 'Another roster import is running. Please retry when it has finished.'
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        try:
+            lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+            report = roster.import_roster(
+                roster.iter_roster(lines, roster_format),
+                chunk_size=chunk_size,
+                processes=processes
+            )
+        finally:
+            roster_import_lock.release()
         
-        return jsonify({'user': user.to_dict()}), 200
+        return jsonify(report), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import roster', 'message': str(e)}), 500
+
+
+@auth_bp.route('/me', methods=['GET'])
+@jwt_required()
+def get_current_user():
+    """Get current authenticated user (served from the identity cache)"""
+    try:
+        return jsonify({'user': current_user.to_dict()}), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to get user', 'message': str(e)}), 500
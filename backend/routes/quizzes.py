@@ -1,44 +1,123 @@
 """
 Quiz routes for CRUD operations
 """
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from models import db, Quiz, Question, User
+import io
+from flask import Blueprint, Response, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
+from sqlalchemy import func, insert
+from sqlalchemy.orm import selectinload
+from models import db, Quiz, Question, QuizAttempt, UserResponse, CollectionVersion, can_use_attempt
+from grading import grader_cache
+import item_analysis
+import leaderboard
+import live
+import quiz_stats
+import response_answers
+from http_cache import (
+    collection_etag, is_not_modified, not_modified_response, quiz_etag, with_validators
+)
+from pagination import InvalidCursor, apply_keyset, next_cursor, parse_limit
+from fieldsets import parse_fields, wants
+from exports import EXPORT_FORMATS, YIELD_PER, export_response
+import question_bank
+from question_sync import QuestionSyncError, question_fields, sync_questions, validate_question
+from sampling import PooledQuizError, get_question_pool, validate_draw, validate_pool_size
+from drafts import Draft, DraftError, draft_store, validate_changes
+from identity_cache import optional_user
 from datetime import datetime
 
 quizzes_bp = Blueprint('quizzes', __name__)
 
 
 def require_admin():
-    """Helper function to check if user is admin"""
-    claims = get_jwt()
-    if claims.get('role') != 'admin':
+    """Helper function to check if user is admin (role from the identity cache)"""
+    if not current_user.is_admin:
         return jsonify({'error': 'Admin access required'}), 403
     return None
 
 
 @quizzes_bp.route('', methods=['GET'])
 def get_quizzes():
-    """Get all active quizzes (public) or all quizzes (admin)"""
+    """
+    Get all active quizzes (public) or all quizzes (admin)
+
+    Query parameters:
+        view: 'full' (default) includes questions, 'summary' returns only quiz
+              metadata plus question_count and total_points
+        limit: page size; summary listings are always paginated
+        cursor: opaque next_cursor value from the previous page
+        fields: comma-separated keys to return, e.g. id,title,questions.id
+    """
     try:
-        # Check if user is authenticated and admin
-        is_admin = False
+        # Check if user is authenticated and admin (anonymous: public listing)
+        user = optional_user()
+        is_admin = user is not None and user.is_admin
+        
+        view = request.args.get('view', 'full').strip().lower()
+        if view not in ['full', 'summary']:
+            return jsonify({'error': 'view must be either "full" or "summary"'}), 400
+        
+        paginate = view == 'summary' or 'limit' in request.args or 'cursor' in request.args
         try:
-            claims = get_jwt()
-            is_admin = claims.get('role') == 'admin'
-        except:
-            pass  # Not authenticated, treat as public user
+            limit = parse_limit(request.args.get('limit')) if paginate else None
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Revalidate against the collection version before touching quizzes
+        collection_version, last_modified = CollectionVersion.current(CollectionVersion.QUIZZES)
+        etag = collection_etag(
+            'quizzes', collection_version, 'admin' if is_admin else 'public', request.args.to_dict()
+        )
+        if is_not_modified(etag, last_modified):
+            return not_modified_response(etag, last_modified)
         
-        if is_admin:
-            # Admin can see all quizzes
-            quizzes = Quiz.query.order_by(Quiz.created_at.desc()).all()
+        if view == 'summary':
+            # One aggregate query: quiz columns plus per-quiz question stats
+            query = db.session.query(
+                Quiz,
+                func.count(Question.id),
+                func.coalesce(func.sum(Question.points), 0)
+            ).outerjoin(Question, Question.quiz_id == Quiz.id).group_by(Quiz.id)
+        elif wants(fields, 'questions'):
+            # Load every page's questions in one extra SELECT ... IN (...),
+            # skipping the pools of quizzes that draw questions per attempt
+            pooled = db.select(Quiz.id).where(Quiz.draw_count.is_not(None))
+            query = Quiz.query.options(selectinload(Quiz.questions.and_(Question.quiz_id.not_in(pooled))))
         else:
+            query = Quiz.query
+        
+        if not is_admin:
             # Public users only see active quizzes
-            quizzes = Quiz.query.filter_by(is_active=True).order_by(Quiz.created_at.desc()).all()
+            query = query.filter(Quiz.is_active.is_(True))
         
-        return jsonify({
-            'quizzes': [quiz.to_dict(include_answers=False) for quiz in quizzes]
-        }), 200
+        try:
+            query = apply_keyset(query, Quiz.created_at, Quiz.id, request.args.get('cursor'))
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if limit is None:
+            response = jsonify({
+                'quizzes': [quiz.to_dict(include_answers=False, fields=fields) for quiz in query.all()]
+            })
+            return with_validators(response, etag, last_modified), 200
+        
+        rows = query.limit(limit + 1).all()
+        if view == 'summary':
+            rows, cursor = next_cursor(rows, limit, lambda row: (row[0].created_at, row[0].id))
+            quizzes = [
+                quiz.to_summary_dict(question_count=count, total_points=int(points), fields=fields)
+                for quiz, count, points in rows
+            ]
+        else:
+            rows, cursor = next_cursor(rows, limit, lambda quiz: (quiz.created_at, quiz.id))
+            quizzes = [quiz.to_dict(include_answers=False, fields=fields) for quiz in rows]
+        
+        response = jsonify({
+            'quizzes': quizzes,
+            'next_cursor': cursor
+        })
+        return with_validators(response, etag, last_modified), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch quizzes', 'message': str(e)}), 500
@@ -46,29 +125,412 @@ def get_quizzes():
 
 @quizzes_bp.route('/<int:quiz_id>', methods=['GET'])
 def get_quiz(quiz_id):
-    """Get a specific quiz by ID (without answers for public, with answers for admin)"""
+    """
+    Get a specific quiz by ID (without answers for public, with answers for admin)
+
+    Query parameters:
+        fields: comma-separated keys to return, e.g. id,title,questions.id
+    """
     try:
-        quiz = Quiz.query.get_or_404(quiz_id)
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Questions are loaded lazily, only once the conditional check has
+        # decided a full body is needed
+        quiz = db.session.get(Quiz, quiz_id)
+        if quiz is None:
+            return jsonify({'error': 'Quiz not found'}), 404
         
         # Check if quiz is active (for public users)
-        is_admin = False
-        include_answers = False
-        try:
-            claims = get_jwt()
-            is_admin = claims.get('role') == 'admin'
-            include_answers = is_admin
-        except:
-            pass  # Not authenticated
+        user = optional_user()
+        is_admin = user is not None and user.is_admin
+        include_answers = is_admin
         
         if not is_admin and not quiz.is_active:
             return jsonify({'error': 'Quiz not found or not available'}), 404
         
+        etag = quiz_etag(
+            quiz.id, quiz.version, include_answers=include_answers, fields=request.args.get('fields')
+        )
+        if is_not_modified(etag, quiz.updated_at):
+            return not_modified_response(etag, quiz.updated_at)
+        
+        response = jsonify({
+            'quiz': quiz.to_dict(include_answers=include_answers, fields=fields)
+        })
+        return with_validators(response, etag, quiz.updated_at), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch quiz', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/<int:quiz_id>/attempts', methods=['POST'])
+@jwt_required(optional=True)
+def start_attempt(quiz_id):
+    """
+    Start an attempt: draw this attempt's questions (no authentication required)
+
+    Quizzes with draw_count set get draw_count questions picked at random
+    from the pool (stratified by draw_by); other quizzes get every question.
+    The drawn ids are stored on the attempt, and submitting with its
+    attempt_id grades exactly those questions. The response's
+    attempt.token must be presented to resume, autosave or submit the
+    attempt (a logged-in owner may omit it).
+    """
+    try:
+        quiz = db.session.query(
+            Quiz.title, Quiz.description, Quiz.is_active, Quiz.version, Quiz.draw_count, Quiz.draw_by
+        ).filter(Quiz.id == quiz_id).first()
+        if quiz is None or not quiz.is_active:
+            return jsonify({'error': 'Quiz not found or not available'}), 404
+        
+        user_id = None
+        try:
+            user_id_str = get_jwt_identity()
+            user_id = int(user_id_str) if user_id_str else None
+        except:
+            pass  # Anonymous attempt
+        
+        # Ids come from the cached pool; only the drawn rows are read
+        pool = get_question_pool(quiz_id, quiz.version, quiz.draw_by if quiz.draw_count else None)
+        question_ids = pool.draw(quiz.draw_count) if quiz.draw_count else pool.all_ids()
+        if not question_ids:
+            return jsonify({'error': 'Quiz has no questions'}), 400
+        by_id = {q.id: q for q in Question.query.filter(Question.id.in_(question_ids))}
+        questions = [by_id[qid] for qid in question_ids if qid in by_id]
+        
+        attempt = QuizAttempt(
+            quiz_id=quiz_id,
+            user_id=user_id,
+            quiz_version=quiz.version,
+            question_ids=[q.id for q in questions],
+            total_points=sum(q.points for q in questions)
+        )
+        db.session.add(attempt)
+        db.session.flush()
+        # Serialize before commit expires the loaded rows
+        result = {
+            'attempt': attempt.to_dict(include_token=True),
+            'quiz': {'id': quiz_id, 'title': quiz.title, 'description': quiz.description},
+            'questions': [q.to_dict(include_answer=False) for q in questions]
+        }
+        db.session.commit()
+        
+        return jsonify(result), 201
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to start attempt', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/<int:quiz_id>/attempts/<int:attempt_id>', methods=['GET'])
+@jwt_required(optional=True)
+def get_attempt(quiz_id, attempt_id):
+    """
+    Resume an attempt: its questions and autosaved draft (no authentication required)
+
+    Requires the attempt's token in X-Attempt-Token unless the caller is
+    logged in as its owner. The draft is the newer of this worker's cached
+    copy and the last flushed copy in quiz_attempts.
+    """
+    try:
+        attempt = db.session.get(QuizAttempt, attempt_id)
+        
+        user_id = None
+        try:
+            user_id_str = get_jwt_identity()
+            user_id = int(user_id_str) if user_id_str else None
+        except:
+            pass  # Anonymous attempt
+        
+        token = request.headers.get('X-Attempt-Token')
+        if (attempt is None or attempt.quiz_id != quiz_id
+                or not can_use_attempt(attempt.token, attempt.user_id, token, user_id)):
+            return jsonify({'error': 'Attempt not found'}), 404
+        if attempt.submitted_at is not None:
+            return jsonify({'error': 'Attempt already submitted'}), 409
+        
+        quiz = db.session.query(Quiz.title, Quiz.description).filter(Quiz.id == quiz_id).first()
+        by_id = {q.id: q for q in Question.query.filter(Question.id.in_(attempt.question_ids))}
+        draft = draft_store.reconcile(attempt_id, Draft(
+            quiz_id, attempt.user_id, attempt.token, attempt.question_ids,
+            attempt.draft_answers, attempt.draft_revision, attempt.draft_saved_at
+        ))
+        
         return jsonify({
-            'quiz': quiz.to_dict(include_answers=include_answers)
+            'attempt': attempt.to_dict(),
+            'quiz': {'id': quiz_id, 'title': quiz.title, 'description': quiz.description},
+            'questions': [
+                by_id[qid].to_dict(include_answer=False) for qid in attempt.question_ids if qid in by_id
+            ],
+            'draft': {key: draft[key] for key in ('answers', 'revision', 'saved_at')}
         }), 200
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch quiz', 'message': str(e)}), 500
+        return jsonify({'error': 'Failed to fetch attempt', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/<int:quiz_id>/attempts/<int:attempt_id>/draft', methods=['PATCH'])
+@jwt_required(optional=True)
+def save_draft(quiz_id, attempt_id):
+    """
+    Autosave an in-progress attempt's answers (no authentication required)
+
+    Body: {"answers": {question_id: answer}}, merged into the draft; null
+    clears an answer. Requires the attempt's token in X-Attempt-Token
+    unless the caller is logged in as its owner. Saves are coalesced in
+    memory and written to quiz_attempts at a bounded rate (see drafts.py);
+    a cached draft is saved without touching the database.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        changes = data.get('answers')
+        try:
+            validate_changes(changes)
+        except DraftError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        user_id = None
+        try:
+            user_id_str = get_jwt_identity()
+            user_id = int(user_id_str) if user_id_str else None
+        except:
+            pass  # Anonymous attempt
+        
+        token = request.headers.get('X-Attempt-Token')
+        try:
+            cached = draft_store.get(attempt_id)
+            if cached is not None and (
+                cached['quiz_id'] != quiz_id
+                or not can_use_attempt(cached['token'], cached['user_id'], token, user_id)
+            ):
+                return jsonify({'error': 'Attempt not found'}), 404
+            draft = draft_store.save(attempt_id, changes) if cached is not None else None
+            if draft is None:
+                # Not cached in this worker: start from the last flushed state
+                attempt = db.session.query(
+                    QuizAttempt.quiz_id, QuizAttempt.user_id, QuizAttempt.token, QuizAttempt.question_ids,
+                    QuizAttempt.submitted_at, QuizAttempt.draft_answers, QuizAttempt.draft_revision,
+                    QuizAttempt.draft_saved_at
+                ).filter(QuizAttempt.id == attempt_id).first()
+                if (attempt is None or attempt.quiz_id != quiz_id
+                        or not can_use_attempt(attempt.token, attempt.user_id, token, user_id)):
+                    return jsonify({'error': 'Attempt not found'}), 404
+                if attempt.submitted_at is not None:
+                    return jsonify({'error': 'Attempt already submitted'}), 409
+                draft = draft_store.save(attempt_id, changes, seed=Draft(
+                    quiz_id, attempt.user_id, attempt.token, attempt.question_ids,
+                    attempt.draft_answers, attempt.draft_revision, attempt.draft_saved_at
+                ))
+        except DraftError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'attempt_id': attempt_id,
+            'revision': draft['revision'],
+            'saved_at': draft['saved_at'],
+            'answer_count': len(draft['answers'])
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to save draft', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/<int:quiz_id>/stats', methods=['GET'])
+@jwt_required()
+def get_quiz_stats(quiz_id):
+    """Get score aggregates and per-question correctness for a quiz (admin only)"""
+    try:
+        # Check admin access
+        admin_check = require_admin()
+        if admin_check:
+            return admin_check
+        
+        if db.session.query(Quiz.id).filter(Quiz.id == quiz_id).first() is None:
+            return jsonify({'error': 'Quiz not found'}), 404
+        
+        return jsonify({'stats': quiz_stats.get_quiz_stats(quiz_id)}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch quiz stats', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/<int:quiz_id>/item-analysis', methods=['GET'])
+@jwt_required()
+def get_item_analysis(quiz_id):
+    """
+    Get item difficulty, discrimination, distractors and Cronbach's alpha (admin only)
+
+    Cached per quiz version; only submissions newer than the cached run are
+    processed. ?refresh=1 recomputes from scratch.
+    """
+    try:
+        # Check admin access
+        admin_check = require_admin()
+        if admin_check:
+            return admin_check
+        
+        refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+        try:
+            result = item_analysis.analyze_quiz(quiz_id, refresh=refresh)
+        except PooledQuizError as e:
+            return jsonify({'error': str(e)}), 400
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 404
+        
+        return jsonify({'analysis': result}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to compute item analysis', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/<int:quiz_id>/questions/<int:question_id>/answers', methods=['GET'])
+@jwt_required()
+def get_answer_distribution(quiz_id, question_id):
+    """
+    Count the answers given to one question, most frequent first (admin only)
+
+    Grouped in SQL over response_answers: chosen options by index (with
+    their text) and other answers by normalized text; blank answers have
+    neither. correct_count uses the key each submission was graded with.
+
+    Query parameters:
+        limit: distinct answers to return (default 20, max 100)
+    """
+    try:
+        # Check admin access
+        admin_check = require_admin()
+        if admin_check:
+            return admin_check
+        
+        question = db.session.query(Question.question_type, Question.options).filter(
+            Question.id == question_id, Question.quiz_id == quiz_id
+        ).first()
+        if question is None:
+            return jsonify({'error': 'Question not found'}), 404
+        
+        try:
+            limit = parse_limit(request.args.get('limit'), default=20, maximum=100)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        responses, correct = response_answers.question_correctness([question_id]).get(question_id, (0, 0))
+        options = question.options if isinstance(question.options, list) else []
+        distribution = [
+            {
+                'option_index': option_index,
+                'option': options[option_index] if option_index is not None and option_index < len(options) else None,
+                'answer_text': answer_text,
+                'count': count,
+                'correct_count': correct_count
+            }
+            for option_index, answer_text, count, correct_count
+            in response_answers.answer_distribution(question_id, limit=limit)
+        ]
+        
+        return jsonify({
+            'quiz_id': quiz_id,
+            'question_id': question_id,
+            'question_type': question.question_type,
+            'responses': responses,
+            'correct_count': correct,
+            'correct_rate': round(correct / responses, 4) if responses else None,
+            'distribution': distribution
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch answer distribution', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/<int:quiz_id>/leaderboard', methods=['GET'])
+def get_leaderboard(quiz_id):
+    """
+    Get the top scores for a quiz (?limit=, default 10, max 100)
+
+    ?submission_id= additionally returns that submission's own rank. Only
+    admins, the logged-in submitter, or a caller presenting the submission's
+    attempt token in X-Attempt-Token may look a submission up.
+    """
+    try:
+        quiz = db.session.query(Quiz.is_active).filter(Quiz.id == quiz_id).first()
+        if quiz is None:
+            return jsonify({'error': 'Quiz not found'}), 404
+        
+        user = optional_user()
+        is_admin = user is not None and user.is_admin
+        
+        if not is_admin and not quiz.is_active:
+            return jsonify({'error': 'Quiz not found or not available'}), 404
+        
+        try:
+            limit = parse_limit(request.args.get('limit'), default=10, maximum=leaderboard.MAX_ENTRIES)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        entries = leaderboard.leaderboard_cache.top(quiz_id, limit)
+        body = {
+            'quiz_id': quiz_id,
+            'leaderboard': [leaderboard.to_dict(entry, rank) for rank, entry in enumerate(entries, start=1)]
+        }
+        
+        submission_id = request.args.get('submission_id', type=int)
+        if submission_id is not None:
+            submission = db.session.query(
+                UserResponse.id, UserResponse.participant_name, UserResponse.user_id,
+                UserResponse.score, UserResponse.total_points, UserResponse.submitted_at,
+                QuizAttempt.token
+            ).outerjoin(QuizAttempt, QuizAttempt.id == UserResponse.attempt_id).filter(
+                UserResponse.id == submission_id, UserResponse.quiz_id == quiz_id
+            ).first()
+            token = request.headers.get('X-Attempt-Token')
+            if submission is None or not (is_admin or can_use_attempt(
+                    submission.token, submission.user_id, token, user.id if user is not None else None)):
+                return jsonify({'error': 'Submission not found'}), 404
+            rank = leaderboard.rank_of(quiz_id, submission.score, submission.submitted_at, submission.id)
+            body['you'] = leaderboard.to_dict(leaderboard.entry_for(submission), rank)
+        
+        return jsonify(body), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch leaderboard', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/<int:quiz_id>/live', methods=['GET'])
+def stream_live_scores(quiz_id):
+    """
+    Server-sent event stream of a quiz's submission count and leaderboard
+
+    Each ``scores`` event carries {quiz_id, submissions, leaderboard} and is
+    sent when they change, at most once per LIVE_TICK_INTERVAL seconds. The
+    first event is sent on connect; comments keep idle streams open.
+    """
+    try:
+        quiz = db.session.query(Quiz.is_active).filter(Quiz.id == quiz_id).first()
+        if quiz is None:
+            return jsonify({'error': 'Quiz not found'}), 404
+        
+        user = optional_user()
+        is_admin = user is not None and user.is_admin
+        
+        if not is_admin and not quiz.is_active:
+            return jsonify({'error': 'Quiz not found or not available'}), 404
+        
+        try:
+            channel = live.broadcaster.join(quiz_id)
+        except live.LiveFull as e:
+            return jsonify({'error': 'Too many live streams', 'message': str(e)}), 503, {'Retry-After': '5'}
+        
+        response = Response(live.broadcaster.stream(channel), mimetype='text/event-stream')
+        response.call_on_close(lambda: live.broadcaster.leave(channel))
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Unbuffered behind nginx
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to open live stream', 'message': str(e)}), 500
 
 
 @quizzes_bp.route('', methods=['POST'])
@@ -96,62 +558,34 @@ def create_quiz():
             return jsonify({'error': 'Quiz title is required'}), 400
         if not questions_data or len(questions_data) == 0:
             return jsonify({'error': 'At least one question is required'}), 400
+        error = validate_draw(data) or validate_pool_size(data.get('draw_count'), len(questions_data))
+        if error:
+            return jsonify({'error': error}), 400
         
         # Validate questions
         for idx, q_data in enumerate(questions_data):
-            question_text = q_data.get('question_text', '').strip()
-            question_type = q_data.get('question_type', '').strip().lower()
-            correct_answer = q_data.get('correct_answer', '').strip()
-            points = q_data.get('points', 1)
-            options = q_data.get('options', [])
-            
-            if not question_text:
-                return jsonify({'error': f'Question {idx + 1}: Question text is required'}), 400
-            if question_type not in ['multiple_choice', 'true_false', 'text']:
-                return jsonify({'error': f'Question {idx + 1}: Invalid question type'}), 400
-            if not correct_answer:
-                return jsonify({'error': f'Question {idx + 1}: Correct answer is required'}), 400
-            
-            # Validate options for MCQ
-            if question_type == 'multiple_choice':
-                if not options or len(options) < 2:
-                    return jsonify({'error': f'Question {idx + 1}: Multiple choice questions require at least 2 options'}), 400
-                if correct_answer not in options:
-                    return jsonify({'error': f'Question {idx + 1}: Correct answer must be one of the options'}), 400
-            elif question_type == 'true_false':
-                if correct_answer.lower() not in ['true', 'false']:
-                    return jsonify({'error': f'Question {idx + 1}: True/False questions must have "True" or "False" as correct answer'}), 400
-        
-        # Get current user (JWT identity is a string, convert to int)
-        user_id = get_jwt_identity()
-        user = User.query.get(int(user_id))
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Create quiz
+            error = validate_question(q_data)
+            if error:
+                return jsonify({'error': f'Question {idx + 1}: {error}'}), 400
+        
+        # Create quiz (the JWT user lookup already ensured the user exists)
         quiz = Quiz(
             title=title,
             description=description,
-            created_by=user_id,
-            is_active=is_active
+            created_by=current_user.id,
+            is_active=is_active,
+            draw_count=data.get('draw_count'),
+            draw_by=data.get('draw_by')
         )
         db.session.add(quiz)
         db.session.flush()  # Get quiz.id
         
-        # Create questions
-        for idx, q_data in enumerate(questions_data):
-            question = Question(
-                quiz_id=quiz.id,
-                question_text=q_data.get('question_text', '').strip(),
-                question_type=q_data.get('question_type', '').strip().lower(),
-                options=q_data.get('options', []),
-                correct_answer=q_data.get('correct_answer', '').strip(),
-                points=q_data.get('points', 1),
-                order=idx
-            )
-            db.session.add(question)
+        # Create questions with one multi-row INSERT
+        db.session.execute(insert(Question), [
+            {'quiz_id': quiz.id, **question_fields(q_data, idx)} for idx, q_data in enumerate(questions_data)
+        ])
         
+        CollectionVersion.bump(CollectionVersion.QUIZZES)
         db.session.commit()
         
         return jsonify({
@@ -164,10 +598,93 @@ def create_quiz():
         return jsonify({'error': 'Failed to create quiz', 'message': str(e)}), 500
 
 
+@quizzes_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_question_bank():
+    """
+    Stream quizzes with their questions as NDJSON or CSV (admin only)
+
+    One row per question with its quiz's columns (see question_bank.py);
+    ?quiz_id= (repeatable) limits the export to those quizzes.
+    """
+    try:
+        # Check admin access
+        admin_check = require_admin()
+        if admin_check:
+            return admin_check
+        
+        export_format = request.args.get('format', 'ndjson').strip().lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'format must be either "ndjson" or "csv"'}), 400
+        try:
+            quiz_ids = [int(value) for value in request.args.getlist('quiz_id')]
+        except ValueError:
+            return jsonify({'error': 'quiz_id must be an integer'}), 400
+        
+        rows = question_bank.iter_bank_rows(question_bank.bank_statement(quiz_ids), YIELD_PER)
+        return export_response(rows, export_format, 'question-bank', question_bank.BANK_FIELDS)
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to export questions', 'message': str(e)}), 500
+
+
+@quizzes_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_question_bank():
+    """
+    Create quizzes and questions from a question bank (admin only)
+
+    The body is CSV (Content-Type: text/csv or ?format=csv) or an NDJSON
+    stream / JSON array of bank rows, as written by GET /api/quizzes/export.
+    ?quiz_id= appends every question to that existing quiz instead of
+    creating quizzes; ?chunk_size= sets the rows per multi-row INSERT.
+    """
+    try:
+        # Check admin access
+        admin_check = require_admin()
+        if admin_check:
+            return admin_check
+        
+        bank_format = request.args.get('format') or (
+            'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        )
+        if bank_format not in question_bank.BANK_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(question_bank.BANK_FORMATS)}"}), 400
+        try:
+            chunk_size = int(request.args.get('chunk_size', current_app.config['BATCH_INSERT_CHUNK_SIZE']))
+            into_quiz_id = int(request.args['quiz_id']) if 'quiz_id' in request.args else None
+        except ValueError:
+            return jsonify({'error': 'chunk_size and quiz_id must be integers'}), 400
+        
+        created_by = current_user.id
+        db.session.close()  # Chunks commit on their own; start from a clean session
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+        report = question_bank.import_question_bank(
+            question_bank.iter_bank(lines, bank_format),
+            created_by,
+            chunk_size=chunk_size,
+            into_quiz_id=into_quiz_id
+        )
+        
+        return jsonify(report), 200
+        
+    except question_bank.BankImportError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import questions', 'message': str(e)}), 500
+
+
 @quizzes_bp.route('/<int:quiz_id>', methods=['PUT'])
 @jwt_required()
 def update_quiz(quiz_id):
-    """Update a quiz (admin only)"""
+    """
+    Update a quiz (admin only)
+
+    Questions carrying an ``id`` are updated in place, questions without one
+    are added and questions left out are deleted; only rows that changed are
+    written, and the response reports which.
+    """
     try:
         # Check admin access
         admin_check = require_admin()
@@ -187,6 +704,23 @@ def update_quiz(quiz_id):
             quiz.description = data['description'].strip() or None
         if 'is_active' in data:
             quiz.is_active = bool(data['is_active'])
+        error = validate_draw(data)
+        if error:
+            return jsonify({'error': error}), 400
+        draw_count = data['draw_count'] if 'draw_count' in data else quiz.draw_count
+        if draw_count:
+            # An empty or short pool would make every new attempt fail
+            if 'questions' in data:
+                pool_size = len(data['questions']) if isinstance(data['questions'], list) else 0
+            else:
+                pool_size = db.session.query(func.count(Question.id)).filter(Question.quiz_id == quiz_id).scalar()
+            error = validate_pool_size(draw_count, pool_size)
+            if error:
+                return jsonify({'error': error}), 400
+        if 'draw_count' in data:
+            quiz.draw_count = data['draw_count']
+        if 'draw_by' in data:
+            quiz.draw_by = data['draw_by']
         
         # Update questions if provided
         if 'questions' in data:
@@ -194,50 +728,32 @@ def update_quiz(quiz_id):
             
             # Validate questions
             for idx, q_data in enumerate(questions_data):
-                question_text = q_data.get('question_text', '').strip()
-                question_type = q_data.get('question_type', '').strip().lower()
-                correct_answer = q_data.get('correct_answer', '').strip()
-                points = q_data.get('points', 1)
-                options = q_data.get('options', [])
-                
-                if not question_text:
-                    return jsonify({'error': f'Question {idx + 1}: Question text is required'}), 400
-                if question_type not in ['multiple_choice', 'true_false', 'text']:
-                    return jsonify({'error': f'Question {idx + 1}: Invalid question type'}), 400
-                if not correct_answer:
-                    return jsonify({'error': f'Question {idx + 1}: Correct answer is required'}), 400
-                
-                # Validate options for MCQ
-                if question_type == 'multiple_choice':
-                    if not options or len(options) < 2:
-                        return jsonify({'error': f'Question {idx + 1}: Multiple choice questions require at least 2 options'}), 400
-                    if correct_answer not in options:
-                        return jsonify({'error': f'Question {idx + 1}: Correct answer must be one of the options'}), 400
-                elif question_type == 'true_false':
-                    if correct_answer.lower() not in ['true', 'false']:
-                        return jsonify({'error': f'Question {idx + 1}: True/False questions must have "True" or "False" as correct answer'}), 400
+                error = validate_question(q_data)
+                if error:
+                    return jsonify({'error': f'Question {idx + 1}: {error}'}), 400
             
-            # Delete existing questions
-            Question.query.filter_by(quiz_id=quiz_id).delete()
-            
-            # Create new questions
-            for idx, q_data in enumerate(questions_data):
-                question = Question(
-                    quiz_id=quiz_id,
-                    question_text=q_data.get('question_text', '').strip(),
-                    question_type=q_data.get('question_type', '').strip().lower(),
-                    options=q_data.get('options', []),
-                    correct_answer=q_data.get('correct_answer', '').strip(),
-                    points=q_data.get('points', 1),
-                    order=idx
-                )
-                db.session.add(question)
+            # Write only the questions that changed
+            try:
+                changes = sync_questions(quiz_id, questions_data)
+            except QuestionSyncError as e:
+                db.session.rollback()
+                return jsonify({'error': str(e)}), 400
+        else:
+            changes = {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': None}
+        
+        # Any content change invalidates grading plans in every worker
+        questions_changed = bool(changes['inserted'] or changes['updated'] or changes['deleted'])
+        if questions_changed or db.session.is_modified(quiz):
+            quiz.bump_version()
+            CollectionVersion.bump(CollectionVersion.QUIZZES)
         
         db.session.commit()
+        grader_cache.invalidate(quiz_id)
         
         return jsonify({
             'message': 'Quiz updated successfully',
-            'quiz': quiz.to_dict(include_answers=True)
+            'quiz': quiz.to_dict(include_answers=True),
+            'changes': changes
         }), 200
         
     except Exception as e:
@@ -258,7 +774,9 @@ def delete_quiz(quiz_id):
         quiz = Quiz.query.get_or_404(quiz_id)
         
         db.session.delete(quiz)
+        CollectionVersion.bump(CollectionVersion.QUIZZES)
         db.session.commit()
+        grader_cache.invalidate(quiz_id)
         
         return jsonify({'message': 'Quiz deleted successfully'}), 200
         
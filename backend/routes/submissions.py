@@ -1,19 +1,56 @@
 """
 Submission routes for quiz submissions and scoring
 """
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from models import db, Quiz, Question, UserResponse, User
+import io
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity, current_user
+from sqlalchemy import update
+from sqlalchemy.orm import defer
+from models import db, Quiz, QuizAttempt, UserResponse, can_use_attempt
+from grading import get_grading_plan
+from quiz_stats import record_submission
+from ingest import IngestError, ingest_submissions, iter_records
+from exports import EXPORT_FORMATS, YIELD_PER, export_response
+from pagination import InvalidCursor, apply_keyset, next_cursor, parse_limit
+from fieldsets import parse_fields, wants
+from metrics import metrics
+import leaderboard
+import live
+import response_answers
+from drafts import Draft, draft_store
+from sampling import PooledQuizError
+import write_behind
 from datetime import datetime
 
 submissions_bp = Blueprint('submissions', __name__)
 
+SUBMISSIONS_PAGE_SIZE = 100
+SUBMISSIONS_MAX_PAGE_SIZE = 1000
+
+SUBMISSION_EXPORT_FIELDS = [
+    'id', 'user_id', 'quiz_id', 'participant_name', 'score', 'total_points', 'submitted_at', 'answers'
+]
+
 
 @submissions_bp.route('/quizzes/<int:quiz_id>/submit', methods=['POST'])
+@jwt_required(optional=True)
 def submit_quiz(quiz_id):
-    """Submit quiz answers and get results (no authentication required for students)"""
+    """
+    Submit quiz answers and get results (no authentication required for students)
+
+    Quizzes with draw_count set require the attempt_id returned by
+    POST /api/quizzes/<id>/attempts, with its attempt_token (or the
+    X-Attempt-Token header) unless the owner is logged in; only that
+    attempt's questions are graded, and each attempt can be submitted once. Submitting an attempt
+    finalizes its autosaved draft: draft answers the request leaves out
+    are graded too, and the draft is cleared.
+    """
     try:
-        quiz = Quiz.query.get_or_404(quiz_id)
+        # Only the quiz's status columns are read per request; questions come
+        # from the compiled grading plan cached for this quiz version
+        quiz = db.session.query(Quiz.is_active, Quiz.version, Quiz.draw_count).filter(Quiz.id == quiz_id).first()
+        if quiz is None:
+            return jsonify({'error': 'Quiz not found'}), 404
         
         # Check if quiz is active
         if not quiz.is_active:
@@ -26,7 +63,7 @@ def submit_quiz(quiz_id):
         answers = data.get('answers', {})  # {question_id: answer}
         participant_name = data.get('name', '').strip()  # Student name (optional)
         
-        if not answers:
+        if not answers and data.get('attempt_id') is None:
             return jsonify({'error': 'No answers provided'}), 400
         
         # Get user ID if authenticated (optional - only for logged-in users)
@@ -37,31 +74,93 @@ def submit_quiz(quiz_id):
         except:
             pass  # Anonymous submission - this is allowed for students
         
-        # Calculate score
-        total_points = 0
-        earned_points = 0
-        results = {}
+        attempt_id = data.get('attempt_id')
+        if attempt_id is None and quiz.draw_count:
+            return jsonify({'error': 'attempt_id is required: start an attempt with POST /api/quizzes/<id>/attempts'}), 400
         
-        for question in quiz.questions:
-            question_id = question.id
-            user_answer = answers.get(str(question_id)) or answers.get(question_id)
+        plan = get_grading_plan(quiz_id, quiz.version)
+        if attempt_id is not None:
+            attempt = db.session.query(
+                QuizAttempt.quiz_id, QuizAttempt.user_id, QuizAttempt.token, QuizAttempt.question_ids,
+                QuizAttempt.draft_answers, QuizAttempt.draft_revision, QuizAttempt.draft_saved_at
+            ).filter(QuizAttempt.id == attempt_id).first() if isinstance(attempt_id, int) else None
+            token = data.get('attempt_token') or request.headers.get('X-Attempt-Token')
+            if (attempt is None or attempt.quiz_id != quiz_id
+                    or not can_use_attempt(attempt.token, attempt.user_id, token, user_id)):
+                return jsonify({'error': 'Attempt not found'}), 404
             
-            total_points += question.points
-            is_correct = question.check_answer(user_answer) if user_answer is not None else False
+            # Answers sent now win over the autosaved draft (the newer of this
+            # worker's cached copy and the one another worker may have flushed)
+            draft_answers = draft_store.reconcile(attempt_id, Draft(
+                quiz_id, attempt.user_id, attempt.token, attempt.question_ids,
+                attempt.draft_answers, attempt.draft_revision, attempt.draft_saved_at
+            ))['answers']
+            if draft_answers:
+                answers = {**draft_answers, **answers}
+            if not answers:
+                return jsonify({'error': 'No answers provided'}), 400
             
-            if is_correct:
-                earned_points += question.points
-            
-            results[question_id] = {
-                'question_id': question_id,
-                'question_text': question.question_text,
-                'question_type': question.question_type,
-                'user_answer': user_answer,
-                'correct_answer': question.correct_answer,
-                'is_correct': is_correct,
-                'points': question.points,
-                'earned_points': question.points if is_correct else 0
+            # Claim the attempt: a concurrent or repeated submit matches no row
+            claimed = db.session.execute(
+                update(QuizAttempt).where(
+                    QuizAttempt.id == attempt_id, QuizAttempt.submitted_at.is_(None)
+                ).values(submitted_at=datetime.utcnow(), draft_answers=None)
+            ).rowcount
+            if not claimed:
+                db.session.rollback()
+                return jsonify({'error': 'Attempt already submitted'}), 409
+            plan = plan.subset(attempt.question_ids)
+        
+        # Calculate score
+        earned_points, total_points, results = plan.grade(answers)
+        metrics.submissions_graded(
+            'single', 1, len(results), sum(1 for r in results.values() if r['is_correct'])
+        )
+        
+        result = {
+            'message': 'Quiz submitted successfully',
+            'participant_name': participant_name,
+            'score': earned_points,
+            'total_points': total_points,
+            'percentage': round((earned_points / total_points * 100) if total_points > 0 else 0, 2),
+            'attempt_id': attempt_id,
+            'results': results
+        }
+        
+        if write_behind.is_enabled():
+            # Journal locally and reply; the background writer inserts the row
+            db.session.commit()  # The attempt claim, if any
+            record = {
+                'user_id': user_id,
+                'quiz_id': quiz_id,
+                'participant_name': participant_name if participant_name else None,
+                'answers': answers,
+                'score': earned_points,
+                'total_points': total_points,
+                'submitted_at': datetime.utcnow().isoformat(),
+                'quiz_version': plan.version,
+                'correct_question_ids': [qid for qid, r in results.items() if r['is_correct']],
+                'attempt_id': attempt_id,
+                'question_ids': [q.id for q in plan.questions] if attempt_id is not None else None,
+                'answer_rows': response_answers.submission_rows(plan, results)
             }
+            try:
+                provisional_id = write_behind.enqueue_submission(record)
+            except Exception:
+                if attempt_id is not None:
+                    # Nothing was stored: undo the claim so the attempt can be submitted again
+                    db.session.execute(
+                        update(QuizAttempt).where(QuizAttempt.id == attempt_id).values(
+                            submitted_at=None, draft_answers=attempt.draft_answers
+                        )
+                    )
+                    db.session.commit()
+                raise
+            if attempt_id is not None:
+                draft_store.finalize(attempt_id)
+            result['submission_id'] = None
+            result['provisional_id'] = provisional_id
+            return jsonify(result), 202
         
         # Save response to database
         response = UserResponse(
@@ -70,66 +169,169 @@ def submit_quiz(quiz_id):
             participant_name=participant_name if participant_name else None,
             answers=answers,
             score=earned_points,
-            total_points=total_points
+            total_points=total_points,
+            attempt_id=attempt_id
         )
         db.session.add(response)
+        db.session.flush()
+        result['submission_id'] = response.id  # Read before commit expires the instance
+        entry = leaderboard.entry_for(response)
+        response_answers.insert_rows(response_answers.submission_rows(plan, results, response.id))
+        record_submission(plan, earned_points, results)
         db.session.commit()
+        if attempt_id is not None:
+            draft_store.finalize(attempt_id)
+        leaderboard.offer_submission(quiz_id, entry)
+        live.publish(quiz_id)
         
-        return jsonify({
-            'message': 'Quiz submitted successfully',
-            'participant_name': participant_name,
-            'score': earned_points,
-            'total_points': total_points,
-            'percentage': round((earned_points / total_points * 100) if total_points > 0 else 0, 2),
-            'results': results,
-            'submission_id': response.id
-        }), 200
+        return jsonify(result), 200
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to submit quiz', 'message': str(e)}), 500
 
 
+@submissions_bp.route('/quizzes/<int:quiz_id>/submit/batch', methods=['POST'])
+@jwt_required()
+def submit_quiz_batch(quiz_id):
+    """
+    Bulk-load graded submissions for a quiz (admin only)
+
+    The body is a JSON array of {"name", "answers", "user_id"?, "submitted_at"?}
+    objects or an NDJSON stream of them (Content-Type: application/x-ndjson).
+    ?chunk_size= sets the rows per multi-row INSERT and transaction.
+    """
+    try:
+        # Check admin access
+        if not current_user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        try:
+            chunk_size = int(request.args.get('chunk_size', current_app.config['BATCH_INSERT_CHUNK_SIZE']))
+        except ValueError:
+            return jsonify({'error': 'chunk_size must be an integer'}), 400
+        
+        lines = io.TextIOWrapper(request.stream, encoding='utf-8')
+        report = ingest_submissions(quiz_id, iter_records(lines), chunk_size=chunk_size)
+        metrics.submissions_graded('batch', report['graded'], report['answers_graded'], report['answers_correct'])
+        
+        return jsonify(report), 200
+        
+    except PooledQuizError as e:
+        return jsonify({'error': str(e)}), 400
+    except IngestError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to ingest submissions', 'message': str(e)}), 500
+
+
 @submissions_bp.route('/quizzes/<int:quiz_id>/submissions', methods=['GET'])
 @jwt_required()
 def get_quiz_submissions(quiz_id):
-    """Get all submissions for a quiz (admin only)"""
+    """
+    Get a quiz's submissions newest-first, one page at a time (admin only)
+
+    Query parameters:
+        limit: page size (default 100, max 1000)
+        cursor: opaque next_cursor value from the previous page
+        fields: comma-separated keys to return, e.g. id,user_id,score
+    """
     try:
         # Check admin access
-        claims = get_jwt()
-        if claims.get('role') != 'admin':
+        if not current_user.is_admin:
             return jsonify({'error': 'Admin access required'}), 403
         
-        quiz = Quiz.query.get_or_404(quiz_id)
+        quiz = db.session.get(Quiz, quiz_id)
+        if quiz is None:
+            return jsonify({'error': 'Quiz not found'}), 404
+        
+        try:
+            limit = parse_limit(
+                request.args.get('limit'), default=SUBMISSIONS_PAGE_SIZE, maximum=SUBMISSIONS_MAX_PAGE_SIZE
+            )
+            fields = parse_fields(request.args.get('fields'))
+            query = apply_keyset(
+                UserResponse.query.filter_by(quiz_id=quiz_id),
+                UserResponse.submitted_at, UserResponse.id, request.args.get('cursor')
+            )
+        except (ValueError, InvalidCursor) as e:
+            return jsonify({'error': str(e)}), 400
         
-        submissions = UserResponse.query.filter_by(quiz_id=quiz_id).order_by(
-            UserResponse.submitted_at.desc()
-        ).all()
+        if not wants(fields, 'answers'):
+            query = query.options(defer(UserResponse.answers))
+        
+        submissions, cursor = next_cursor(
+            query.limit(limit + 1).all(), limit, lambda sub: (sub.submitted_at, sub.id)
+        )
         
         return jsonify({
             'quiz_id': quiz_id,
             'quiz_title': quiz.title,
-            'submissions': [sub.to_dict() for sub in submissions]
+            'submissions': [sub.to_dict(fields=fields) for sub in submissions],
+            'next_cursor': cursor
         }), 200
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch submissions', 'message': str(e)}), 500
 
 
+@submissions_bp.route('/quizzes/<int:quiz_id>/submissions/export', methods=['GET'])
+@jwt_required()
+def export_quiz_submissions(quiz_id):
+    """Stream every submission for a quiz as NDJSON or CSV (admin only)"""
+    try:
+        # Check admin access
+        if not current_user.is_admin:
+            return jsonify({'error': 'Admin access required'}), 403
+        
+        export_format = request.args.get('format', 'ndjson').strip().lower()
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'format must be either "ndjson" or "csv"'}), 400
+        
+        if db.session.query(Quiz.id).filter(Quiz.id == quiz_id).first() is None:
+            return jsonify({'error': 'Quiz not found'}), 404
+        
+        columns = [getattr(UserResponse, name) for name in SUBMISSION_EXPORT_FIELDS]
+        statement = db.select(*columns).where(UserResponse.quiz_id == quiz_id).order_by(
+            UserResponse.submitted_at.desc(), UserResponse.id.desc()
+        ).execution_options(yield_per=YIELD_PER)
+        
+        def rows():
+            # Plain row tuples from a server-side cursor: constant memory
+            for row in db.session.execute(statement):
+                yield row._asdict()
+        
+        return export_response(
+            rows(), export_format, f'quiz-{quiz_id}-submissions', SUBMISSION_EXPORT_FIELDS
+        )
+        
+    except Exception as e:
+        return jsonify({'error': 'Failed to export submissions', 'message': str(e)}), 500
+
+
 @submissions_bp.route('/my-submissions', methods=['GET'])
 @jwt_required()
 def get_my_submissions():
-    """Get current user's submissions"""
+    """
+    Get current user's submissions
+
+    Query parameters:
+        fields: comma-separated keys to return, e.g. id,quiz_id,score
+    """
     try:
-        user_id_str = get_jwt_identity()
-        user_id = int(user_id_str)
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        submissions = UserResponse.query.filter_by(user_id=user_id).order_by(
-            UserResponse.submitted_at.desc()
-        ).all()
+        query = UserResponse.query.filter_by(user_id=current_user.id)
+        if not wants(fields, 'answers'):
+            query = query.options(defer(UserResponse.answers))
+        submissions = query.order_by(UserResponse.submitted_at.desc()).all()
         
         return jsonify({
-            'submissions': [sub.to_dict() for sub in submissions]
+            'submissions': [sub.to_dict(fields=fields) for sub in submissions]
         }), 200
         
     except Exception as e:
@@ -0,0 +1,171 @@
+"""
+Per-attempt question draws from large question pools
+
+A quiz with ``draw_count`` set gives each attempt ``draw_count`` questions
+picked at random from all of its questions (the pool). A QuestionPool is
+the pool's question ids, split into strata when the quiz sets ``draw_by``
+('tag' or 'points'), loaded with one narrow SELECT of ids and stratum
+values. Pools are cached per worker in a bounded LRU tagged with the quiz's
+version stamp, like grading plans, so a draw never touches the questions
+table: picking k of n ids is random.sample over a range, which is O(k) for
+k much smaller than n.
+
+Stratified draws split ``draw_count`` across strata in proportion to their
+size (largest remainder), so every tag or point value is represented as in
+the pool, and the picked questions are shuffled together.
+"""
+import random
+import threading
+from collections import OrderedDict
+from models import db, Question
+
+DEFAULT_CACHE_SIZE = 256
+DRAW_BY = ('tag', 'points')
+
+_random = random.Random()
+
+
+class PooledQuizError(ValueError):
+    """Raised by whole-quiz operations that assume every submission answers every question"""
+
+
+def validate_draw(data):
+    """The validation error for a quiz's draw_count / draw_by settings, or None"""
+    draw_count = data.get('draw_count')
+    draw_by = data.get('draw_by')
+    if draw_count is not None and (not isinstance(draw_count, int) or isinstance(draw_count, bool) or draw_count < 1):
+        return 'draw_count must be a positive integer or null'
+    if draw_by is not None and draw_by not in DRAW_BY:
+        return f"draw_by must be one of: {', '.join(DRAW_BY)} (or null)"
+    return None
+
+
+def reject_pooled(draw_count, operation):
+    """Raise PooledQuizError for a quiz that draws its questions per attempt"""
+    if draw_count:
+        raise PooledQuizError(
+            f'{operation} is not available for quizzes that draw {draw_count} question(s) per attempt'
+        )
+
+
+def validate_pool_size(draw_count, pool_size):
+    """The validation error when a quiz would draw more questions than its pool holds, or None"""
+    if draw_count and pool_size < draw_count:
+        return f'draw_count ({draw_count}) exceeds the {pool_size} question(s) in the pool'
+    return None
+
+
+class QuestionPool:
+    """Eligible question ids of one quiz version, grouped by stratum"""
+
+    __slots__ = ('quiz_id', 'version', 'draw_by', 'strata', 'size')
+
+    def __init__(self, quiz_id, version, draw_by, strata):
+        self.quiz_id = quiz_id
+        self.version = version
+        self.draw_by = draw_by
+        self.strata = tuple((key, tuple(ids)) for key, ids in strata)  # ((stratum, (id, ...)), ...)
+        self.size = sum(len(ids) for _, ids in self.strata)
+
+    @classmethod
+    def load(cls, quiz_id, version, draw_by=None):
+        """Read the pool's ids (and stratum values) in question order"""
+        columns = [Question.id]
+        if draw_by is not None:
+            columns.append(getattr(Question, draw_by))
+        rows = db.session.query(*columns).filter(Question.quiz_id == quiz_id).order_by(
+            Question.order, Question.id
+        )
+        strata = OrderedDict()
+        for row in rows:
+            strata.setdefault(row[1] if draw_by is not None else None, []).append(row[0])
+        return cls(quiz_id, version, draw_by, strata.items())
+
+    def all_ids(self):
+        """Every question id, in question order within each stratum"""
+        return [question_id for _, ids in self.strata for question_id in ids]
+
+    def allocate(self, count):
+        """Questions to draw from each stratum: proportional, summing to min(count, size)"""
+        count = min(count, self.size)
+        if len(self.strata) == 1:
+            return [count]
+        exact = [count * len(ids) / self.size for _, ids in self.strata]
+        quotas = [int(share) for share in exact]
+        by_remainder = sorted(range(len(exact)), key=lambda index: quotas[index] - exact[index])
+        for index in by_remainder[:count - sum(quotas)]:
+            quotas[index] += 1
+        return quotas
+
+    def draw(self, count, rng=None):
+        """``count`` distinct question ids in random order (every id when count >= size)"""
+        rng = rng or _random
+        picked = []
+        for (_, ids), quota in zip(self.strata, self.allocate(count)):
+            picked.extend(ids[index] for index in rng.sample(range(len(ids)), quota))
+        if len(self.strata) > 1:
+            rng.shuffle(picked)
+        return picked
+
+
+class PoolCache:
+    """Thread-safe LRU of QuestionPools keyed by quiz id"""
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        self.max_size = max_size
+        self._pools = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, quiz_id, version, draw_by):
+        """Return the cached pool for this quiz version, or None"""
+        with self._lock:
+            pool = self._pools.get(quiz_id)
+            if pool is None or pool.version != version or pool.draw_by != draw_by:
+                self.misses += 1
+                return None
+            self._pools.move_to_end(quiz_id)
+            self.hits += 1
+            return pool
+
+    def put(self, pool):
+        """Store a pool, evicting the least recently used ones over the limit"""
+        with self._lock:
+            current = self._pools.get(pool.quiz_id)
+            if current is not None and current.version > pool.version:
+                return  # A newer pool was loaded concurrently; keep it
+            self._pools[pool.quiz_id] = pool
+            self._pools.move_to_end(pool.quiz_id)
+            while len(self._pools) > self.max_size:
+                self._pools.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pools.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._pools),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+pool_cache = PoolCache()
+
+
+def init_app(app):
+    """Size the process-wide pool cache from app config"""
+    pool_cache.max_size = app.config.get('QUESTION_POOL_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+
+def get_question_pool(quiz_id, version, draw_by=None):
+    """Return the pool for the quiz version, loading its ids only on a miss"""
+    pool = pool_cache.get(quiz_id, version, draw_by)
+    if pool is None:
+        pool = QuestionPool.load(quiz_id, version, draw_by)
+        pool_cache.put(pool)
+    return pool
@@ -1,9 +1,21 @@
 """
 Seed script to create sample quizzes with questions
 Run: python seed_quizzes.py
+     python seed_quizzes.py --quizzes N --questions M --submissions K [--students S] [--seed 1]
+
+The second form generates synthetic fixtures for load tests (see
+bench_api.py): N quizzes of M mixed-type questions, K graded submissions
+per quiz, and S student accounts (student0..S-1) that own the submissions.
 """
+import argparse
+import random
+from datetime import datetime, timedelta
 from app import app
-from models import db, User, Quiz, Question
+from models import db, User, Quiz, Question, CollectionVersion
+from ingest import ingest_submissions
+from roster import import_roster
+
+STUDENT_PASSWORD = 'student123'
 
 def seed_quizzes():
     """Create sample quizzes if they don't exist"""
@@ -177,6 +189,7 @@ def seed_quizzes():
             )
             db.session.add(question)
         
+        CollectionVersion.bump(CollectionVersion.QUIZZES)
         db.session.commit()
         
         print("\n✅ Sample quizzes created successfully!")
@@ -186,6 +199,155 @@ def seed_quizzes():
         for quiz in Quiz.query.all():
             print(f"   - {quiz.title} ({len(quiz.questions)} questions)")
 
+
+def _synthetic_question(rng, quiz_index, index):
+    """One question, cycling through the three question types"""
+    kind = index % 3
+    tag = f"topic{index % 4 + 1}"
+    if kind == 0:
+        options = [f"Option {letter} for Q{index + 1}" for letter in "ABCD"]
+        return {
+            "question_text": f"Quiz {quiz_index + 1}, question {index + 1}: pick the right option",
+            "question_type": "multiple_choice",
+            "options": options,
+            "correct_answer": rng.choice(options),
+            "points": rng.choice([5, 10]),
+            "tag": tag
+        }
+    if kind == 1:
+        return {
+            "question_text": f"Quiz {quiz_index + 1}, statement {index + 1} is true.",
+            "question_type": "true_false",
+            "options": None,
+            "correct_answer": rng.choice(["True", "False"]),
+            "points": 5,
+            "tag": tag
+        }
+    return {
+        "question_text": f"Quiz {quiz_index + 1}, question {index + 1}: type the keyword",
+        "question_type": "text",
+        "options": None,
+        "correct_answer": f"keyword{index}",
+        "points": 10,
+        "tag": tag
+    }
+
+
+def _synthetic_answer(rng, question, ability):
+    """A right answer with probability ``ability``, otherwise a plausible wrong one"""
+    if rng.random() < ability:
+        return question.correct_answer
+    if question.question_type == "multiple_choice":
+        return rng.choice([option for option in question.options if option != question.correct_answer])
+    if question.question_type == "true_false":
+        return "False" if question.correct_answer == "True" else "True"
+    return "no idea"
+
+
+def seed_synthetic_quizzes(quizzes, questions, submissions, students=0, seed=1, chunk_size=1000):
+    """
+    Generate load-test fixtures: ``quizzes`` active quizzes of ``questions``
+    questions, ``submissions`` graded submissions per quiz spread over the
+    last 30 days, and ``students`` accounts with password STUDENT_PASSWORD.
+    The same seed always produces the same content. Returns a summary dict.
+    """
+    rng = random.Random(seed)
+    with app.app_context():
+        admin = User.query.filter_by(username='admin').first()
+        if not admin:
+            raise RuntimeError("Admin user not found. Please run seed.py first to create admin user.")
+        
+        student_ids = []
+        if students:
+            records = (
+                (index + 1, {'username': f'student{index}', 'email': f'student{index}@example.com',
+                             'password': STUDENT_PASSWORD}, None)
+                for index in range(students)
+            )
+            import_roster(records, chunk_size=chunk_size, processes=1)  # Existing students are kept
+            student_ids = [
+                user_id for (user_id,) in db.session.query(User.id).filter(
+                    User.username.in_([f'student{index}' for index in range(students)])
+                ).order_by(User.id)
+            ]
+        
+        quiz_ids = []
+        for quiz_index in range(quizzes):
+            quiz = Quiz(
+                title=f"Load test quiz {quiz_index + 1}",
+                description=f"Synthetic quiz with {questions} questions (seed {seed})",
+                created_by=admin.id,
+                is_active=True
+            )
+            db.session.add(quiz)
+            db.session.flush()
+            db.session.add_all(
+                Question(quiz_id=quiz.id, order=idx, **_synthetic_question(rng, quiz_index, idx))
+                for idx in range(questions)
+            )
+            quiz_ids.append(quiz.id)
+        
+        CollectionVersion.bump(CollectionVersion.QUIZZES)
+        db.session.commit()
+        
+        now = datetime.utcnow()
+        inserted = 0
+        for quiz_id in quiz_ids:
+            quiz_questions = Question.query.filter_by(quiz_id=quiz_id).order_by(Question.order).all()
+            records = []
+            for row in range(1, submissions + 1):
+                ability = rng.uniform(0.3, 0.95)
+                record = {
+                    'answers': {
+                        str(question.id): _synthetic_answer(rng, question, ability)
+                        for question in quiz_questions
+                    },
+                    'submitted_at': (now - timedelta(seconds=rng.randrange(30 * 24 * 3600))).isoformat()
+                }
+                if student_ids:
+                    record['user_id'] = student_ids[(row - 1) % len(student_ids)]
+                else:
+                    record['name'] = f'Participant {row}'
+                records.append((row, record, None))
+            report = ingest_submissions(quiz_id, records, chunk_size=chunk_size)
+            inserted += report['inserted']
+        
+        return {
+            'quiz_ids': quiz_ids,
+            'questions': len(quiz_ids) * questions,
+            'submissions': inserted,
+            'student_ids': student_ids
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Create sample quizzes, or synthetic load-test fixtures')
+    parser.add_argument('--quizzes', type=int, help='Generate this many synthetic quizzes instead of the samples')
+    parser.add_argument('--questions', type=int, default=10, help='Questions per synthetic quiz (default 10)')
+    parser.add_argument('--submissions', type=int, default=0, help='Submissions per synthetic quiz (default 0)')
+    parser.add_argument('--students', type=int, default=0,
+                        help=f'Student accounts owning the submissions (password "{STUDENT_PASSWORD}")')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default 1)')
+    args = parser.parse_args()
+    
+    if args.quizzes is None:
+        seed_quizzes()
+        return
+    
+    try:
+        summary = seed_synthetic_quizzes(args.quizzes, args.questions, args.submissions,
+                                         students=args.students, seed=args.seed)
+    except RuntimeError as e:
+        print(e)
+        return
+    
+    print("\n✅ Synthetic quizzes created successfully!")
+    print(f"   - Quizzes: {len(summary['quiz_ids'])}")
+    print(f"   - Questions: {summary['questions']}")
+    print(f"   - Submissions: {summary['submissions']}")
+    print(f"   - Students: {len(summary['student_ids'])}")
+
+
 if __name__ == '__main__':
-    seed_quizzes()
+    main()
 
@@ -0,0 +1,72 @@
+"""
+Shared fixtures: the application on a scratch SQLite database
+
+The database is created once per session from the models; every test makes
+its own quizzes, so the per-worker caches keyed by quiz id and version never
+see a stale row.
+"""
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix='quiz-tests-')
+# Read by config.py when app.py is imported below
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ['METRICS_DIR'] = os.path.join(_scratch, 'metrics')
+os.environ['LIVE_BROKER_DIR'] = os.path.join(_scratch, 'live')
+os.environ['SUBMISSION_WRITE_BEHIND'] = 'false'
+
+import pytest
+from flask_jwt_extended import create_access_token
+from werkzeug.security import generate_password_hash
+from app import app as flask_app
+from models import db, User
+
+
+@pytest.fixture(scope='session')
+def app():
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers(app):
+    """Authorization header of an admin account (token issued directly: no login hashing)"""
+    with app.app_context():
+        admin = User(
+            username='test_admin', email='test_admin@example.com', role='admin',
+            password_hash=generate_password_hash('admin123', 'pbkdf2:sha256:1000')
+        )
+        db.session.add(admin)
+        db.session.commit()
+        token = create_access_token(identity=str(admin.id), additional_claims={'role': admin.role})
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def make_quiz(client, admin_headers):
+    """Create a quiz through the API; returns its JSON (with answers and question ids)"""
+    def make(questions=3, **settings):
+        body = {
+            'title': 'Test quiz',
+            'questions': [
+                {
+                    'question_text': f'Question {n}',
+                    'question_type': 'multiple_choice',
+                    'options': ['A', 'B', 'C'],
+                    'correct_answer': 'B',
+                    'points': 1
+                }
+                for n in range(1, questions + 1)
+            ],
+            **settings
+        }
+        response = client.post('/api/quizzes', json=body, headers=admin_headers)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['quiz']
+    return make
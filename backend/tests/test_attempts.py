@@ -0,0 +1,60 @@
+"""
+Drawn attempts: an attempt is claimed by its first submission and needs its token
+"""
+
+
+def start_attempt(client, quiz_id):
+    response = client.post(f'/api/quizzes/{quiz_id}/attempts')
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()
+
+
+def submit(client, quiz_id, attempt, answers, token=None):
+    return client.post(f'/api/submissions/quizzes/{quiz_id}/submit', json={
+        'name': 'Student',
+        'answers': answers,
+        'attempt_id': attempt['id'],
+        'attempt_token': attempt['token'] if token is None else token
+    })
+
+
+def test_attempt_draws_draw_count_questions(client, make_quiz):
+    quiz = make_quiz(questions=10, draw_count=4)
+
+    body = start_attempt(client, quiz['id'])
+
+    assert len(body['attempt']['question_ids']) == 4
+    assert [q['id'] for q in body['questions']] == body['attempt']['question_ids']
+    assert all('correct_answer' not in q for q in body['questions'])
+
+
+def test_attempt_is_graded_on_its_draw_and_claimed_once(client, make_quiz):
+    quiz = make_quiz(questions=10, draw_count=3)
+    attempt = start_attempt(client, quiz['id'])['attempt']
+    answers = {str(question_id): 'B' for question_id in attempt['question_ids']}
+
+    first = submit(client, quiz['id'], attempt, answers)
+    second = submit(client, quiz['id'], attempt, answers)
+
+    assert first.status_code == 200, first.get_json()
+    assert (first.get_json()['score'], first.get_json()['total_points']) == (3, 3)
+    assert second.status_code == 409
+
+
+def test_attempt_needs_its_token(client, make_quiz):
+    quiz = make_quiz(questions=5, draw_count=2)
+    attempt = start_attempt(client, quiz['id'])['attempt']
+    answers = {str(question_id): 'B' for question_id in attempt['question_ids']}
+
+    assert submit(client, quiz['id'], attempt, answers, token='not-the-token').status_code == 404
+    assert submit(client, quiz['id'], attempt, answers).status_code == 200
+
+
+def test_pooled_quiz_requires_an_attempt(client, make_quiz):
+    quiz = make_quiz(questions=5, draw_count=2)
+
+    response = client.post(f"/api/submissions/quizzes/{quiz['id']}/submit", json={
+        'name': 'Student', 'answers': {str(quiz['questions'][0]['id']): 'B'}
+    })
+
+    assert response.status_code == 400
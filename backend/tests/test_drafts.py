@@ -0,0 +1,110 @@
+"""
+Draft autosave: saves are merged in memory and written back as one row per attempt
+"""
+import pytest
+from drafts import Draft, DraftError, DraftStore
+from models import db, QuizAttempt
+
+
+@pytest.fixture
+def store(app):
+    """A private draft store whose flusher never fires on its own during a test"""
+    store = DraftStore()
+    store.configure(flush_interval=3600)
+    store.app = app
+    yield store
+    store.stop(drain=False)
+
+
+@pytest.fixture
+def attempt(client, make_quiz):
+    quiz = make_quiz(questions=6, draw_count=3)
+    response = client.post(f"/api/quizzes/{quiz['id']}/attempts")
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['attempt']
+
+
+def seed_for(attempt):
+    return Draft(attempt['quiz_id'], None, attempt['token'], attempt['question_ids'])
+
+
+def stored_draft(app, attempt_id):
+    with app.app_context():
+        row = db.session.get(QuizAttempt, attempt_id)
+        return row.draft_answers, row.draft_revision
+
+
+def test_saves_coalesce_into_one_write(app, store, attempt):
+    first, second, third = (str(question_id) for question_id in attempt['question_ids'])
+
+    store.save(attempt['id'], {first: 'A'}, seed=seed_for(attempt))
+    store.save(attempt['id'], {second: 'B'})
+    snapshot = store.save(attempt['id'], {first: 'C', third: 'A'})
+
+    assert snapshot['answers'] == {first: 'C', second: 'B', third: 'A'}
+    assert snapshot['revision'] == 3
+    assert store.stats()['unsaved'] == 1
+    assert stored_draft(app, attempt['id']) == (None, 0)
+
+    assert store.flush_once() == 1
+    assert store.flush_once() == 0
+    assert store.stats()['rows_flushed'] == 1
+    assert stored_draft(app, attempt['id']) == ({first: 'C', second: 'B', third: 'A'}, 3)
+
+
+def test_null_clears_an_answer(store, attempt):
+    first, second, _ = (str(question_id) for question_id in attempt['question_ids'])
+
+    store.save(attempt['id'], {first: 'A', second: 'B'}, seed=seed_for(attempt))
+    snapshot = store.save(attempt['id'], {first: None})
+
+    assert snapshot['answers'] == {second: 'B'}
+
+
+def test_only_drawn_questions_are_accepted(store, attempt):
+    other = max(attempt['question_ids']) + 1000
+
+    with pytest.raises(DraftError):
+        store.save(attempt['id'], {str(attempt['question_ids'][0]): 'A', str(other): 'A'}, seed=seed_for(attempt))
+    assert store.get(attempt['id'])['answers'] == {}
+
+
+def test_stored_answers_to_other_questions_are_not_restored(attempt):
+    drawn = str(attempt['question_ids'][0])
+    draft = Draft(attempt['quiz_id'], None, attempt['token'], attempt['question_ids'], {drawn: 'A', '999999': 'B'})
+
+    assert draft.answers == {drawn: 'A'}
+
+
+def test_draft_of_attempt_submitted_elsewhere_is_dropped(app, client, store, attempt):
+    first = str(attempt['question_ids'][0])
+    store.save(attempt['id'], {first: 'A'}, seed=seed_for(attempt))
+    # Another worker submits the attempt
+    response = client.post(f"/api/submissions/quizzes/{attempt['quiz_id']}/submit", json={
+        'name': 'Student', 'answers': {first: 'B'}, 'attempt_id': attempt['id'], 'attempt_token': attempt['token']
+    })
+    assert response.status_code == 200, response.get_json()
+
+    store.save(attempt['id'], {first: 'C'})
+    store.flush_once()
+
+    assert store.get(attempt['id']) is None
+    with app.app_context():
+        assert db.session.get(QuizAttempt, attempt['id']).draft_answers is None
+
+
+def test_route_refuses_other_questions_and_submitted_attempts(client, attempt):
+    url = f"/api/quizzes/{attempt['quiz_id']}/attempts/{attempt['id']}/draft"
+    headers = {'X-Attempt-Token': attempt['token']}
+    first = str(attempt['question_ids'][0])
+
+    assert client.patch(url, json={'answers': {'999999': 'A'}}, headers=headers).status_code == 400
+    assert client.patch(url, json={'answers': {first: 'A'}}, headers=headers).status_code == 200
+    client.post(f"/api/submissions/quizzes/{attempt['quiz_id']}/submit", json={
+        'name': 'Student', 'answers': {first: 'A'}, 'attempt_id': attempt['id'], 'attempt_token': attempt['token']
+    })
+    assert client.patch(url, json={'answers': {first: 'B'}}, headers=headers).status_code == 409
+
+
+def test_uncached_draft_without_seed(store):
+    assert store.save(123456, {'1': 'A'}) is None
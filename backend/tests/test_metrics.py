@@ -0,0 +1,27 @@
+"""
+Pool metrics: checkout timeouts are counted as they happen
+"""
+import sqlite3
+import pytest
+from sqlalchemy import exc
+from engine_profile import ProfiledQueuePool
+from metrics import metrics
+
+
+def timeouts_recorded():
+    return metrics.collect().get(('db_pool_checkout_timeouts_total', '', ''), 0.0)
+
+
+def test_checkout_timeout_increments_the_counter(app):
+    pool = ProfiledQueuePool(lambda: sqlite3.connect(':memory:'), pool_size=1, max_overflow=0, timeout=0.01)
+    before = timeouts_recorded()
+    held = pool.connect()
+
+    for _ in range(2):
+        with pytest.raises(exc.TimeoutError):
+            pool.connect()
+    held.close()
+    pool.connect().close()
+
+    assert pool.timeouts == 2
+    assert timeouts_recorded() == before + 2
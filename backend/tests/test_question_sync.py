@@ -0,0 +1,139 @@
+"""
+update_quiz question sync: ids survive edits and only changed rows are written
+"""
+import pytest
+from sqlalchemy import event
+from models import db
+
+
+@pytest.fixture
+def statements(app):
+    """(SQL, row count) of every statement run on the engine during the test"""
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        seen.append((statement, len(parameters) if executemany else 1))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield seen
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+def rows_written(statements, prefix):
+    """Rows written to the questions table by statements starting with ``prefix``"""
+    return sum(rows for statement, rows in statements if statement.lstrip().startswith(f'{prefix} questions '))
+
+
+def put_questions(client, admin_headers, quiz_id, questions):
+    response = client.put(f'/api/quizzes/{quiz_id}', json={'questions': questions}, headers=admin_headers)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def test_editing_one_question_keeps_ids_and_writes_one_row(client, admin_headers, make_quiz, statements):
+    quiz = make_quiz(questions=5)
+    questions = quiz['questions']
+    questions[2]['question_text'] = 'Question 3 (typo fixed)'
+
+    statements.clear()
+    body = put_questions(client, admin_headers, quiz['id'], questions)
+
+    assert body['changes'] == {'inserted': [], 'updated': [questions[2]['id']], 'deleted': [], 'unchanged': 4}
+    assert [q['id'] for q in body['quiz']['questions']] == [q['id'] for q in questions]
+    assert body['quiz']['questions'][2]['question_text'] == 'Question 3 (typo fixed)'
+    assert rows_written(statements, 'UPDATE') == 1
+    assert rows_written(statements, 'INSERT INTO') == 0
+    assert rows_written(statements, 'DELETE FROM') == 0
+
+
+def test_unchanged_questions_write_nothing(client, admin_headers, make_quiz, statements):
+    quiz = make_quiz(questions=4)
+
+    statements.clear()
+    body = put_questions(client, admin_headers, quiz['id'], quiz['questions'])
+
+    assert body['changes'] == {'inserted': [], 'updated': [], 'deleted': [], 'unchanged': 4}
+    assert rows_written(statements, 'UPDATE') == 0
+    assert rows_written(statements, 'INSERT INTO') == 0
+    assert rows_written(statements, 'DELETE FROM') == 0
+
+
+def test_added_and_removed_questions(client, admin_headers, make_quiz):
+    quiz = make_quiz(questions=3)
+    kept, removed = quiz['questions'][:2], quiz['questions'][2]
+    added = {'question_text': 'New question', 'question_type': 'true_false', 'correct_answer': 'True'}
+
+    body = put_questions(client, admin_headers, quiz['id'], kept + [added])
+
+    changes = body['changes']
+    assert changes['deleted'] == [removed['id']]
+    assert len(changes['inserted']) == 1
+    assert changes['inserted'][0] not in {q['id'] for q in quiz['questions']}
+    assert [q['id'] for q in body['quiz']['questions']] == [q['id'] for q in kept] + changes['inserted']
+
+
+def test_question_of_another_quiz_is_rejected(client, admin_headers, make_quiz):
+    quiz = make_quiz(questions=2)
+    other = make_quiz(questions=1)
+
+    response = client.put(
+        f"/api/quizzes/{quiz['id']}",
+        json={'questions': quiz['questions'] + other['questions']},
+        headers=admin_headers
+    )
+
+    assert response.status_code == 400
+    assert 'does not belong to this quiz' in response.get_json()['error']
+
+
+def tagged_quiz(client, admin_headers):
+    response = client.post('/api/quizzes', json={
+        'title': 'Tagged quiz',
+        'draw_count': 2,
+        'draw_by': 'tag',
+        'questions': [
+            {'question_text': f'Question {n}', 'question_type': 'true_false', 'correct_answer': 'True',
+             'tag': tag}
+            for n, tag in enumerate(('algebra', 'algebra', 'geometry', 'geometry'), start=1)
+        ]
+    }, headers=admin_headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['quiz']
+
+
+def test_edit_form_round_trip_keeps_tags(client, admin_headers):
+    quiz = tagged_quiz(client, admin_headers)
+    # What EditQuiz.jsx sends back: the fields it keeps in its form state
+    form = [
+        {key: q[key] for key in ('id', 'question_text', 'question_type', 'options', 'correct_answer', 'points', 'tag')}
+        for q in quiz['questions']
+    ]
+    form[0]['question_text'] = 'Question 1 (edited)'
+
+    body = put_questions(client, admin_headers, quiz['id'], form)
+
+    assert body['changes']['updated'] == [form[0]['id']]
+    assert [q['tag'] for q in body['quiz']['questions']] == ['algebra', 'algebra', 'geometry', 'geometry']
+
+
+def test_missing_tag_key_leaves_tag_unchanged(client, admin_headers):
+    quiz = tagged_quiz(client, admin_headers)
+    questions = [{key: value for key, value in q.items() if key != 'tag'} for q in quiz['questions']]
+
+    body = put_questions(client, admin_headers, quiz['id'], questions)
+
+    assert body['changes']['unchanged'] == 4
+    assert [q['tag'] for q in body['quiz']['questions']] == ['algebra', 'algebra', 'geometry', 'geometry']
+
+
+def test_null_tag_clears_it(client, admin_headers):
+    quiz = tagged_quiz(client, admin_headers)
+    questions = quiz['questions']
+    questions[3]['tag'] = None
+
+    body = put_questions(client, admin_headers, quiz['id'], questions)
+
+    assert body['changes']['updated'] == [questions[3]['id']]
+    assert body['quiz']['questions'][3]['tag'] is None
@@ -0,0 +1,28 @@
+"""
+Quiz listing: admins see inactive quizzes, under their own ETag
+"""
+
+
+def listed_ids(response):
+    assert response.status_code == 200, response.get_json()
+    return {quiz['id'] for quiz in response.get_json()['quizzes']}
+
+
+def test_inactive_quiz_is_listed_for_admins_only(client, admin_headers, make_quiz):
+    quiz = make_quiz(questions=1, is_active=False)
+
+    assert quiz['id'] not in listed_ids(client.get('/api/quizzes'))
+    assert quiz['id'] in listed_ids(client.get('/api/quizzes', headers=admin_headers))
+
+
+def test_admin_listing_has_its_own_etag(client, admin_headers, make_quiz):
+    make_quiz(questions=1)
+
+    public = client.get('/api/quizzes?view=summary')
+    admin = client.get('/api/quizzes?view=summary', headers=admin_headers)
+
+    assert public.headers['ETag'] != admin.headers['ETag']
+    revalidated = client.get(
+        '/api/quizzes?view=summary', headers={**admin_headers, 'If-None-Match': public.headers['ETag']}
+    )
+    assert revalidated.status_code == 200
@@ -0,0 +1,113 @@
+"""
+Write-behind submissions: replayed journal entries are stored once, poison entries are set aside
+"""
+from datetime import datetime
+import pytest
+from models import db, UserResponse
+from write_behind import SubmissionJournal, WriteBehindWriter
+import write_behind
+
+
+@pytest.fixture
+def writer(app, tmp_path):
+    """A writer on its own journal; flushed by hand, its thread is never started"""
+    return WriteBehindWriter(app, SubmissionJournal(str(tmp_path / 'journal.db')), batch_size=10)
+
+
+def record_for(quiz, name, score=1):
+    return {
+        'user_id': None,
+        'quiz_id': quiz['id'],
+        'participant_name': name,
+        'answers': {str(quiz['questions'][0]['id']): 'B'},
+        'score': score,
+        'total_points': len(quiz['questions']),
+        'submitted_at': datetime.utcnow().isoformat(),
+        'attempt_id': None
+    }
+
+
+def stored_names(app, quiz_id):
+    with app.app_context():
+        return sorted(name for (name,) in db.session.query(UserResponse.participant_name).filter(
+            UserResponse.quiz_id == quiz_id
+        ))
+
+
+def test_flush_stores_every_entry(app, writer, make_quiz):
+    quiz = make_quiz(questions=2)
+    for name in ('one', 'two', 'three'):
+        writer.journal.append(record_for(quiz, name))
+
+    assert writer.flush_once() == 3
+    assert writer.flush_once() == 0
+    assert writer.stats()['pending'] == 0
+    assert stored_names(app, quiz['id']) == ['one', 'three', 'two']
+
+
+def test_replayed_batch_is_not_inserted_twice(app, writer, make_quiz):
+    quiz = make_quiz(questions=2)
+    for name in ('one', 'two'):
+        writer.journal.append(record_for(quiz, name))
+    # A worker committed the batch and died before deleting it from the journal
+    entries = writer.journal.claim('crashed-worker', 10)
+    writer._write(entries)
+    writer.journal.release('crashed-worker')
+
+    assert writer.flush_once() == 2
+    assert writer.duplicates_skipped == 2
+    assert writer.flushed_total == 0
+    assert stored_names(app, quiz['id']) == ['one', 'two']
+
+
+def test_poison_entry_is_dead_lettered(app, writer, make_quiz):
+    quiz = make_quiz(questions=2)
+    writer.journal.append(record_for(quiz, 'one'))
+    writer.journal.append(record_for(quiz, 'poison', score=None))  # score is NOT NULL
+    writer.journal.append(record_for(quiz, 'three'))
+
+    assert writer.flush_once() == 3
+    assert writer.flushed_total == 2
+    assert writer.stats()['dead_lettered'] == 1
+    assert writer.stats()['pending'] == 0
+    assert stored_names(app, quiz['id']) == ['one', 'three']
+
+
+def test_malformed_payload_is_dead_lettered_and_requeued(app, writer, make_quiz):
+    quiz = make_quiz(questions=2)
+    broken = record_for(quiz, 'late')
+    del broken['submitted_at']
+    writer.journal.append(record_for(quiz, 'one'))
+    entry_id = writer.journal.append(broken)
+
+    assert writer.flush_once() == 2
+    assert [entry[0] for entry in writer.journal.dead_letters()] == [entry_id]
+    assert 'submitted_at' in writer.journal.dead_letters()[0][4]
+
+    # The cause is fixed (here: by hand) and the entry requeued under its journal key
+    conn = writer.journal._connect()
+    conn.execute("UPDATE dead_submissions SET payload = json_set(payload, '$.submitted_at', ?)",
+                 (datetime.utcnow().isoformat(),))
+    assert writer.journal.requeue() == 1
+    assert writer.stats()['dead_lettered'] == 0
+    assert writer.flush_once() == 1
+    assert stored_names(app, quiz['id']) == ['late', 'one']
+
+
+def test_unexpected_error_keeps_the_batch_queued(app, writer, make_quiz, monkeypatch):
+    quiz = make_quiz(questions=2)
+    writer.journal.append(record_for(quiz, 'one'))
+    writer.journal.append(record_for(quiz, 'two'))
+
+    def broken(self, flushed):
+        raise KeyError('bug in the flush code')
+    monkeypatch.setattr(write_behind.WriteBehindWriter, '_apply_derived', broken)
+
+    assert writer.flush_once() == 0
+    assert writer.stats()['pending'] == 2
+    assert writer.stats()['dead_lettered'] == 0
+    assert stored_names(app, quiz['id']) == []
+
+    monkeypatch.undo()
+    assert writer.flush_once() == 2
+    assert stored_names(app, quiz['id']) == ['one', 'two']
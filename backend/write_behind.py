@@ -0,0 +1,471 @@
+"""
+Write-behind submission journal
+
+When SUBMISSION_WRITE_BEHIND is enabled, submit_quiz appends each graded
+submission to a local SQLite journal (one fsync'd row insert) and replies
+immediately. A background writer in every worker claims journal rows in
+batches and copies them into user_responses, one transaction per batch.
+
+Each journal row carries a journal_key that is stored on the UserResponse it
+becomes, so a batch replayed after a crash (claimed and committed upstream,
+but not yet deleted from the journal) is detected and never inserted twice.
+Claims left behind by a dead worker are released on startup and after
+WRITE_BEHIND_CLAIM_TIMEOUT seconds.
+
+When a batch fails with an error its entries would hit on every retry (a
+constraint or data error from the database, e.g. a foreign key to a deleted
+quiz, or a payload missing its fields), its entries are retried one at a
+time and those that still fail are moved to the journal's dead_submissions
+table, so one bad entry never stalls the queue behind it. Any other error
+(the database being unreachable, a bug in the flush) leaves the batch
+queued. requeue_submissions.py lists dead entries and moves them back to
+the queue once the cause is fixed.
+"""
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from models import db, Quiz, UserResponse
+from grading import get_grading_plan
+from quiz_stats import StatsDelta, apply_delta
+import live
+import response_answers
+
+DEFAULT_FLUSH_INTERVAL = 0.5
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_CLAIM_TIMEOUT = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending_submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_pending_submissions_claimed_by
+    ON pending_submissions (claimed_by);
+CREATE TABLE IF NOT EXISTS dead_submissions (
+    id INTEGER PRIMARY KEY,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    failed_at REAL NOT NULL,
+    error TEXT NOT NULL
+);
+"""
+
+
+
+class PayloadError(ValueError):
+    """Raised for a journal entry whose payload lacks fields or has malformed values"""
+
+
+# Errors that an entry will hit on every retry (e.g. its quiz or attempt was
+# deleted, or a malformed payload): the entry is dead-lettered instead
+POISON_ERRORS = (IntegrityError, DataError, PayloadError)
+
+
+def response_row(key, payload):
+    """The user_responses row for a journal payload; raises PayloadError when it is malformed"""
+    try:
+        return {
+            'user_id': payload['user_id'],
+            'quiz_id': payload['quiz_id'],
+            'participant_name': payload['participant_name'],
+            'answers': payload['answers'],
+            'score': payload['score'],
+            'total_points': payload['total_points'],
+            'submitted_at': datetime.fromisoformat(payload['submitted_at']),
+            'attempt_id': payload.get('attempt_id'),
+            'journal_key': key
+        }
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise PayloadError(f'Malformed payload: {type(e).__name__}: {e}') from e
+
+
+class SubmissionJournal:
+    """Durable append-only queue of graded submissions in a local SQLite file"""
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            conn.execute(
+                "INSERT OR IGNORE INTO journal_meta (key, value) VALUES ('journal_id', ?)",
+                (uuid.uuid4().hex,)
+            )
+            self.journal_id = conn.execute(
+                "SELECT value FROM journal_meta WHERE key = 'journal_id'"
+            ).fetchone()[0]
+
+    def _connect(self):
+        # One connection per thread, reopened after a fork: SQLite
+        # connections must not be shared between gunicorn workers
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=FULL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def key_for(self, entry_id):
+        """Idempotency key stored on the UserResponse created from an entry"""
+        return f'{self.journal_id}:{entry_id}'
+
+    def append(self, record):
+        """Durably enqueue one submission; returns its journal entry id"""
+        cursor = self._connect().execute(
+            'INSERT INTO pending_submissions (payload, enqueued_at) VALUES (?, ?)',
+            (json.dumps(record, separators=(',', ':')), time.time())
+        )
+        return cursor.lastrowid
+
+    def claim(self, owner, limit):
+        """Claim up to ``limit`` unclaimed entries for ``owner``, oldest first"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'UPDATE pending_submissions SET claimed_by = ?, claimed_at = ? '
+                'WHERE id IN (SELECT id FROM pending_submissions '
+                'WHERE claimed_by IS NULL ORDER BY id LIMIT ?)',
+                (owner, time.time(), limit)
+            )
+            rows = conn.execute(
+                'SELECT id, payload FROM pending_submissions WHERE claimed_by = ? ORDER BY id',
+                (owner,)
+            ).fetchall()
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return [(entry_id, json.loads(payload)) for entry_id, payload in rows]
+
+    def complete(self, owner):
+        """Delete entries once they are committed to the main database"""
+        self._connect().execute('DELETE FROM pending_submissions WHERE claimed_by = ?', (owner,))
+
+    def complete_entry(self, entry_id):
+        """Delete one entry once it is committed to the main database"""
+        self._connect().execute('DELETE FROM pending_submissions WHERE id = ?', (entry_id,))
+
+    def dead_letter(self, entry_id, error):
+        """Move an entry that cannot be stored out of the queue, keeping it for inspection"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT INTO dead_submissions (id, payload, enqueued_at, failed_at, error) '
+                'SELECT id, payload, enqueued_at, ?, ? FROM pending_submissions WHERE id = ?',
+                (time.time(), error, entry_id)
+            )
+            conn.execute('DELETE FROM pending_submissions WHERE id = ?', (entry_id,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def dead_letter_count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM dead_submissions').fetchone()[0]
+
+    def dead_letters(self):
+        """(id, payload, enqueued_at, failed_at, error) of every dead-lettered entry, oldest first"""
+        rows = self._connect().execute(
+            'SELECT id, payload, enqueued_at, failed_at, error FROM dead_submissions ORDER BY id'
+        ).fetchall()
+        return [(entry_id, json.loads(payload), *rest) for entry_id, payload, *rest in rows]
+
+    def requeue(self, entry_ids=None):
+        """
+        Move dead-lettered entries (all of them, or ``entry_ids``) back to the
+        queue under their original ids, so their journal_key is unchanged;
+        returns how many were moved
+        """
+        where, params = '', ()
+        if entry_ids is not None:
+            entry_ids = list(entry_ids)
+            if not entry_ids:
+                return 0
+            where, params = f" WHERE id IN ({', '.join('?' * len(entry_ids))})", tuple(entry_ids)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = conn.execute(
+                'INSERT INTO pending_submissions (id, payload, enqueued_at) '
+                f'SELECT id, payload, enqueued_at FROM dead_submissions{where}',
+                params
+            )
+            conn.execute(f'DELETE FROM dead_submissions{where}', params)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cursor.rowcount
+
+    def release(self, owner):
+        """Return claimed entries to the queue after a failed flush"""
+        self._connect().execute(
+            'UPDATE pending_submissions SET claimed_by = NULL, claimed_at = NULL WHERE claimed_by = ?',
+            (owner,)
+        )
+
+    def release_stale(self, older_than):
+        """Release claims older than ``older_than`` seconds (crash recovery)"""
+        cursor = self._connect().execute(
+            'UPDATE pending_submissions SET claimed_by = NULL, claimed_at = NULL '
+            'WHERE claimed_by IS NOT NULL AND claimed_at < ?',
+            (time.time() - older_than,)
+        )
+        return cursor.rowcount
+
+    def backlog(self):
+        """Return (pending_count, oldest_enqueued_at or None)"""
+        count, oldest = self._connect().execute(
+            'SELECT COUNT(*), MIN(enqueued_at) FROM pending_submissions'
+        ).fetchone()
+        return count, oldest
+
+
+class WriteBehindWriter:
+    """Background thread that flushes journal entries into user_responses"""
+
+    def __init__(self, app, journal, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 batch_size=DEFAULT_BATCH_SIZE, claim_timeout=DEFAULT_CLAIM_TIMEOUT):
+        self.app = app
+        self.journal = journal
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.flushed_total = 0
+        self.duplicates_skipped = 0
+        self.failed_flushes = 0
+        self.last_flush_at = None
+        self.last_flush_seconds = None
+        self.last_error = None
+
+    def ensure_started(self):
+        """Start the writer thread in this process if it is not running"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Wake the writer early (e.g. when a batch worth of entries is queued)"""
+        self._wakeup.set()
+
+    def stop(self, drain=True):
+        """Stop the writer, optionally flushing everything still queued"""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+        if drain:
+            while self.flush_once():
+                pass
+
+    def _run(self):
+        # Startup replay: entries claimed by a crashed worker go back to the queue
+        self.journal.release_stale(self.claim_timeout)
+        while not self._stopping.is_set():
+            try:
+                while self.flush_once() == self.batch_size:
+                    pass  # Keep draining while batches come back full
+                self.journal.release_stale(self.claim_timeout)
+            except Exception as e:
+                self.failed_flushes += 1
+                self.last_error = str(e)
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+
+    def flush_once(self):
+        """Flush one batch; returns the number of journal entries processed"""
+        owner = f'{os.getpid()}-{uuid.uuid4().hex}'
+        entries = self.journal.claim(owner, self.batch_size)
+        if not entries:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            rows = self._write(entries)
+        except Exception as e:
+            self.failed_flushes += 1
+            self.last_error = str(e)
+            if not isinstance(e, POISON_ERRORS):
+                self.journal.release(owner)  # e.g. the database is down: retry the batch later
+                return 0
+            # Some entry cannot be stored: write them one at a time so the
+            # rest of the queue is not held back by it
+            rows, processed = self._write_each(owner, entries)
+        else:
+            self.journal.complete(owner)
+            processed = len(entries)
+
+        for quiz_id in {row['quiz_id'] for row in rows}:
+            live.publish(quiz_id)
+        self.flushed_total += len(rows)
+        self.last_flush_at = time.time()
+        self.last_flush_seconds = time.perf_counter() - started
+        return processed
+
+    def _write(self, entries):
+        """
+        Insert (entry_id, payload) journal entries and their derived rows in
+        one transaction; returns the inserted rows (entries already flushed
+        are skipped)
+        """
+        with self.app.app_context():
+            try:
+                keys = {self.journal.key_for(entry_id): payload for entry_id, payload in entries}
+                already = set(db.session.scalars(
+                    db.select(UserResponse.journal_key).where(UserResponse.journal_key.in_(keys))
+                ))
+                pending = [(key, payload) for key, payload in keys.items() if key not in already]
+                rows = [response_row(key, payload) for key, payload in pending]
+                if rows:
+                    ids = db.session.scalars(
+                        insert(UserResponse).returning(UserResponse.id, sort_by_parameter_order=True), rows
+                    ).all()
+                    self._apply_derived(zip(ids, (payload for _, payload in pending)))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        self.duplicates_skipped += len(entries) - len(rows)
+        return rows
+
+    def _write_each(self, owner, entries):
+        """
+        Write a failed batch entry by entry: entries that fail with a
+        POISON_ERRORS error go to the dead-letter table, and any other
+        error releases what is left for a later flush.
+        Returns (inserted rows, entries processed).
+        """
+        rows = []
+        processed = 0
+        for entry_id, payload in entries:
+            try:
+                rows.extend(self._write([(entry_id, payload)]))
+            except POISON_ERRORS as e:
+                self.journal.dead_letter(entry_id, f'{type(e).__name__}: {e}')
+            except Exception as e:
+                self.last_error = str(e)
+                self.journal.release(owner)
+                break
+            else:
+                self.journal.complete_entry(entry_id)
+            processed += 1
+        return rows, processed
+
+    def _apply_derived(self, flushed):
+        """
+        Fold (response_id, payload) pairs into quiz stats, one delta per quiz
+        version, and insert their response_answers rows
+        """
+        deltas = {}
+        answer_rows = []
+        for response_id, payload in flushed:
+            version = payload.get('quiz_version')
+            if version is None:
+                # Journaled before stats were tracked: grade against the current version
+                version = db.session.query(Quiz.version).filter(Quiz.id == payload['quiz_id']).scalar()
+            key = (payload['quiz_id'], version or 0)
+            if key not in deltas:
+                plan = get_grading_plan(*key)
+                deltas[key] = (plan, StatsDelta(plan.quiz_id, [q.id for q in plan.questions]))
+            plan, delta = deltas[key]
+            drawn_ids = payload.get('question_ids')  # Set for drawn attempts (see sampling.py)
+            correct_ids = payload.get('correct_question_ids')
+            rows = payload.get('answer_rows')
+            if correct_ids is None or rows is None:
+                # Journaled by an older release: regrade the stored answers
+                graded = plan.subset(drawn_ids) if drawn_ids is not None else plan
+                _, _, results = graded.grade(payload['answers'])
+                if correct_ids is None:
+                    correct_ids = [qid for qid, result in results.items() if result['is_correct']]
+                if rows is None:
+                    rows = response_answers.submission_rows(graded, results)
+            delta.add(payload['score'], payload['total_points'], correct_ids, drawn_ids)
+            answer_rows.extend(dict(row, response_id=response_id) for row in rows)
+        for plan, delta in deltas.values():
+            apply_delta(delta, plan.version)
+        response_answers.insert_rows(answer_rows)
+
+    def stats(self):
+        """Queue depth and flush lag (age of the oldest unflushed entry)"""
+        pending, oldest = self.journal.backlog()
+        return {
+            'pending': pending,
+            'flush_lag_seconds': round(time.time() - oldest, 3) if oldest else 0.0,
+            'flushed_total': self.flushed_total,
+            'duplicates_skipped': self.duplicates_skipped,
+            'failed_flushes': self.failed_flushes,
+            'dead_lettered': self.journal.dead_letter_count(),
+            'last_flush_seconds': (
+                round(self.last_flush_seconds, 4) if self.last_flush_seconds is not None else None
+            ),
+            'last_error': self.last_error
+        }
+
+
+writer = None
+
+
+def journal_path(app):
+    return app.config.get('SUBMISSION_JOURNAL_PATH') or os.path.join(app.instance_path, 'submission_journal.db')
+
+
+def init_app(app):
+    """Open the journal and set up the writer when write-behind mode is enabled"""
+    global writer
+    if not app.config.get('SUBMISSION_WRITE_BEHIND'):
+        return
+    writer = WriteBehindWriter(
+        app,
+        SubmissionJournal(journal_path(app)),
+        flush_interval=app.config.get('WRITE_BEHIND_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+        batch_size=app.config.get('WRITE_BEHIND_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+        claim_timeout=app.config.get('WRITE_BEHIND_CLAIM_TIMEOUT', DEFAULT_CLAIM_TIMEOUT)
+    )
+    # Started lazily in the process that serves requests, never in a
+    # preloading master or in CLI scripts
+    app.before_request(writer.ensure_started)
+    atexit.register(writer.stop)
+
+
+def is_enabled():
+    return writer is not None
+
+
+def enqueue_submission(record):
+    """Journal a graded submission; returns its provisional id"""
+    writer.ensure_started()
+    entry_id = writer.journal.append(record)
+    if entry_id % writer.batch_size == 0:
+        writer.notify()
+    return writer.journal.key_for(entry_id)
@@ -43,6 +43,7 @@ function EditQuiz() {
           options: q.options || [],
           correct_answer: q.correct_answer || '',
           points: q.points || 1,
+          tag: q.tag ?? null,
         })) || [],
       });
       setError(null);
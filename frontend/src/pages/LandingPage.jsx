@@ -6,16 +6,19 @@ function LandingPage() {
   const [quizzes, setQuizzes] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
     fetchQuizzes();
   }, []);
 
-  const fetchQuizzes = async () => {
+  const fetchQuizzes = async (cursor = null) => {
     try {
       setLoading(true);
-      const response = await quizAPI.getAll();
-      setQuizzes(response.quizzes || []);
+      const response = await quizAPI.getSummaries(cursor);
+      const page = response.quizzes || [];
+      setQuizzes((previous) => (cursor ? [...previous, ...page] : page));
+      setNextCursor(response.next_cursor || null);
       setError(null);
     } catch (err) {
       setError(err.message || 'Failed to load quizzes');
@@ -25,7 +28,7 @@ function LandingPage() {
     }
   };
 
-  if (loading) {
+  if (loading && quizzes.length === 0) {
     return (
       <div className="min-h-screen flex items-center justify-center">
         <div className="text-center">
@@ -78,7 +81,7 @@ function LandingPage() {
                 )}
                 <div className="flex items-center justify-between mt-4">
                   <span className="text-sm text-gray-500">
-                    {quiz.questions?.length || 0} questions
+                    {quiz.question_count || 0} questions
                   </span>
                   <Link
                     to={`/quizzes/${quiz.id}`}
@@ -91,6 +94,18 @@ function LandingPage() {
             ))}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="text-center mt-8">
+            <button
+              onClick={() => fetchQuizzes(nextCursor)}
+              disabled={loading}
+              className="bg-white border border-gray-300 text-gray-700 px-6 py-2 rounded-md hover:bg-gray-100 disabled:opacity-50"
+            >
+              {loading ? 'Loading...' : 'Load more quizzes'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,7 +1,10 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { quizAPI, submissionAPI } from '../utils/api';
 
+// Answers are autosaved to the attempt's server-side draft this often (when changed)
+const AUTOSAVE_INTERVAL_MS = 5000;
+
 function TakeQuiz() {
   const { id } = useParams();
   const navigate = useNavigate();
@@ -12,16 +15,66 @@ function TakeQuiz() {
   const [answers, setAnswers] = useState({});
   const [submitted, setSubmitted] = useState(false);
   const [results, setResults] = useState(null);
+  const [attemptId, setAttemptId] = useState(null);
+  const [attemptToken, setAttemptToken] = useState(null);
+  const [lastSavedAt, setLastSavedAt] = useState(null);
+  const answersRef = useRef({});
+  const dirtyRef = useRef(false);
+  const attemptStorageKey = `quizAttempt:${id}`;
 
   useEffect(() => {
     fetchQuiz();
   }, [id]);
 
+  useEffect(() => {
+    if (!attemptId || submitted) {
+      return undefined;
+    }
+    // Send the full answer map so saves are lossless whichever server handles them
+    const timer = setInterval(async () => {
+      if (!dirtyRef.current) {
+        return;
+      }
+      dirtyRef.current = false;
+      try {
+        await quizAPI.saveDraft(id, attemptId, attemptToken, answersRef.current);
+        setLastSavedAt(new Date());
+      } catch (err) {
+        dirtyRef.current = true; // Retry on the next tick
+      }
+    }, AUTOSAVE_INTERVAL_MS);
+    return () => clearInterval(timer);
+  }, [id, attemptId, attemptToken, submitted]);
+
   const fetchQuiz = async () => {
     try {
       setLoading(true);
-      const response = await quizAPI.getById(id);
-      setQuiz(response.quiz);
+      // Resume the attempt started earlier in this browser, with its draft
+      let response = null;
+      let saved = null;
+      try {
+        saved = JSON.parse(localStorage.getItem(attemptStorageKey));
+      } catch (err) {
+        saved = null; // Stored by an older version: start over
+      }
+      if (saved?.id && saved?.token) {
+        try {
+          response = await quizAPI.getAttempt(id, saved.id, saved.token);
+        } catch (err) {
+          saved = null; // Submitted or gone: start over
+        }
+      }
+      if (!response) {
+        response = await quizAPI.startAttempt(id);
+        saved = { id: response.attempt.id, token: response.attempt.token };
+        localStorage.setItem(attemptStorageKey, JSON.stringify(saved));
+      }
+      const restored = response.draft?.answers || {};
+      answersRef.current = restored;
+      setAnswers(restored);
+      setAttemptId(saved.id);
+      setAttemptToken(saved.token);
+      setQuiz({ ...response.quiz, questions: response.questions });
       setError(null);
     } catch (err) {
       setError(err.message || 'Failed to load quiz');
@@ -31,10 +84,13 @@ function TakeQuiz() {
   };
 
   const handleAnswerChange = (questionId, answer) => {
-    setAnswers((prev) => ({
-      ...prev,
+    const next = {
+      ...answersRef.current,
       [questionId]: answer,
-    }));
+    };
+    answersRef.current = next;
+    dirtyRef.current = true;
+    setAnswers(next);
   };
 
   const handleSubmit = async (e) => {
@@ -50,8 +106,11 @@ function TakeQuiz() {
       const response = await submissionAPI.submit(
         parseInt(id),
         participantName.trim(),
-        answers
+        answers,
+        attemptId,
+        attemptToken
       );
+      localStorage.removeItem(attemptStorageKey);
       setResults(response);
       setSubmitted(true);
     } catch (err) {
@@ -249,6 +308,7 @@ function TakeQuiz() {
                     <input
                       type="text"
                       value={answers[question.id] || ''}
+                      maxLength={500}
                       onChange={(e) => handleAnswerChange(question.id, e.target.value)}
                       className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-blue-500 focus:border-blue-500"
                       placeholder="Enter your answer"
@@ -258,6 +318,12 @@ function TakeQuiz() {
               ))}
             </div>
 
+            {lastSavedAt && (
+              <p className="text-sm text-gray-500 mb-2 text-right">
+                Progress saved at {lastSavedAt.toLocaleTimeString()}
+              </p>
+            )}
+
             <button
               type="submit"
               disabled={loading}
@@ -6,11 +6,11 @@ const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:5001/api'
 async function apiRequest(endpoint, options = {}) {
   const url = `${API_BASE_URL}${endpoint}`;
   const config = {
+    ...options,
     headers: {
       'Content-Type': 'application/json',
       ...options.headers,
     },
-    ...options,
   };
 
   // Add auth token if available
@@ -57,6 +57,13 @@ export const quizAPI = {
   getAll: async () => {
     return apiRequest('/quizzes');
   },
+  getSummaries: async (cursor = null, limit = 20) => {
+    const params = new URLSearchParams({ view: 'summary', limit: String(limit) });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    return apiRequest(`/quizzes?${params.toString()}`);
+  },
   getById: async (id) => {
     return apiRequest(`/quizzes/${id}`);
   },
@@ -77,21 +84,42 @@ export const quizAPI = {
       method: 'DELETE',
     });
   },
+  startAttempt: async (id) => {
+    return apiRequest(`/quizzes/${id}/attempts`, {
+      method: 'POST',
+    });
+  },
+  getAttempt: async (id, attemptId, attemptToken) => {
+    return apiRequest(`/quizzes/${id}/attempts/${attemptId}`, {
+      headers: { 'X-Attempt-Token': attemptToken },
+    });
+  },
+  saveDraft: async (id, attemptId, attemptToken, answers) => {
+    return apiRequest(`/quizzes/${id}/attempts/${attemptId}/draft`, {
+      method: 'PATCH',
+      headers: { 'X-Attempt-Token': attemptToken },
+      body: JSON.stringify({ answers }),
+    });
+  },
 };
 
 // Submission API
 export const submissionAPI = {
-  submit: async (quizId, name, answers) => {
+  submit: async (quizId, name, answers, attemptId = null, attemptToken = null) => {
     return apiRequest(`/submissions/quizzes/${quizId}/submit`, {
       method: 'POST',
-      body: JSON.stringify({ name, answers }),
+      body: JSON.stringify({ name, answers, attempt_id: attemptId, attempt_token: attemptToken }),
     });
   },
   getMySubmissions: async () => {
     return apiRequest('/submissions/my-submissions');
   },
-  getQuizSubmissions: async (quizId) => {
-    return apiRequest(`/submissions/quizzes/${quizId}/submissions`);
+  getQuizSubmissions: async (quizId, cursor = null, limit = 100) => {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) {
+      params.set('cursor', cursor);
+    }
+    return apiRequest(`/submissions/quizzes/${quizId}/submissions?${params.toString()}`);
   },
 };
 